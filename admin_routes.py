@@ -1,9 +1,28 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
+from datetime import date, datetime, timedelta, timezone
+import logging
+import os
+from sqlalchemy import func
 from auth import token_required
-from models import db, User, UMKM, Review
+from models import db, User, UMKM, Review, DeletionJob
+from umkm_routes import review_stats_subquery, UPLOAD_FOLDER
+from streaming import get_stream_format, stream_response, YIELD_PER
+from moderation import moderate, validate_request as validate_moderation, status_of, REJECTED
+from deletion import active_job, schedule
+from bulk_import import import_upload, DEFAULT_BATCH_SIZE
+from slow_queries import top_offenders
+from profiling import list_profiles, profile_path, render_stats
+from stats_rollup import local_day, totals as stats_totals, timeseries as stats_timeseries
 
 admin_bp = Blueprint('admin', __name__)
 
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = ('approved', 'pending', 'rejected', 'unpublished')
+
+TIMESERIES_DEFAULT_DAYS = 30
+TIMESERIES_MAX_DAYS = 731
+
 def admin_required(f):
     from functools import wraps
     @wraps(f)
@@ -17,79 +36,357 @@ def admin_required(f):
 @token_required
 @admin_required
 def get_all_umkm_admin(current_user):
+    status = request.args.get('status')
+    if status and status not in ADMIN_STATUSES:
+        return jsonify({'error': f"status must be one of: {', '.join(ADMIN_STATUSES)}"}), 400
     try:
-        # Get all UMKM with owner info and ratings using SQLAlchemy
-        umkm_list = UMKM.query.all()
-        result = []
-        
-        for umkm in umkm_list:
-            # Get owner info
-            owner = User.query.get(umkm.owner_id)
-            
-            # Calculate average rating and review count
-            reviews = Review.query.filter_by(umkm_id=umkm.id).all()
-            avg_rating = sum([r.rating for r in reviews]) / len(reviews) if reviews else 0
-            review_count = len(reviews)
-            
-            umkm_data = {
-                'id': umkm.id,
-                'name': umkm.name,
-                'category': umkm.category,
-                'description': umkm.description,
-                'image_path': umkm.image_path,
-                'latitude': umkm.latitude,
-                'longitude': umkm.longitude,
-                'address': umkm.address,
-                'phone': umkm.phone,
-                'hours': umkm.hours,
-                'is_approved': umkm.is_approved,
-                'created_at': umkm.created_at.isoformat() if umkm.created_at else None,
-                'owner_name': owner.name if owner else 'Unknown',
-                'owner_email': owner.email if owner else 'Unknown',
-                'avg_rating': round(avg_rating, 2),
-                'review_count': review_count
-            }
-            result.append(umkm_data)
-        
+        # Get all UMKM with owner info and ratings in a single query
+        stats = review_stats_subquery()
+        query = db.session.query(UMKM, User.name, User.email, stats.c.avg_rating, stats.c.review_count) \
+            .outerjoin(User, User.id == UMKM.owner_id) \
+            .outerjoin(stats, stats.c.umkm_id == UMKM.id) \
+            .order_by(UMKM.id)
+        if status == 'approved':
+            query = query.filter(UMKM.is_approved == True)
+        elif status == 'pending':
+            # Antrean moderasi: belum approve dan belum ditolak (termasuk yang di-unpublish)
+            query = query.filter(UMKM.is_approved == False, UMKM.moderation_status.is_distinct_from(REJECTED))
+        elif status:
+            query = query.filter(UMKM.is_approved == False, UMKM.moderation_status == status)
+
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_response(query.yield_per(YIELD_PER), serialize_umkm_admin, stream_format)
+
+        result = [serialize_umkm_admin(row) for row in query.all()]
         return jsonify(result), 200
-    except Exception as e:
-        print(f"Error fetching UMKM: {e}")
+    except Exception:
+        logger.exception("Error fetching UMKM")
         return jsonify({'error': 'Failed to fetch UMKM'}), 500
 
+def serialize_umkm_admin(row):
+    umkm, owner_name, owner_email, avg_rating, review_count = row
+    return {
+        'id': umkm.id,
+        'name': umkm.name,
+        'category': umkm.category,
+        'description': umkm.description,
+        'image_path': umkm.image_path,
+        'latitude': umkm.latitude,
+        'longitude': umkm.longitude,
+        'address': umkm.address,
+        'phone': umkm.phone,
+        'hours': umkm.hours,
+        'is_approved': umkm.is_approved,
+        'status': status_of(umkm),
+        'moderation_reason': umkm.moderation_reason,
+        'created_at': umkm.created_at.isoformat() if umkm.created_at else None,
+        'owner_name': owner_name or 'Unknown',
+        'owner_email': owner_email or 'Unknown',
+        'avg_rating': round(avg_rating or 0, 2),
+        'review_count': review_count or 0
+    }
+
 @admin_bp.route('/admin/umkm/<int:umkm_id>/approve', methods=['PUT'])
 @token_required
 @admin_required
 def approve_umkm(current_user, umkm_id):
     try:
-        umkm = UMKM.query.get(umkm_id)
-        if not umkm:
+        result = moderate([umkm_id], 'approve', None, current_user['id'])[0]
+        if result['status'] == 'not_found':
             return jsonify({'error': 'UMKM not found'}), 404
-
-        umkm.is_approved = True
-        db.session.commit()
+        if result['status'] == 'deleting':
+            return jsonify({'error': 'UMKM is being deleted'}), 409
 
         return jsonify({'message': 'UMKM approved successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error approving UMKM: {e}")
+    except Exception:
+        logger.exception("Error approving UMKM %s", umkm_id)
         return jsonify({'error': 'Failed to approve UMKM'}), 500
 
+@admin_bp.route('/admin/umkm/moderate', methods=['POST'])
+@token_required
+@admin_required
+def moderate_umkm(current_user):
+    ids, action, reason, error = validate_moderation(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        results = moderate(ids, action, reason, current_user['id'])
+        return jsonify({
+            'action': action,
+            'updated': sum(1 for result in results if result['status'] not in ('unchanged', 'not_found')),
+            'results': results
+        }), 200
+    except Exception:
+        logger.exception("Error moderating UMKM")
+        return jsonify({'error': 'Failed to moderate UMKM'}), 500
+
+@admin_bp.route('/admin/users/<int:user_id>', methods=['DELETE'])
+@token_required
+@admin_required
+def delete_user_admin(current_user, user_id):
+    if user_id == current_user['id']:
+        return jsonify({'error': 'You cannot delete your own account'}), 400
+    try:
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        job_id = active_job(owner_id=user_id)
+        if job_id:
+            return jsonify({'message': 'User deletion scheduled', 'job_id': job_id}), 202
+
+        files = [os.path.join(UPLOAD_FOLDER, image_path) for (image_path,) in
+                 db.session.query(UMKM.image_path).filter(UMKM.owner_id == user_id, UMKM.image_path.isnot(None))]
+        job_id = schedule('user', user_id, files, current_user['id'])
+        return jsonify({'message': 'User deletion scheduled', 'job_id': job_id}), 202
+    except Exception:
+        db.session.rollback()
+        logger.exception("Error deleting user %s", user_id)
+        return jsonify({'error': 'Failed to delete user'}), 500
+
+@admin_bp.route('/admin/deletions/<int:job_id>', methods=['GET'])
+@token_required
+@admin_required
+def get_deletion_job(current_user, job_id):
+    job = DeletionJob.query.get(job_id)
+    if not job:
+        return jsonify({'error': 'Deletion job not found'}), 404
+    return jsonify({
+        'id': job.id,
+        'kind': job.kind,
+        'target_id': job.target_id,
+        'status': job.status,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }), 200
+
 @admin_bp.route('/admin/stats', methods=['GET'])
 @token_required
 @admin_required
 def get_admin_stats(current_user):
     try:
-        total_users = User.query.filter(User.role != 'admin').count()
-        total_umkm = UMKM.query.count()
-        pending_umkm = UMKM.query.filter_by(is_approved=False).count()
-        umkm_owners = db.session.query(UMKM.owner_id).distinct().count()
-        
+        values = stats_totals()
+        return jsonify({
+            'totalUsers': values['users'],
+            'totalUMKM': values['umkm'],
+            'pendingUMKM': values['umkm_pending'],
+            'umkmOwners': values['umkm_owners'],
+            'totalReviews': values['reviews'],
+            'totalFavorites': values['favorites']
+        }), 200
+    except Exception:
+        logger.exception("Error fetching stats")
+        return jsonify({'error': 'Failed to fetch stats'}), 500
+
+@admin_bp.route('/admin/stats/timeseries', methods=['GET'])
+@token_required
+@admin_required
+def get_admin_stats_timeseries(current_user):
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in ('day', 'week'):
+        return jsonify({'error': 'bucket must be day or week'}), 400
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.fromisoformat(local_day())
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+            else end - timedelta(days=TIMESERIES_DEFAULT_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates (YYYY-MM-DD)'}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+    if (end - start).days >= TIMESERIES_MAX_DAYS:
+        return jsonify({'error': f'Range must be at most {TIMESERIES_MAX_DAYS} days'}), 400
+
+    try:
         return jsonify({
-            'totalUsers': total_users,
-            'totalUMKM': total_umkm,
-            'pendingUMKM': pending_umkm,
-            'umkmOwners': umkm_owners
+            'bucket': bucket,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'series': stats_timeseries(start, end, bucket)
         }), 200
-    except Exception as e:
-        print(f"Error fetching stats: {e}")
+    except Exception:
+        logger.exception("Error fetching stats timeseries")
         return jsonify({'error': 'Failed to fetch stats'}), 500
+
+@admin_bp.route('/admin/import', methods=['POST'])
+@token_required
+@admin_required
+def import_umkm_admin(current_user):
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+    fmt = request.form.get('format') or ('ndjson' if file.filename.endswith(('.ndjson', '.jsonl')) else 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'Format must be csv or ndjson'}), 400
+
+    try:
+        batch_size = int(request.form.get('batch_size', DEFAULT_BATCH_SIZE))
+        start_row = int(request.form.get('start_row', 0))
+    except ValueError:
+        return jsonify({'error': 'batch_size and start_row must be integers'}), 400
+
+    try:
+        report = import_upload(
+            file,
+            fmt,
+            batch_size=max(1, batch_size),
+            start_row=start_row,
+            default_owner_email=request.form.get('owner_email'),
+            approved=request.form.get('pending') not in ('1', 'true')
+        )
+        return jsonify(report.to_dict()), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        logger.exception("Error importing UMKM")
+        return jsonify({'error': 'Failed to import UMKM'}), 500
+
+def umkm_export_query():
+    stats = review_stats_subquery()
+    query = db.session.query(
+        UMKM.id, UMKM.name, UMKM.category, UMKM.description, UMKM.address, UMKM.phone,
+        UMKM.latitude, UMKM.longitude, UMKM.hours, UMKM.image_path, UMKM.is_approved,
+        UMKM.owner_id, User.name.label('owner_name'), User.email.label('owner_email'),
+        func.round(func.coalesce(stats.c.avg_rating, 0), 2).label('avg_rating'),
+        func.coalesce(stats.c.review_count, 0).label('review_count'),
+        UMKM.created_at, UMKM.updated_at
+    ).outerjoin(User, User.id == UMKM.owner_id) \
+        .outerjoin(stats, stats.c.umkm_id == UMKM.id)
+    return query, func.coalesce(UMKM.updated_at, UMKM.created_at), UMKM.id
+
+def reviews_export_query():
+    query = db.session.query(
+        Review.id, Review.umkm_id, UMKM.name.label('umkm_name'), Review.user_id,
+        User.name.label('user_name'), Review.rating, Review.comment, Review.created_at
+    ).outerjoin(UMKM, UMKM.id == Review.umkm_id) \
+        .outerjoin(User, User.id == Review.user_id)
+    return query, Review.created_at, Review.id
+
+def users_export_query():
+    umkm_counts = db.session.query(
+        UMKM.owner_id.label('user_id'), func.count(UMKM.id).label('umkm_count')
+    ).group_by(UMKM.owner_id).subquery()
+    review_counts = db.session.query(
+        Review.user_id.label('user_id'),
+        func.count(Review.id).label('review_count'),
+        func.avg(Review.rating).label('avg_rating_given')
+    ).group_by(Review.user_id).subquery()
+
+    query = db.session.query(
+        User.id, User.name, User.email, User.role,
+        func.coalesce(umkm_counts.c.umkm_count, 0).label('umkm_count'),
+        func.coalesce(review_counts.c.review_count, 0).label('review_count'),
+        func.round(func.coalesce(review_counts.c.avg_rating_given, 0), 2).label('avg_rating_given'),
+        User.created_at, User.updated_at
+    ).outerjoin(umkm_counts, umkm_counts.c.user_id == User.id) \
+        .outerjoin(review_counts, review_counts.c.user_id == User.id)
+    return query, func.coalesce(User.updated_at, User.created_at), User.id
+
+EXPORT_QUERIES = {
+    'umkm': umkm_export_query,
+    'reviews': reviews_export_query,
+    'users': users_export_query
+}
+
+def serialize_export_row(row):
+    data = row._asdict()
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            data[key] = value.isoformat()
+    return data
+
+@admin_bp.route('/admin/export', methods=['GET'])
+@token_required
+@admin_required
+def export_admin(current_user):
+    fmt = request.args.get('format', 'csv')
+    entity = request.args.get('entity', 'umkm')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    if entity not in EXPORT_QUERIES:
+        return jsonify({'error': 'entity must be umkm, reviews or users'}), 400
+
+    since = request.args.get('since')
+    if since:
+        try:
+            since = datetime.fromisoformat(since.replace('Z', '+00:00'))
+            # Timestamp tersimpan dalam UTC (naive); offset dikonversi, bukan dibuang
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+
+    try:
+        query, changed_at, key = EXPORT_QUERIES[entity]()
+        if since:
+            query = query.filter(changed_at >= since)
+        query = query.order_by(changed_at, key)
+        columns = [c['name'] for c in query.column_descriptions]
+
+        # Client memakai nilai ini sebagai ?since= untuk export berikutnya
+        exported_at = datetime.utcnow().isoformat()
+        filename = f"{entity}_{exported_at[:19].replace(':', '')}.{fmt}"
+
+        return stream_response(
+            query.yield_per(YIELD_PER),
+            serialize_export_row,
+            fmt,
+            columns=columns,
+            headers={
+                'Content-Disposition': f'attachment; filename={filename}',
+                'X-Export-Timestamp': exported_at
+            }
+        )
+    except Exception:
+        logger.exception("Error exporting %s", entity)
+        return jsonify({'error': 'Failed to export data'}), 500
+
+@admin_bp.route('/admin/slow-queries', methods=['GET'])
+@token_required
+@admin_required
+def get_slow_queries(current_user):
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    try:
+        return jsonify(top_offenders(limit)), 200
+    except Exception:
+        logger.exception("Error reading slow-query log")
+        return jsonify({'error': 'Failed to read slow-query log'}), 500
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+@token_required
+@admin_required
+def get_profiles(current_user):
+    profiles = list_profiles()
+    for profile in profiles:
+        profile['created'] = datetime.utcfromtimestamp(profile['created']).isoformat()
+    return jsonify(profiles), 200
+
+@admin_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@token_required
+@admin_required
+def get_profile(current_user, profile_id):
+    path = profile_path(profile_id)
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+
+    # format=raw untuk file .prof (snakeviz, pstats), default teks diurutkan per cumulative time
+    if request.args.get('format') == 'raw':
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{profile_id}.prof')
+
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'calls'):
+        return jsonify({'error': 'sort must be cumulative, tottime or calls'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    return render_stats(profile_id, sort, limit), 200, {'Content-Type': 'text/plain; charset=utf-8'}
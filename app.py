@@ -1,20 +1,41 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
-from models import db, create_tables
+from models import db
+from bootstrap import bootstrap_database
+from db_routing import init_db_routing
+from rankings import rebuild as rebuild_rankings
+from recommendations import run as run_recommendations
+from opening_hours import backfill as backfill_hours
+from stats_rollup import rebuild as rebuild_stats
+from owner_analytics import rebuild as rebuild_owner_analytics
+from deletion import run_pending as run_pending_deletions
+from changes import prune as prune_changes
+from compression import init_compression
+from metrics import init_metrics
+from logging_config import init_request_logging
+from profiling import init_profiling
+import click
+import logging
 import os
-import traceback
 
 # Import blueprints
 from auth import auth_bp
 from umkm_routes import umkm_bp
 from user_routes import user_bp
 from admin_routes import admin_bp
+from health import health_bp
+from events import events_bp
+
+logger = logging.getLogger(__name__)
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # Structured JSON logging (ditulis di thread terpisah) + request id
+    init_request_logging(app)
+    
     # Initialize CORS
     CORS(app, 
          origins=[
@@ -23,12 +44,24 @@ def create_app():
              "http://localhost:5173"
          ],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
+         allow_headers=["Content-Type", "Authorization", "X-Requested-With", "Idempotency-Key"],
+         # Cursor change feed di /api/umkm harus bisa dibaca frontend lintas origin
+         expose_headers=["X-Changes-Cursor"],
          supports_credentials=True,
          max_age=3600)
     
     # Initialize database
     db.init_app(app)
+    init_db_routing(app)
+    
+    # Compress JSON responses (gzip / brotli)
+    init_compression(app)
+    
+    # Request latency & SQL query metrics at /metrics
+    init_metrics(app)
+    
+    # Profiling per request untuk admin (header X-Profile: 1)
+    init_profiling(app)
     
     # Create uploads directory
     os.makedirs('uploads/images', exist_ok=True)
@@ -38,6 +71,8 @@ def create_app():
     app.register_blueprint(umkm_bp, url_prefix='/api')
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(admin_bp, url_prefix='/api')
+    app.register_blueprint(events_bp, url_prefix='/api')
+    app.register_blueprint(health_bp)
     
     # Basic routes
     @app.route('/')
@@ -49,36 +84,57 @@ def create_app():
             'database': 'SQLite'
         })
     
-    @app.route('/health')
-    def health():
-        try:
-            # Test database connection
-            db.session.execute('SELECT 1')
-            return jsonify({
-                'status': 'healthy', 
-                'database': 'SQLite - connected',
-                'service': 'Kawan UMKM API'
-            })
-        except Exception as e:
-            return jsonify({
-                'status': 'degraded', 
-                'database': 'SQLite - error',
-                'error': str(e),
-                'service': 'Kawan UMKM API'
-            }), 500
-    
-    @app.route('/api/health')
-    def api_health():
-        return jsonify({'status': 'healthy', 'service': 'Kawan UMKM API'})
-    
-    # Create tables dengan error handling
-    with app.app_context():
+    @app.cli.command('init-db')
+    def init_db():
+        """Buat schema database (sekali jalan, dilindungi file lock)"""
+        bootstrap_database(app)
+    
+    @app.cli.command('rebuild-rankings')
+    def rebuild_rankings_command():
+        """Hitung ulang skor top rated & trending dari semua review"""
+        rebuild_rankings()
+    
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Hitung ulang counter statistik admin dari tabel sumber"""
+        rebuild_stats()
+    
+    @app.cli.command('rebuild-owner-analytics')
+    def rebuild_owner_analytics_command():
+        """Hitung ulang review dan favorite harian per UMKM untuk dashboard pemilik"""
+        rebuild_owner_analytics()
+    
+    @app.cli.command('run-deletions')
+    def run_deletions_command():
+        """Lanjutkan job penghapusan user/UMKM yang belum selesai"""
+        click.echo(f'{run_pending_deletions()} deletion jobs processed')
+    
+    @app.cli.command('prune-changes')
+    @click.option('--days', type=int, default=None, help='Umur log yang disimpan (default CHANGE_LOG_RETENTION_DAYS)')
+    def prune_changes_command(days):
+        """Pangkas log perubahan katalog UMKM yang sudah lama"""
+        click.echo(f'{prune_changes(days)} change log rows pruned')
+    
+    @app.cli.command('rebuild-recommendations')
+    @click.option('--full', is_flag=True, help='Hitung ulang semua UMKM, bukan hanya yang berubah')
+    def rebuild_recommendations_command(full):
+        """Bangun ulang tetangga item-item untuk /similar dan /user/for-you"""
+        run_recommendations(full=full)
+    
+    @app.cli.command('backfill-hours')
+    def backfill_hours_command():
+        """Parse ulang jam buka semua UMKM ke tabel umkm_hours"""
+        total, failed = backfill_hours()
+        for umkm_id, hours, error in failed:
+            click.echo(f'UMKM {umkm_id}: {hours!r} -> {error}')
+        click.echo(f'{total} UMKM processed, {len(failed)} unparseable')
+    
+    # Schema bootstrap sekali jalan; dengan gunicorn --preload ini hanya terjadi di master
+    if Config.DB_BOOTSTRAP_ON_START:
         try:
-            create_tables()
-            print("✅ Database tables initialized successfully")
-        except Exception as e:
-            print(f"❌ Error creating tables: {e}")
-            print(f"🔍 Stack trace: {traceback.format_exc()}")
+            bootstrap_database(app)
+        except Exception:
+            logger.exception("Error creating tables")
     
     return app
 
@@ -86,6 +142,5 @@ app = create_app()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    print(f"🚀 Starting Kawan UMKM Backend on port {port}...")
-    print(f"🗄️ Database: SQLite ({Config.SQLITE_DB})")
+    logger.info("Starting Kawan UMKM Backend on port %s (database: %s)", port, Config.SQLITE_DB)
     app.run(host='0.0.0.0', port=port, debug=False)
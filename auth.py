@@ -1,13 +1,18 @@
 from flask import Blueprint, request, jsonify
 import jwt
+import logging
 import datetime
 from sqlalchemy.exc import IntegrityError
 from config import Config
 from models import db, User, hash_password, check_password, PasswordResetToken
 from email_service_fixed import EmailService, create_password_reset_token, verify_password_reset_token, mark_token_used
+from stats_rollup import bump
+from logging_config import mask_email
 
 auth_bp = Blueprint('auth', __name__)
 
+logger = logging.getLogger(__name__)
+
 def create_jwt_token(user_id, email, role):
     payload = {
         'user_id': user_id,
@@ -43,20 +48,25 @@ def register():
         )
         
         db.session.add(new_user)
-        db.session.commit()
+        db.session.flush()
+        if role != 'admin':
+            bump(daily={'signups': 1}, totals={'users': 1})
 
+        # Disusun sebelum commit supaya atribut yang expired tidak dibaca ulang dari database
         token = create_jwt_token(new_user.id, new_user.email, new_user.role)
+        user_response = {
+            'id': new_user.id,
+            'name': new_user.name,
+            'email': new_user.email,
+            'role': new_user.role,
+            'created_at': new_user.created_at.isoformat() if new_user.created_at else None
+        }
+        db.session.commit()
         
         return jsonify({
             'message': 'User registered successfully',
             'token': token,
-            'user': {
-                'id': new_user.id,
-                'name': new_user.name,
-                'email': new_user.email,
-                'role': new_user.role,
-                'created_at': new_user.created_at.isoformat() if new_user.created_at else None
-            }
+            'user': user_response
         }), 201
         
     except IntegrityError:
@@ -107,8 +117,6 @@ def forgot_password():
         if not email:
             return jsonify({'error': 'Email is required'}), 400
 
-        print(f"📧 Processing forgot password for: {email}")
-
         user = User.query.filter_by(email=email).first()
         if not user:
             # Security: always return success
@@ -116,8 +124,6 @@ def forgot_password():
                 'message': 'If your email is registered, you will receive a password reset link.'
             }), 200
 
-        print(f"📧 User found: {user.name}")
-        
         # Create token
         token = create_password_reset_token(user.id)
         if not token:
@@ -126,9 +132,7 @@ def forgot_password():
         # Create reset link
         frontend_url = 'https://kawan-umkm-sekawanpapat.netlify.app'
         reset_link = f"{frontend_url}/reset-password?token={token}"
-        
-        print(f"🔗 Reset token created: {token}")
-        print(f"🔗 Reset link: {reset_link}")
+        logger.info("Password reset token created", extra={'user_id': user.id})
 
         # Try to send email
         email_service = EmailService()
@@ -139,12 +143,12 @@ def forgot_password():
         )
 
         if success:
-            print(f"✅ Email sent successfully to {user.email}")
+            logger.info("Password reset email sent", extra={'user_id': user.id})
             return jsonify({
                 'message': 'If your email is registered, you will receive a password reset link.'
             }), 200
         else:
-            print(f"❌ Email failed, returning reset link directly")
+            logger.warning("Password reset email failed, returning reset link directly", extra={'user_id': user.id})
             # Fallback: return reset link in response for development
             return jsonify({
                 'message': 'Email service temporarily unavailable. Use this reset link:',
@@ -152,8 +156,8 @@ def forgot_password():
                 'development_note': 'In production, this should be sent via email'
             }), 200
 
-    except Exception as e:
-        print(f"❌ Error in forgot-password: {str(e)}")
+    except Exception:
+        logger.exception("Error in forgot-password")
         return jsonify({'error': 'Internal server error'}), 500
 
 @auth_bp.route('/reset-password', methods=['POST'])
@@ -185,8 +189,8 @@ def reset_password():
 
         return jsonify({'message': 'Password reset successfully'}), 200
 
-    except Exception as e:
-        print(f"❌ Error in reset-password: {str(e)}")
+    except Exception:
+        logger.exception("Error in reset-password")
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -198,8 +202,8 @@ def check_token(token):
             return jsonify({'valid': True, 'user_id': user_id}), 200
         else:
             return jsonify({'valid': False}), 400
-    except Exception as e:
-        print(f"❌ Error verifying token: {str(e)}")
+    except Exception:
+        logger.exception("Error verifying reset token")
         return jsonify({'valid': False}), 400
 
 # TEST ENDPOINT - SIMPLE EMAIL TEST
@@ -210,7 +214,7 @@ def test_email_simple():
         data = request.get_json()
         test_email = data.get('email', 'test@example.com')
         
-        print(f"🧪 Testing email service with: {test_email}")
+        logger.info("Testing email service with: %s", mask_email(test_email))
         
         email_service = EmailService()
         
@@ -243,7 +247,7 @@ def test_email_simple():
             }), 500
             
     except Exception as e:
-        print(f"❌ Error in test-email-simple: {str(e)}")
+        logger.exception("Error in test-email-simple")
         return jsonify({'error': str(e)}), 500
 
 def token_required(f):
@@ -0,0 +1,200 @@
+"""Generate data sintetis (user, UMKM, review, favorite) ke file SQLite terpisah.
+
+    python -m bench.generate_data --db /tmp/kawan_bench.db --users 1000 --umkm 5000 \
+        --reviews 20000 --favorites 10000
+
+Semua akun memakai password ``password``. Tiga akun tetap selalu dibuat:
+bench-user@example.com, bench-owner@example.com dan bench-admin@example.com.
+Parameter generator disimpan di ``job_state`` (``bench_dataset``) supaya
+``run_benchmark`` bisa mencatat dan mencocokkan dataset baseline.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+# Titik keramaian di Jakarta; koordinat UMKM disebar di sekitar titik-titik ini
+JAKARTA_HUBS = [
+    (-6.2609, 106.7816),  # UPN Veteran Jakarta
+    (-6.1754, 106.8272),  # Monas
+    (-6.2297, 106.8295),  # Kuningan
+    (-6.1944, 106.8229),  # Thamrin
+    (-6.2615, 106.8106),  # Cilandak
+    (-6.1385, 106.8133),  # Kota Tua
+    (-6.2250, 106.9004),  # Jatinegara
+    (-6.3022, 106.8951),  # Cipayung
+    (-6.1683, 106.7588),  # Kebon Jeruk
+    (-6.3662, 106.8272),  # Depok (UI)
+]
+
+CATEGORIES = {
+    'Makanan': ['Geprek', 'Bakso', 'Soto', 'Nasi Uduk', 'Martabak', 'Seblak', 'Pecel Lele', 'Sate'],
+    'Minuman': ['Es Teh', 'Kopi', 'Jus', 'Es Cendol', 'Boba', 'Wedang'],
+    'Jasa': ['Servis AC', 'Laundry', 'Jahit', 'Servis HP', 'Fotokopi', 'Cukur'],
+    'Fashion': ['Batik', 'Hijab', 'Sepatu', 'Kaos Sablon'],
+    'Kerajinan': ['Anyaman', 'Souvenir', 'Keramik'],
+    'Kecantikan': ['Salon', 'Nail Art', 'Spa'],
+}
+
+# Key job_state berisi parameter generator (dibaca bench.run_benchmark)
+DATASET_KEY = 'bench_dataset'
+
+OWNER_NAMES = ['Rara', 'Budi', 'Siti', 'Agus', 'Dewi', 'Joko', 'Rina', 'Andi', 'Fafa', 'Yanto', 'Lestari', 'Bambang']
+
+STREETS = ['Jl. UPN Veteran', 'Jl. Fatmawati', 'Jl. Sudirman', 'Jl. Kemang Raya', 'Jl. Margonda',
+           'Jl. Pondok Labu', 'Jl. Cilandak KKO', 'Jl. Gatot Subroto', 'Jl. Rasuna Said', 'Jl. Salemba Raya']
+
+HOURS = ['09:00-17:00', '09:00 - 21:00', '10:00 - 22:00', '08:00-20:00', '24 Jam', '06:00 - 14:00', '17:00-23:00']
+
+COMMENTS = ['Enak banget, recommended!', 'Harga terjangkau, rasa mantap.', 'Pelayanan ramah dan cepat.',
+            'Lumayan, tapi antriannya panjang.', 'Kurang cocok di lidah saya.', 'Tempatnya bersih dan nyaman.',
+            'Porsi besar, cocok buat mahasiswa.', 'Bakal balik lagi!']
+
+FIXED_USERS = [
+    ('Bench User', 'bench-user@example.com', 'user'),
+    ('Bench Owner', 'bench-owner@example.com', 'umkm'),
+    ('Bench Admin', 'bench-admin@example.com', 'admin'),
+]
+
+def _timestamp(rng, now, max_days):
+    moment = now - timedelta(seconds=rng.randint(0, max_days * 86400))
+    return moment.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def create_schema(db_path):
+    """Buat tabel memakai model SQLAlchemy supaya schema sama dengan aplikasi"""
+    from flask import Flask
+    from models import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+def generate(db_path, users, umkm, reviews, favorites, seed=42, days=365):
+    from models import hash_password
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    create_schema(db_path)
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password = hash_password('password')
+    started = time.perf_counter()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            user_rows = [(name, email, password, role, _timestamp(rng, now, days)) for name, email, role in FIXED_USERS]
+            for i in range(users):
+                role = 'umkm' if rng.random() < 0.2 else 'user'
+                user_rows.append((f'{rng.choice(OWNER_NAMES)} {i}', f'user{i}@example.com', password, role,
+                                  _timestamp(rng, now, days)))
+            conn.executemany(
+                'INSERT INTO users (name, email, password, role, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                [row + (row[-1],) for row in user_rows]
+            )
+
+            user_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE role != 'admin'")]
+            owner_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'umkm'")]
+
+            umkm_rows = []
+            for i in range(umkm):
+                category = rng.choice(list(CATEGORIES))
+                hub_lat, hub_lng = rng.choice(JAKARTA_HUBS)
+                created_at = _timestamp(rng, now, days)
+                umkm_rows.append((
+                    rng.choice(owner_ids),
+                    f'{rng.choice(CATEGORIES[category])} {rng.choice(OWNER_NAMES)} {i}',
+                    category,
+                    f'{category} pilihan warga sekitar, buka setiap hari.',
+                    None,
+                    round(hub_lat + rng.gauss(0, 0.02), 6),
+                    round(hub_lng + rng.gauss(0, 0.02), 6),
+                    f'{rng.choice(STREETS)} No. {rng.randint(1, 300)}, Jakarta',
+                    f'08{rng.randint(100000000, 999999999)}',
+                    rng.choice(HOURS),
+                    1 if rng.random() < 0.9 else 0,
+                    created_at,
+                    created_at
+                ))
+            conn.executemany(
+                '''INSERT INTO umkm (owner_id, name, category, description, image_path, latitude, longitude,
+                address, phone, hours, is_approved, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                umkm_rows
+            )
+            umkm_ids = [row[0] for row in conn.execute('SELECT id FROM umkm')]
+
+            # Popularitas tidak merata: sebagian kecil UMKM mendapat sebagian besar review
+            weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(umkm_ids))]
+            review_targets = rng.choices(umkm_ids, weights=weights, k=reviews)
+            conn.executemany(
+                'INSERT INTO reviews (umkm_id, user_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(umkm_id, rng.choice(user_ids), rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 8])[0],
+                  rng.choice(COMMENTS), _timestamp(rng, now, days)) for umkm_id in review_targets]
+            )
+
+            favorite_pairs = set()
+            attempts = 0
+            while len(favorite_pairs) < favorites and attempts < favorites * 5:
+                attempts += 1
+                favorite_pairs.add((rng.choice(user_ids), rng.choices(umkm_ids, weights=weights)[0]))
+            conn.executemany(
+                'INSERT INTO favorites (user_id, umkm_id, created_at) VALUES (?, ?, ?)',
+                [pair + (_timestamp(rng, now, days),) for pair in favorite_pairs]
+            )
+    finally:
+        conn.close()
+
+    # Tabel turunan (ranking & rekomendasi) diisi seperti di database produksi
+    from rankings import rebuild as rebuild_rankings
+    from recommendations import run as run_recommendations
+    from opening_hours import backfill as backfill_hours
+    from stats_rollup import rebuild as rebuild_stats
+    from owner_analytics import rebuild as rebuild_owner_analytics
+    rebuild_rankings(db_path)
+    backfill_hours(db_path)
+    rebuild_stats(db_path)
+    rebuild_owner_analytics(db_path)
+    run_recommendations(full=True, db_path=db_path)
+
+    dataset = {'users': users, 'umkm': umkm, 'reviews': reviews, 'favorites': favorites, 'seed': seed, 'days': days}
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO job_state (name, value, updated_at) VALUES (?, ?, ?)',
+                         (DATASET_KEY, json.dumps(dataset, sort_keys=True), datetime.utcnow().isoformat(' ')))
+    finally:
+        conn.close()
+
+    return {
+        'users': len(user_rows),
+        'umkm': len(umkm_rows),
+        'reviews': len(review_targets),
+        'favorites': len(favorite_pairs),
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Kawan UMKM database')
+    parser.add_argument('--db', default='/tmp/kawan_bench.db')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--umkm', type=int, default=2000)
+    parser.add_argument('--reviews', type=int, default=10000)
+    parser.add_argument('--favorites', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=365, help='Spread of created_at timestamps')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    result = generate(args.db, args.users, args.umkm, args.reviews, args.favorites, args.seed, args.days)
+    print(f"✅ Generated {result['users']} users, {result['umkm']} UMKM, {result['reviews']} reviews, "
+          f"{result['favorites']} favorites in {result['seconds']}s -> {args.db}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+"""Benchmark semua endpoint auth, umkm_routes, user_routes dan admin_routes.
+
+Mode ``client`` (default) menjalankan aplikasi in-process lewat Flask test
+client; mode ``http`` mengirim request multi-thread ke server yang sudah
+berjalan dengan database yang sama.
+
+    python -m bench.generate_data --db /tmp/kawan_bench.db
+    python -m bench.run_benchmark --db /tmp/kawan_bench.db --compare bench/baseline.json
+
+    SQLITE_DB=/tmp/kawan_bench.db gunicorn app:app -b 127.0.0.1:8000 &
+    python -m bench.run_benchmark --db /tmp/kawan_bench.db --mode http --url http://127.0.0.1:8000 --threads 8
+
+Laporan berisi p50/p95/p99 latency, throughput dan rata-rata jumlah query SQL
+(header ``X-Query-Count``). ``--compare`` menandai regresi terhadap baseline
+dan keluar dengan status 1 jika ada.
+
+``meta.dataset`` berisi parameter ``bench.generate_data`` dari database yang
+diukur. ``--compare`` menolak (status 2) baseline yang diukur pada dataset lain,
+karena latency tidak sebanding; ``--allow-dataset-mismatch`` tetap
+membandingkan dengan peringatan.
+"""
+import argparse
+import http.client
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+Request = namedtuple('Request', 'method path headers body content_type')
+Response = namedtuple('Response', 'status headers body')
+
+class Scenario:
+    def __init__(self, name, build, expect=(200,), slow=False, setup=None):
+        self.name = name
+        self.build = build
+        self.expect = expect
+        self.slow = slow
+        self.setup = setup
+
+def _json(method, path, data, token=None):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return Request(method, path, headers, json.dumps(data).encode(), 'application/json')
+
+def _get(path, token=None):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return Request('GET', path, headers, None, None)
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content, mimetype) in files.items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                   f'Content-Type: {mimetype}\r\n\r\n'.encode())
+        body.write(content)
+        body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+# PNG 1x1 untuk upload gambar
+TINY_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+
+def read_dataset(db_path):
+    """Parameter generator dari ``job_state``, atau None untuk database yang tidak dibuat bench.generate_data"""
+    from bench.generate_data import DATASET_KEY
+
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute('SELECT value FROM job_state WHERE name = ?', (DATASET_KEY,)).fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+def check_dataset(baseline, dataset, allow_mismatch):
+    """Keluar dengan status 2 jika baseline diukur pada dataset lain (kecuali ``allow_mismatch``)"""
+    expected = baseline.get('meta', {}).get('dataset')
+    if expected == dataset and dataset is not None:
+        return
+    if expected is None or dataset is None:
+        message = 'baseline or database has no dataset parameters (regenerate with bench.generate_data)'
+    else:
+        message = f'baseline dataset {expected} != database dataset {dataset}'
+    if not allow_mismatch:
+        print(f'❌ Cannot compare: {message}. Use --allow-dataset-mismatch to compare anyway.', file=sys.stderr)
+        sys.exit(2)
+    print(f'⚠️  {message}; comparison is not meaningful')
+
+class Context:
+    """Id dan token yang dipakai scenario, diambil dari database benchmark"""
+
+    def __init__(self, db_path):
+        from auth import create_jwt_token
+
+        conn = sqlite3.connect(db_path)
+        try:
+            def user(email):
+                row = conn.execute('SELECT id, email, role FROM users WHERE email = ?', (email,)).fetchone()
+                if row is None:
+                    sys.exit(f'{email} not found; generate the database with bench.generate_data first')
+                return row
+
+            self.user = user('bench-user@example.com')
+            self.owner = user('bench-owner@example.com')
+            self.admin = user('bench-admin@example.com')
+            self.umkm_ids = [row[0] for row in conn.execute(
+                'SELECT id FROM umkm WHERE is_approved = 1 ORDER BY id LIMIT 500')]
+            # UMKM dengan review terbanyak, untuk mengukur halaman detail yang paling berat
+            self.popular_umkm_id = conn.execute(
+                'SELECT umkm_id FROM reviews GROUP BY umkm_id ORDER BY COUNT(*) DESC LIMIT 1').fetchone()[0]
+        finally:
+            conn.close()
+
+        self.tokens = {
+            'user': create_jwt_token(*self.user),
+            'owner': create_jwt_token(*self.owner),
+            'admin': create_jwt_token(*self.admin),
+        }
+        self.counter = itertools.count()
+        self.created_umkm = []
+        self.lock = threading.Lock()
+
+    def next(self):
+        return next(self.counter)
+
+    def pick_umkm(self):
+        return self.umkm_ids[self.next() % len(self.umkm_ids)]
+
+def _create_umkm(ctx):
+    body, content_type = _multipart(
+        {'name': f'Bench UMKM {ctx.next()}', 'category': 'Makanan', 'address': 'Jl. Benchmark No. 1',
+         'contact': '081234567890', 'latitude': '-6.2609', 'longitude': '106.7816', 'hours': '09:00-17:00'},
+        {'image': ('bench.png', TINY_PNG, 'image/png')}
+    )
+    return Request('POST', '/api/umkm', {'Authorization': f"Bearer {ctx.tokens['owner']}"}, body, content_type)
+
+def _remember_created(ctx, response):
+    if response.status == 201:
+        with ctx.lock:
+            ctx.created_umkm.append(json.loads(response.body)['umkm']['id'])
+
+def _delete_umkm(ctx):
+    with ctx.lock:
+        umkm_id = ctx.created_umkm.pop() if ctx.created_umkm else 0
+    return Request('DELETE', f'/api/umkm/{umkm_id}', {'Authorization': f"Bearer {ctx.tokens['owner']}"}, None, None)
+
+def _import(ctx):
+    rows = '\n'.join(json.dumps({'name': f'Imported {ctx.next()}-{i}', 'category': 'Jasa', 'address': 'Jl. Import',
+                                 'phone': '0811', 'owner_email': 'bench-owner@example.com'}) for i in range(50))
+    body, content_type = _multipart({'format': 'ndjson'}, {'file': ('rows.ndjson', rows.encode(), 'application/x-ndjson')})
+    return Request('POST', '/api/admin/import', {'Authorization': f"Bearer {ctx.tokens['admin']}"}, body, content_type)
+
+SCENARIOS = [
+    # auth
+    Scenario('auth.register', lambda c: _json('POST', '/api/register', {
+        'name': 'Bench Register', 'email': f'bench-reg-{uuid.uuid4().hex}@example.com', 'password': 'password'}),
+        expect=(201,), slow=True),
+    Scenario('auth.login', lambda c: _json('POST', '/api/login', {
+        'email': 'bench-user@example.com', 'password': 'password'}), slow=True),
+    Scenario('auth.logout', lambda c: _json('POST', '/api/logout', {})),
+    Scenario('auth.forgot_password_unknown', lambda c: _json('POST', '/api/forgot-password', {
+        'email': 'nobody@example.com'})),
+    Scenario('auth.check_token_invalid', lambda c: _get('/api/check-token/invalid-token'), expect=(400,)),
+    Scenario('auth.reset_password_invalid', lambda c: _json('POST', '/api/reset-password', {
+        'token': 'invalid-token', 'newPassword': 'password'}), expect=(400,)),
+    # umkm_routes
+    Scenario('umkm.list', lambda c: _get('/api/umkm')),
+    Scenario('umkm.list_stream', lambda c: _get('/api/umkm?stream=ndjson')),
+    Scenario('umkm.list_open_now', lambda c: _get('/api/umkm?open_now=true')),
+    Scenario('umkm.changes', lambda c: _get('/api/umkm/changes?since=0&limit=100')),
+    Scenario('umkm.clusters_city', lambda c: _get('/api/umkm/clusters?bbox=106.6,-6.45,107.05,-6.05&zoom=11')),
+    Scenario('umkm.clusters_street', lambda c: _get('/api/umkm/clusters?bbox=106.81,-6.21,106.83,-6.19&zoom=16')),
+    Scenario('umkm.top', lambda c: _get('/api/umkm/top?window=all')),
+    Scenario('umkm.top_trending_category', lambda c: _get('/api/umkm/top?window=7d&category=Makanan')),
+    Scenario('umkm.similar', lambda c: _get(f'/api/umkm/{c.pick_umkm()}/similar')),
+    Scenario('umkm.detail', lambda c: _get(f'/api/umkm/{c.pick_umkm()}')),
+    Scenario('umkm.detail_popular', lambda c: _get(f'/api/umkm/{c.popular_umkm_id}')),
+    Scenario('umkm.reviews', lambda c: _get(f'/api/umkm/{c.pick_umkm()}/reviews')),
+    Scenario('umkm.reviews_popular', lambda c: _get(f'/api/umkm/{c.popular_umkm_id}/reviews')),
+    Scenario('umkm.add_review', lambda c: _json('POST', f'/api/umkm/{c.pick_umkm()}/reviews', {
+        'rating': 4, 'comment': 'Benchmark review'}, c.tokens['user']), expect=(201,)),
+    Scenario('umkm.my_umkm', lambda c: _get('/api/my-umkm', c.tokens['owner'])),
+    Scenario('umkm.my_umkm_analytics', lambda c: _get('/api/my-umkm/analytics', c.tokens['owner'])),
+    Scenario('umkm.create', _create_umkm, expect=(201,), setup=_remember_created),
+    Scenario('umkm.delete', _delete_umkm),
+    Scenario('umkm.image_missing', lambda c: _get('/api/uploads/images/missing.png'), expect=(404,)),
+    # user_routes
+    Scenario('user.profile', lambda c: _get('/api/user/profile', c.tokens['user'])),
+    Scenario('user.for_you', lambda c: _get('/api/user/for-you', c.tokens['user'])),
+    Scenario('user.update_profile', lambda c: _json('PUT', '/api/profile', {
+        'name': 'Bench User', 'email': 'bench-user@example.com'}, c.tokens['user'])),
+    Scenario('user.change_password', lambda c: _json('POST', '/api/change-password', {
+        'currentPassword': 'password', 'newPassword': 'password'}, c.tokens['user']), slow=True),
+    # admin_routes
+    Scenario('admin.umkm', lambda c: _get('/api/admin/umkm', c.tokens['admin'])),
+    Scenario('admin.approve', lambda c: Request('PUT', f'/api/admin/umkm/{c.pick_umkm()}/approve',
+                                                {'Authorization': f"Bearer {c.tokens['admin']}"}, None, None)),
+    Scenario('admin.moderate_batch', lambda c: _json('POST', '/api/admin/umkm/moderate', {
+        'ids': [c.pick_umkm() for _ in range(50)], 'action': 'approve'}, c.tokens['admin'])),
+    Scenario('admin.stats', lambda c: _get('/api/admin/stats', c.tokens['admin'])),
+    Scenario('admin.stats_timeseries', lambda c: _get('/api/admin/stats/timeseries?bucket=week&from=2025-01-01',
+                                                     c.tokens['admin'])),
+    Scenario('admin.export_umkm_csv', lambda c: _get('/api/admin/export?entity=umkm&format=csv', c.tokens['admin'])),
+    Scenario('admin.export_reviews_ndjson', lambda c: _get('/api/admin/export?entity=reviews&format=ndjson',
+                                                           c.tokens['admin'])),
+    Scenario('admin.import', _import, slow=True),
+]
+
+# Endpoint yang sengaja tidak dijalankan karena membutuhkan layanan eksternal (SMTP)
+SKIPPED = ['auth.test_email_simple']
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def send(self, req):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        headers = dict(req.headers)
+        if req.content_type:
+            headers['Content-Type'] = req.content_type
+        response = client.open(req.path, method=req.method, headers=headers, data=req.body)
+        return Response(response.status_code, response.headers, response.get_data())
+
+class HttpTransport:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.local = threading.local()
+
+    def send(self, req):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = dict(req.headers)
+        if req.content_type:
+            headers['Content-Type'] = req.content_type
+        try:
+            conn.request(req.method, req.path, body=req.body, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            raise
+        return Response(response.status, response.headers, body)
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def run_scenario(transport, ctx, scenario, iterations, threads):
+    latencies = []
+    queries = []
+    errors = []
+    lock = threading.Lock()
+    remaining = itertools.count()
+
+    def worker():
+        while next(remaining) < iterations:
+            req = scenario.build(ctx)
+            start = time.perf_counter()
+            try:
+                response = transport.send(req)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = time.perf_counter() - start
+            if scenario.setup:
+                scenario.setup(ctx, response)
+            with lock:
+                latencies.append(elapsed)
+                if response.headers.get('X-Query-Count') is not None:
+                    queries.append(int(response.headers['X-Query-Count']))
+                if response.status not in scenario.expect:
+                    errors.append(f'HTTP {response.status}')
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'count': len(latencies),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else 0,
+        'avg_queries': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return daftar regresi: latency p95 naik > threshold atau jumlah query bertambah"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold) \
+                and current['p95_ms'] - previous['p95_ms'] > min_delta_ms:
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous.get('avg_queries') is not None and current.get('avg_queries') is not None \
+                and current['avg_queries'] > previous['avg_queries'] + 0.5:
+            regressions.append(f"{name}: queries {previous['avg_queries']} -> {current['avg_queries']}")
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+def print_report(results):
+    header = f"{'scenario':32} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'queries':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        queries = '-' if r['avg_queries'] is None else r['avg_queries']
+        print(f"{name:32} {r['count']:>5} {r['errors']:>4} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+              f"{r['p99_ms']:>9} {r['throughput_rps']:>8} {queries:>8}")
+    if SKIPPED:
+        print(f"skipped (external services): {', '.join(SKIPPED)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Kawan UMKM endpoints')
+    parser.add_argument('--db', default='/tmp/kawan_bench.db', help='Database generated by bench.generate_data')
+    parser.add_argument('--mode', choices=['client', 'http'], default='client')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server URL for --mode http')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--in-place', action='store_true', help='Run client mode directly on --db instead of a copy')
+    parser.add_argument('--only', help='Comma separated scenario name prefixes')
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--save-baseline', help='Write results as the new baseline file')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--allow-dataset-mismatch', action='store_true',
+                        help='Compare even if the baseline was measured on a different generated dataset')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative p95 increase')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='Ignore p95 increases smaller than this (timer noise on fast endpoints)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        sys.exit(f'{args.db} does not exist; run python -m bench.generate_data --db {args.db} first')
+
+    dataset = read_dataset(args.db)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Dicek sebelum run supaya mismatch tidak menunggu seluruh scenario
+        check_dataset(baseline, dataset, args.allow_dataset_mismatch)
+
+    # Scenario write (create, review, import) mengubah data; mode client bekerja
+    # pada salinan supaya setiap run dimulai dari database yang sama
+    db_path = args.db
+    if args.mode == 'client' and not args.in_place:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='kawan_bench_'), os.path.basename(args.db))
+        shutil.copyfile(args.db, db_path)
+
+    # Harus di-set sebelum config/app di-import
+    os.environ['SQLITE_DB'] = os.path.abspath(db_path)
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+    ctx = Context(args.db)
+    if args.mode == 'client':
+        from app import app
+        transport = TestClientTransport(app)
+    else:
+        transport = HttpTransport(args.url)
+
+    scenarios = SCENARIOS
+    if args.only:
+        prefixes = tuple(args.only.split(','))
+        scenarios = [s for s in SCENARIOS if s.name.startswith(prefixes)]
+
+    results = {}
+    for scenario in scenarios:
+        iterations = max(3, args.iterations // 10) if scenario.slow else args.iterations
+        # Warm-up satu request supaya cache/koneksi tidak mempengaruhi angka
+        run_scenario(transport, ctx, scenario, 1, 1)
+        results[scenario.name] = run_scenario(transport, ctx, scenario, iterations, args.threads)
+
+    print_report(results)
+
+    report = {
+        'meta': {
+            'mode': args.mode,
+            'threads': args.threads,
+            'iterations': args.iterations,
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'dataset': dataset,
+        },
+        'results': results
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print('\n❌ Regressions:')
+            for line in regressions:
+                print(f'   {line}')
+            sys.exit(1)
+        print('\n✅ No regressions against baseline')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Bootstrap schema database sekali jalan dan hook untuk gunicorn ``--preload``.
+
+Schema dibuat oleh satu proses saja: pemanggil mengambil ``flock`` pada
+``<SQLITE_DB>.bootstrap.lock`` lalu mengecek ``sqlite_master`` lewat koneksi
+sqlite3 biasa. ``create_all`` hanya dijalankan jika ada tabel yang belum ada
+dan index model yang belum ada dibuat belakangan, sehingga start berikutnya
+(dan worker lain) cukup membayar beberapa query kecil. Tabel lama yang
+foreign key-nya belum sesuai model (``ON DELETE CASCADE``) dibangun ulang
+sekali, dan kolom nullable baru ditambahkan dengan ``ALTER TABLE``.
+
+    flask --app app init-db      # eksplisit, mis. sebagai release step
+    python bootstrap.py          # sama, tanpa Flask CLI
+
+Dengan ``--preload`` aplikasi di-import sekali di master dan worker berbagi
+halaman memori hasil import (copy-on-write). Connection pool dan thread
+background tidak boleh ikut ter-fork, karena itu ``after_fork`` membuang
+pool warisan master dan menyalakan ulang thread log di setiap worker.
+"""
+import fcntl
+import logging
+import os
+import sqlite3
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_TABLES = ('users', 'umkm', 'reviews', 'favorites', 'password_reset_tokens', 'idempotency_keys',
+                   'umkm_scores', 'umkm_similarities', 'job_state', 'umkm_hours', 'daily_stats', 'stats_totals',
+                   'umkm_moderation', 'deletion_jobs', 'umkm_changes', 'events', 'umkm_daily_stats')
+
+_bootstrapped = False
+
+def missing_tables(db_path=None):
+    """Tabel wajib yang belum ada (semua tabel jika file database belum ada)"""
+    db_path = db_path or Config.SQLITE_DB
+    if not os.path.exists(db_path):
+        return list(REQUIRED_TABLES)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+    return [table for table in REQUIRED_TABLES if table not in existing]
+
+def ensure_indexes():
+    """Buat index model yang belum ada di database lama (create_all hanya membuat tabel baru)"""
+    from models import db
+
+    with db.engine.begin() as conn:
+        existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    logger.info("Creating index %s", index.name)
+                    index.create(conn)
+
+def ensure_columns():
+    """Tambahkan kolom model (nullable) yang belum ada di tabel lama lewat ALTER TABLE ADD COLUMN"""
+    from sqlalchemy.schema import CreateColumn
+    from models import db
+
+    added = []
+    with db.engine.begin() as conn:
+        existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table.name})')}
+            for column in table.columns:
+                if column.name not in columns:
+                    logger.info("Adding column %s.%s", table.name, column.name)
+                    ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {ddl}')
+                    added.append(f'{table.name}.{column.name}')
+    return added
+
+def _foreign_keys(conn, table_name):
+    """(kolom, tabel induk, ON DELETE) dari foreign key yang ada di database"""
+    return {(row[3], row[2], row[6].upper()) for row in conn.execute(f'PRAGMA foreign_key_list({table_name})')}
+
+def ensure_foreign_keys():
+    """Bangun ulang tabel lama yang foreign key-nya belum sesuai model (mis. belum ON DELETE CASCADE).
+
+    SQLite tidak bisa mengubah constraint lewat ALTER TABLE, jadi dipakai
+    prosedur dari dokumentasi SQLite: buat tabel baru, salin data, drop tabel
+    lama, rename. Index ikut terhapus dan dibuat ulang oleh ``ensure_indexes``.
+    """
+    from sqlalchemy.schema import CreateTable
+    from models import db
+
+    conn = sqlite3.connect(Config.SQLITE_DB, timeout=30, isolation_level=None)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        outdated = []
+        for table in db.metadata.sorted_tables:
+            expected = {(fk.parent.name, fk.column.table.name, (fk.ondelete or 'NO ACTION').upper())
+                        for fk in table.foreign_keys}
+            if table.name in existing and _foreign_keys(conn, table.name) != expected:
+                outdated.append(table)
+        if not outdated:
+            return []
+
+        # Harus di luar transaksi; tanpa ini DROP TABLE ikut menghapus baris anak
+        conn.execute('PRAGMA foreign_keys=OFF')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for table in outdated:
+                logger.info("Rebuilding table %s with updated foreign keys", table.name)
+                ddl = str(CreateTable(table).compile(dialect=db.engine.dialect)).strip()
+                new_name = f'{table.name}__rebuild'
+                conn.execute(ddl.replace(f'CREATE TABLE {table.name} (', f'CREATE TABLE {new_name} (', 1))
+                old_columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table.name})')}
+                columns = ', '.join(column.name for column in table.columns if column.name in old_columns)
+                conn.execute(f'INSERT INTO {new_name} ({columns}) SELECT {columns} FROM {table.name}')
+                conn.execute(f'DROP TABLE {table.name}')
+                conn.execute(f'ALTER TABLE {new_name} RENAME TO {table.name}')
+            orphans = conn.execute('PRAGMA foreign_key_check').fetchall()
+            if orphans:
+                logger.warning("%d rows reference missing parents after rebuild", len(orphans))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    return [table.name for table in outdated]
+
+def bootstrap_database(app):
+    """Buat schema jika perlu; aman dipanggil dari beberapa proses sekaligus"""
+    global _bootstrapped
+    if _bootstrapped:
+        return False
+
+    from models import db, create_tables, configure_sqlite_connection
+
+    started = time.perf_counter()
+    lock_path = f'{Config.SQLITE_DB}.bootstrap.lock'
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        missing = missing_tables()
+        with app.app_context():
+            if missing:
+                logger.info("Bootstrapping database schema (missing: %s)", ', '.join(missing))
+                create_tables()
+            ensure_foreign_keys()
+            ensure_columns()
+            ensure_indexes()
+            if 'umkm_scores' in missing:
+                # Tabel skor baru di database lama: isi dari review yang sudah ada
+                from rankings import rebuild
+                rebuild()
+            if 'umkm_similarities' in missing:
+                from recommendations import run as run_recommendations
+                run_recommendations(full=True)
+            if 'umkm_hours' in missing:
+                from opening_hours import backfill as backfill_hours
+                backfill_hours()
+            if 'stats_totals' in missing:
+                from stats_rollup import rebuild as rebuild_stats
+                rebuild_stats()
+            if 'umkm_daily_stats' in missing:
+                from owner_analytics import rebuild as rebuild_owner_analytics
+                rebuild_owner_analytics()
+            # Jangan tinggalkan koneksi di pool milik proses ini (bisa jadi master gunicorn)
+            for engine in db.engines.values():
+                engine.dispose()
+        # WAL tersimpan di file database; diset di sini supaya engine read-only langsung memakainya
+        conn = sqlite3.connect(Config.SQLITE_DB, timeout=30)
+        try:
+            configure_sqlite_connection(conn)
+        finally:
+            conn.close()
+    _bootstrapped = True
+
+    logger.info("Database schema ready in %.1f ms", (time.perf_counter() - started) * 1000)
+    return bool(missing)
+
+def after_fork(app):
+    """Dipanggil di worker setelah fork (hook ``post_fork`` gunicorn)"""
+    from models import db
+    import logging_config
+
+    with app.app_context():
+        # close=False: koneksi milik master tidak ditutup dari worker, cukup dilepas
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    logging_config.start_listener()
+
+if __name__ == '__main__':
+    from app import app
+    if not bootstrap_database(app):
+        logger.info("Schema already up to date")
@@ -0,0 +1,322 @@
+"""Bulk import UMKM dari file CSV / NDJSON.
+
+Baris divalidasi, lalu di-insert dengan ``executemany`` per batch dalam satu
+transaksi. Interval jam buka, counter statistik, change feed dan checkpoint
+(nomor baris terakhir, di ``job_state``) ditulis di transaksi yang sama,
+sehingga import yang terputus di titik mana pun bisa dilanjutkan dengan
+``--resume`` tanpa baris ganda atau UMKM tanpa jam buka.
+
+CLI:
+    python bulk_import.py merchants.csv --owner-email umkm@demo.com
+    python bulk_import.py merchants.ndjson --format ndjson --resume
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from models import get_db_connection
+from cache import invalidate_umkm_cache
+from opening_hours import write_hours
+from clusters import invalidate_locations
+from stats_rollup import bump_conn
+from changes import record_conn
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Batas jumlah detail baris yang ditolak di dalam report
+MAX_REPORTED_REJECTIONS = 1000
+
+REQUIRED_FIELDS = ['name', 'category', 'address', 'phone']
+
+INSERT_SQL = '''INSERT INTO umkm (owner_id, name, category, description, image_path,
+    latitude, longitude, address, phone, hours, is_approved, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+class ImportReport:
+    def __init__(self, start_row=0):
+        self.start_row = start_row
+        self.last_committed_row = start_row
+        self.rows_read = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.rejections = []
+        self.batches = 0
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+
+    def reject(self, row_number, errors):
+        self.rejected += 1
+        if len(self.rejections) < MAX_REPORTED_REJECTIONS:
+            self.rejections.append({'row': row_number, 'errors': errors})
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started_at
+
+    def to_dict(self):
+        return {
+            'start_row': self.start_row,
+            'last_committed_row': self.last_committed_row,
+            'rows_read': self.rows_read,
+            'inserted': self.inserted,
+            'rejected': self.rejected,
+            'rejections': self.rejections,
+            'batches': self.batches,
+            'duration_seconds': round(self.duration, 3),
+            'rows_per_second': round(self.rows_read / self.duration, 1) if self.duration else 0
+        }
+
+def read_rows(stream, fmt):
+    """Yield (nomor_baris, dict) dari stream teks CSV atau NDJSON"""
+    if fmt == 'csv':
+        for row_number, row in enumerate(csv.DictReader(stream), start=1):
+            yield row_number, row
+    elif fmt == 'ndjson':
+        for row_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _parse_coordinate(value, limit, field, errors):
+    value = _clean(value)
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        errors.append(f'{field} is not a number')
+        return None
+    if not -limit <= number <= limit:
+        errors.append(f'{field} out of range')
+        return None
+    return number
+
+def validate_row(row, owners, default_owner_id):
+    """Return (values, errors). ``values`` siap untuk INSERT_SQL tanpa timestamp"""
+    if row is None:
+        return None, ['Invalid row']
+
+    errors = []
+    data = {field: _clean(row.get(field)) for field in
+            ('name', 'category', 'description', 'address', 'hours', 'owner_email', 'owner_id', 'image_path')}
+    data['phone'] = _clean(row.get('phone') or row.get('contact'))
+
+    for field in REQUIRED_FIELDS:
+        if not data[field]:
+            errors.append(f'Missing required field: {field}')
+
+    if data['name'] and len(data['name']) > 100:
+        errors.append('name is longer than 100 characters')
+    if data['category'] and len(data['category']) > 50:
+        errors.append('category is longer than 50 characters')
+    if data['phone'] and len(data['phone']) > 20:
+        errors.append('phone is longer than 20 characters')
+
+    latitude = _parse_coordinate(row.get('latitude'), 90, 'latitude', errors)
+    longitude = _parse_coordinate(row.get('longitude'), 180, 'longitude', errors)
+
+    owner_id = None
+    if data['owner_id']:
+        owner_id = int(data['owner_id']) if data['owner_id'].isdigit() else None
+        if owner_id not in owners.ids:
+            errors.append(f"Unknown owner_id: {data['owner_id']}")
+            owner_id = None
+    elif data['owner_email']:
+        owner_id = owners.by_email.get(data['owner_email'].lower())
+        if owner_id is None:
+            errors.append(f"Unknown owner_email: {data['owner_email']}")
+    else:
+        owner_id = default_owner_id
+        if owner_id is None:
+            errors.append('Missing owner_email and no default owner given')
+
+    if errors:
+        return None, errors
+
+    values = (owner_id, data['name'], data['category'], data['description'] or '',
+              data['image_path'], latitude, longitude, data['address'], data['phone'],
+              data['hours'] or '09:00-17:00')
+    return values, []
+
+class Owners:
+    """Lookup user (email lowercase -> id) yang dimuat sekali per import"""
+
+    def __init__(self, conn):
+        self.by_email = {email.lower(): user_id for user_id, email in conn.execute('SELECT id, email FROM users')}
+        self.ids = set(self.by_email.values())
+
+def bump_batch_stats(conn, first_id, last_id):
+    """Counter statistik admin untuk satu batch; dijalankan di transaksi insert-nya"""
+    inserted, pending, new_owners = conn.execute(
+        """SELECT COUNT(*), SUM(NOT is_approved),
+        COUNT(DISTINCT CASE WHEN NOT EXISTS(SELECT 1 FROM umkm older WHERE older.owner_id = umkm.owner_id
+            AND older.id < ?) THEN owner_id END)
+        FROM umkm WHERE id BETWEEN ? AND ?""", (first_id, first_id, last_id)
+    ).fetchone()
+    bump_conn(conn, daily={'umkm_created': inserted},
+              totals={'umkm': inserted, 'umkm_pending': pending or 0, 'umkm_owners': new_owners})
+
+def checkpoint_name(path):
+    """Key ``job_state`` untuk checkpoint import file ``path``"""
+    return 'import:' + hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+
+def load_checkpoint(conn, name):
+    row = conn.execute('SELECT value FROM job_state WHERE name = ?', (name,)).fetchone()
+    return int(row[0] or 0) if row else 0
+
+def save_checkpoint(conn, name, row_number):
+    """Simpan nomor baris terakhir; dijalankan di transaksi batch-nya"""
+    conn.execute(
+        """INSERT INTO job_state (name, value, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at""",
+        (name, str(row_number), datetime.utcnow().isoformat(' '))
+    )
+
+def after_batch(locations):
+    """Invalidasi cache in-process sekali per batch yang di-commit"""
+    invalidate_umkm_cache()
+    invalidate_locations(locations)
+
+def _flush(conn, batch, report, last_row, checkpoint=None):
+    timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    rows = [values + (timestamp, timestamp) for values in batch]
+
+    with conn:  # satu transaksi per batch
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany(INSERT_SQL, rows)
+        # Id AUTOINCREMENT berurutan di dalam satu transaksi write, tapi bisa melompati MAX(id) + 1
+        last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        first_id = last_id - len(rows) + 1
+        ids = range(first_id, last_id + 1)
+        failed = write_hours(conn, [(umkm_id, values[9]) for umkm_id, values in zip(ids, rows)])
+        bump_batch_stats(conn, first_id, last_id)
+        record_conn(conn, ids)
+        if checkpoint:
+            save_checkpoint(conn, checkpoint, last_row)
+
+    if failed:
+        logger.info("%d imported UMKM have unparseable opening hours", len(failed))
+    after_batch([(values[5], values[6]) for values in rows])
+    report.inserted += len(rows)
+    report.batches += 1
+    report.last_committed_row = last_row
+
+def import_umkm(stream, fmt='csv', batch_size=DEFAULT_BATCH_SIZE, start_row=0,
+                default_owner_email=None, approved=True, checkpoint=None):
+    """Import baris dari ``stream``; baris <= ``start_row`` dilewati (resume).
+
+    ``checkpoint`` (opsional) adalah key ``job_state`` tempat nomor baris
+    terakhir disimpan di transaksi setiap batch.
+    """
+    report = ImportReport(start_row)
+    conn = get_db_connection()
+    if conn is None:
+        raise RuntimeError('Database connection failed')
+
+    try:
+        owners = Owners(conn)
+        default_owner_id = None
+        if default_owner_email:
+            default_owner_id = owners.by_email.get(default_owner_email.lower())
+            if default_owner_id is None:
+                raise ValueError(f'Unknown default owner: {default_owner_email}')
+
+        batch = []
+        last_row = start_row
+        for row_number, row in read_rows(stream, fmt):
+            if row_number <= start_row:
+                continue
+
+            report.rows_read += 1
+            last_row = row_number
+            values, errors = validate_row(row, owners, default_owner_id)
+            if errors:
+                report.reject(row_number, errors)
+                continue
+
+            batch.append(values + (1 if approved else 0,))
+            if len(batch) >= batch_size:
+                _flush(conn, batch, report, last_row, checkpoint)
+                batch = []
+
+        if batch:
+            _flush(conn, batch, report, last_row, checkpoint)
+        elif checkpoint and last_row > report.last_committed_row:
+            # Sisa baris setelah batch terakhir semuanya ditolak
+            with conn:
+                save_checkpoint(conn, checkpoint, last_row)
+        report.last_committed_row = last_row
+    finally:
+        conn.close()
+        report.finish()
+
+    return report
+
+def import_file(path, fmt=None, resume=False, **kwargs):
+    """Import dari file; checkpoint disimpan di ``job_state`` dengan key dari path absolutnya"""
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    name = checkpoint_name(path)
+
+    start_row = 0
+    if resume:
+        conn = get_db_connection()
+        try:
+            start_row = load_checkpoint(conn, name)
+        finally:
+            conn.close()
+
+    with open(path, newline='', encoding='utf-8') as f:
+        return import_umkm(f, fmt, start_row=start_row, checkpoint=name, **kwargs)
+
+def import_upload(file_storage, fmt, **kwargs):
+    """Import dari file upload (werkzeug FileStorage)"""
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8', newline='')
+    return import_umkm(stream, fmt, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import UMKM from CSV / NDJSON')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'ndjson'])
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--owner-email', help='Default owner for rows without owner_email')
+    parser.add_argument('--pending', action='store_true', help='Import as not approved')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    args = parser.parse_args()
+
+    print(f"📥 Importing UMKM from {args.path}...")
+    report = import_file(
+        args.path,
+        fmt=args.format,
+        resume=args.resume,
+        batch_size=args.batch_size,
+        default_owner_email=args.owner_email,
+        approved=not args.pending
+    )
+    result = report.to_dict()
+
+    for rejection in result['rejections']:
+        print(f"❌ Row {rejection['row']}: {', '.join(rejection['errors'])}")
+    print(f"✅ Inserted {result['inserted']} rows, rejected {result['rejected']} "
+          f"in {result['duration_seconds']}s ({result['rows_per_second']} rows/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import threading
+import time
+from flask import Response
+from compression import negotiate_encoding, compress, apply_encoding
+from config import Config
+
+class CacheEntry:
+    """Body response yang di-cache beserta versi terkompresinya per encoding"""
+
+    def __init__(self, body, mimetype, expires_at, headers=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+        self.headers = headers or {}
+        self.encoded = {}
+
+    def encode(self, encoding):
+        # Kompresi hanya sekali per encoding, hit berikutnya memakai bytes yang sama
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.body, encoding)
+        return self.encoded[encoding]
+
+class ResponseCache:
+    """Cache response in-process dengan TTL pendek.
+
+    Invalidasi hanya berlaku di worker yang melakukan write, sehingga TTL
+    membatasi seberapa lama worker lain bisa menyajikan data lama. Key dibuat
+    dari parameter yang sudah dinormalisasi handler (bukan query string mentah),
+    dan jumlah entry dibatasi ``max_entries``: entry kedaluwarsa dibuang saat
+    insert, lalu entry tertua jika masih penuh.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at > time.monotonic():
+                return entry
+            self._entries.pop(key, None)
+            return None
+
+    def set(self, key, body, mimetype, headers=None):
+        now = time.monotonic()
+        entry = CacheEntry(body, mimetype, now + self.ttl, headers)
+        with self._lock:
+            for expired in [k for k, e in self._entries.items() if e.expires_at <= now]:
+                del self._entries[expired]
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                # dict mempertahankan urutan insert: buang entry tertua
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[key]
+
+response_cache = ResponseCache(Config.RESPONSE_CACHE_TTL, Config.RESPONSE_CACHE_MAX_ENTRIES)
+
+def build_cached_response(entry):
+    """Buat response dari cache entry, memakai bytes terkompresi jika client mendukung"""
+    response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+    if len(entry.body) < Config.COMPRESSION_MIN_SIZE:
+        response.vary.add('Accept-Encoding')
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding:
+        return apply_encoding(response, encoding, entry.encode(encoding))
+    response.vary.add('Accept-Encoding')
+    return response
+
+def cached_response(key, build, keep_headers=()):
+    """Ambil response dari cache atau panggil ``build()`` lalu simpan hasilnya.
+
+    ``build`` mengembalikan response Flask; hanya response 200 yang di-cache,
+    beserta header ``keep_headers`` yang ikut dikirim ulang saat cache hit.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        headers = {name: response.headers[name] for name in keep_headers if name in response.headers}
+        entry = response_cache.set(key, response.get_data(), response.mimetype, headers)
+    return build_cached_response(entry)
+
+UMKM_CACHE_NAMESPACES = ('umkm_list', 'umkm_top')
+
+def invalidate_umkm_cache():
+    """Dipanggil setelah write yang mengubah listing atau ranking UMKM"""
+    for namespace in UMKM_CACHE_NAMESPACES:
+        response_cache.invalidate(namespace)
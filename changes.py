@@ -0,0 +1,92 @@
+"""Change feed katalog UMKM untuk sinkronisasi inkremental di client.
+
+Setiap write yang mengubah isi ``/api/umkm`` (UMKM baru, approve/unpublish,
+review baru yang menggeser rating, import, hapus) menambah satu baris ke
+tabel ``umkm_changes`` di transaksi yang sama. ``seq`` (autoincrement) adalah
+cursor-nya:
+
+    GET /api/umkm                      -> daftar lengkap + header X-Changes-Cursor
+    GET /api/umkm/changes?since=<seq>  -> baris yang berubah + tombstone
+
+Client memakai header ``X-Changes-Cursor`` dari daftar lengkap ``/api/umkm``
+sebagai cursor awal, lalu cukup memanggil ``?since=`` dengan cursor terakhir.
+Cursor itu dibaca tepat sebelum daftar dibangun dan ikut di-cache bersamanya,
+jadi tetap cocok walaupun daftar berasal dari cache worker lain yang lebih
+lama (mengambil cursor terpisah lewat ``/api/umkm/changes`` tanpa ``since``
+bisa melewatkan perubahan yang belum ada di daftar cache itu). Beberapa perubahan pada
+UMKM yang sama diringkas menjadi satu entri. UMKM yang dihapus atau tidak
+lagi tampil (belum/tidak di-approve) dikirim sebagai id di ``deleted``.
+
+Log lama dipangkas dengan ``flask --app app prune-changes``; cursor yang
+lebih tua dari batas pangkas mendapat 410 sehingga client sync ulang penuh.
+"""
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, text
+from config import Config
+from models import db, get_db_connection, UmkmChange
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'umkm_changes'
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+def record(umkm_ids, op=UPSERT):
+    """Catat perubahan di session aktif; dipanggil sebelum commit write-nya"""
+    if umkm_ids:
+        now = datetime.utcnow()
+        db.session.execute(insert(UmkmChange), [{'umkm_id': umkm_id, 'op': op, 'changed_at': now}
+                                                for umkm_id in umkm_ids])
+
+def record_conn(conn, umkm_ids, op=UPSERT):
+    """Sama dengan ``record`` lewat koneksi sqlite3 (transaksi milik pemanggil)"""
+    now = datetime.utcnow().isoformat(' ')
+    conn.executemany('INSERT INTO umkm_changes (umkm_id, op, changed_at) VALUES (?, ?, ?)',
+                     [(umkm_id, op, now) for umkm_id in umkm_ids])
+
+def current_cursor():
+    return db.session.query(func.coalesce(func.max(UmkmChange.seq), 0)).scalar()
+
+def pruned_through():
+    """Seq terakhir yang sudah dipangkas (cursor di bawahnya tidak valid lagi)"""
+    value = db.session.execute(text('SELECT value FROM job_state WHERE name = :name'), {'name': JOB_NAME}).scalar()
+    return json.loads(value)['pruned_through'] if value else 0
+
+def changes_since(since, limit):
+    """(list (umkm_id, op terakhir), cursor berikutnya, masih ada) untuk perubahan setelah ``since``"""
+    # Kolom op ikut baris dengan MAX(seq) (bare column SQLite), yaitu perubahan terakhir per UMKM
+    rows = db.session.execute(text(
+        """SELECT umkm_id, op, MAX(seq) AS last_seq FROM umkm_changes WHERE seq > :since
+        GROUP BY umkm_id ORDER BY last_seq LIMIT :limit"""
+    ), {'since': since, 'limit': limit + 1}).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = rows[-1][2] if rows else since
+    return [(umkm_id, op) for umkm_id, op, _ in rows], cursor, has_more
+
+def prune(max_age_days=None, db_path=None):
+    """Hapus log yang lebih tua dari ``CHANGE_LOG_RETENTION_DAYS``; kembalikan jumlah baris"""
+    max_age_days = max_age_days if max_age_days is not None else Config.CHANGE_LOG_RETENTION_DAYS
+    cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).isoformat(' ')
+    started = time.perf_counter()
+    conn = get_db_connection(db_path)
+    try:
+        with conn:
+            last_seq = conn.execute('SELECT MAX(seq) FROM umkm_changes WHERE changed_at < ?', (cutoff,)).fetchone()[0]
+            if last_seq is None:
+                return 0
+            deleted = conn.execute('DELETE FROM umkm_changes WHERE seq <= ?', (last_seq,)).rowcount
+            conn.execute(
+                """INSERT INTO job_state (name, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at""",
+                (JOB_NAME, json.dumps({'pruned_through': last_seq}), datetime.utcnow().isoformat(' '))
+            )
+    finally:
+        conn.close()
+
+    logger.info("Pruned %d change log rows in %.1f ms", deleted, (time.perf_counter() - started) * 1000)
+    return deleted
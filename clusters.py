@@ -0,0 +1,200 @@
+"""Cluster marker peta per zoom untuk ``GET /api/umkm/clusters``.
+
+Viewport (``bbox=west,south,east,north``) dipecah menjadi tile Web Mercator
+256px di zoom yang diminta. Tile yang belum di-cache dihitung bersama dengan
+satu ``GROUP BY`` ke grid 4x4 sel per tile (sel 64px) lewat index
+``(latitude, longitude)``: hasilnya jumlah, centroid dan bbox tiap sel,
+sehingga client hanya menerima belasan marker per tile berapa pun jumlah UMKM
+di dalamnya. Sel berisi satu UMKM dikirim sebagai titik, dan mulai ``CLUSTER_POINT_ZOOM`` semua UMKM dikirim sebagai titik.
+
+Hasil per tile di-cache in-process (``CLUSTER_CACHE_TTL``). Write yang
+mengubah marker di peta (UMKM baru, approve/unpublish, hapus, import)
+memanggil ``invalidate_locations`` dengan koordinatnya, yang hanya membuang
+tile yang memuat titik itu di setiap zoom. Seperti cache response, invalidasi
+berlaku di worker yang melakukan write; worker lain mengikuti TTL.
+"""
+import math
+import threading
+import time
+from sqlalchemy import Integer, case, cast, func
+from config import Config
+from models import db, UMKM
+
+TILE_SIZE = 256
+CELL_SIZE = 64
+CELLS_PER_TILE = TILE_SIZE // CELL_SIZE
+# Sel grid adalah tile di zoom + CELL_ZOOM_OFFSET
+CELL_ZOOM_OFFSET = int(math.log2(CELLS_PER_TILE))
+
+MAX_ZOOM = 22
+MAX_TILES = 64
+MAX_LATITUDE = 85.05112878
+
+def _tile_x(longitude, zoom):
+    n = 1 << zoom
+    return min(n - 1, max(0, int((longitude + 180.0) / 360.0 * n)))
+
+def _tile_y(latitude, zoom):
+    n = 1 << zoom
+    latitude = math.radians(min(MAX_LATITUDE, max(-MAX_LATITUDE, latitude)))
+    return min(n - 1, max(0, int((1.0 - math.asinh(math.tan(latitude)) / math.pi) / 2.0 * n)))
+
+def _longitude(x, zoom):
+    return x / (1 << zoom) * 360.0 - 180.0
+
+def _latitude(y, zoom):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << zoom)))))
+
+def tiles_for_bbox(west, south, east, north, zoom):
+    """Daftar (x, y) tile di ``zoom`` yang menutupi bbox"""
+    x_range = range(_tile_x(west, zoom), _tile_x(east, zoom) + 1)
+    y_range = range(_tile_y(north, zoom), _tile_y(south, zoom) + 1)
+    return [(x, y) for y in y_range for x in x_range]
+
+def parse_request(args):
+    """Kembalikan (bbox, zoom, pesan error atau None) dari query string"""
+    try:
+        zoom = int(args.get('zoom', ''))
+    except ValueError:
+        return None, None, 'zoom must be an integer'
+    if not 0 <= zoom <= MAX_ZOOM:
+        return None, None, f'zoom must be between 0 and {MAX_ZOOM}'
+
+    try:
+        bbox = [float(value) for value in args.get('bbox', '').split(',')]
+    except ValueError:
+        bbox = []
+    if len(bbox) != 4 or not all(math.isfinite(value) for value in bbox):
+        return None, None, 'bbox must be west,south,east,north'
+    west, south, east, north = bbox
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        return None, None, 'bbox must be west,south,east,north within -180..180 / -90..90'
+
+    if len(tiles_for_bbox(west, south, east, north, zoom)) > MAX_TILES:
+        return None, None, 'bbox is too large for this zoom'
+    return bbox, zoom, None
+
+def _bounds_filter(x_range, y_range, zoom):
+    """Filter UMKM approved di persegi tile ``x_range`` x ``y_range``"""
+    n = 1 << zoom
+    west, east = _longitude(x_range.start, zoom), _longitude(x_range.stop, zoom)
+    north, south = _latitude(y_range.start, zoom), _latitude(y_range.stop, zoom)
+    # Interval setengah terbuka supaya titik di garis batas hanya masuk satu tile
+    return (
+        UMKM.is_approved == True,
+        UMKM.latitude >= south if y_range.stop == n else UMKM.latitude > south,
+        UMKM.latitude <= north,
+        UMKM.longitude >= west,
+        UMKM.longitude <= east if x_range.stop == n else UMKM.longitude < east,
+    )
+
+def _point(umkm_id, name, category, latitude, longitude):
+    return {'type': 'point', 'id': umkm_id, 'name': name, 'category': category,
+            'latitude': latitude, 'longitude': longitude}
+
+def _point_query():
+    return db.session.query(UMKM.id, UMKM.name, UMKM.category, UMKM.latitude, UMKM.longitude)
+
+def _points(x_range, y_range, zoom, tiles):
+    for row in _point_query().filter(*_bounds_filter(x_range, y_range, zoom)).order_by(UMKM.id):
+        key = (_tile_x(row.longitude, zoom), _tile_y(row.latitude, zoom))
+        if key in tiles:
+            tiles[key].append(_point(*row))
+
+def _clusters(x_range, y_range, zoom, tiles):
+    cell_zoom = zoom + CELL_ZOOM_OFFSET
+    west = _longitude(x_range.start, zoom)
+    cell_width = 360.0 / (1 << cell_zoom)
+    first_column = x_range.start * CELLS_PER_TILE
+    first_row = y_range.start * CELLS_PER_TILE
+    rows = len(y_range) * CELLS_PER_TILE
+    # Kolom sel linear terhadap longitude; baris sel tidak (Mercator), jadi batas lintangnya dihitung di sini
+    cell_x = func.min(cast((UMKM.longitude - west) / cell_width, Integer), len(x_range) * CELLS_PER_TILE - 1)
+    cell_y = case(
+        *[(UMKM.latitude > _latitude(first_row + row + 1, cell_zoom), row) for row in range(rows - 1)],
+        else_=rows - 1
+    )
+    result = db.session.query(
+        cell_x, cell_y, func.count(UMKM.id), func.min(UMKM.id),
+        func.avg(UMKM.latitude), func.avg(UMKM.longitude),
+        func.min(UMKM.longitude), func.min(UMKM.latitude),
+        func.max(UMKM.longitude), func.max(UMKM.latitude)
+    ).filter(*_bounds_filter(x_range, y_range, zoom)).group_by(cell_x, cell_y).all()
+
+    singles = {}
+    for column, row, count, first_id, latitude, longitude, *bbox in result:
+        key = ((first_column + column) // CELLS_PER_TILE, (first_row + row) // CELLS_PER_TILE)
+        if key not in tiles:
+            continue
+        if count == 1:
+            singles[first_id] = key
+        else:
+            tiles[key].append({'type': 'cluster', 'count': count, 'latitude': latitude,
+                               'longitude': longitude, 'bbox': bbox})
+    if singles:
+        for row in _point_query().filter(UMKM.id.in_(singles)).order_by(UMKM.id):
+            tiles[singles[row.id]].append(_point(*row))
+
+def build_tiles(keys, zoom):
+    """Hitung fitur untuk tile ``keys`` (x, y) dengan satu query agregat untuk semuanya"""
+    tiles = {key: [] for key in keys}
+    x_range = range(min(x for x, _ in keys), max(x for x, _ in keys) + 1)
+    y_range = range(min(y for _, y in keys), max(y for _, y in keys) + 1)
+    if zoom >= Config.CLUSTER_POINT_ZOOM:
+        _points(x_range, y_range, zoom, tiles)
+    else:
+        _clusters(x_range, y_range, zoom, tiles)
+    return tiles
+
+class TileCache:
+    """Fitur per tile (zoom, x, y) dengan TTL dan jumlah entry maksimum"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            self._entries.pop(key, None)
+            return None
+
+    def set(self, key, features):
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                # dict mempertahankan urutan insert: buang entry tertua
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (features, time.monotonic() + self.ttl)
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+tile_cache = TileCache(Config.CLUSTER_CACHE_TTL, Config.CLUSTER_CACHE_MAX_TILES)
+
+def get_features(bbox, zoom):
+    keys = tiles_for_bbox(*bbox, zoom)
+    tiles = {key: tile_cache.get((zoom, *key)) for key in keys}
+    missing = [key for key, features in tiles.items() if features is None]
+    if missing:
+        for key, features in build_tiles(missing, zoom).items():
+            tile_cache.set((zoom, *key), features)
+            tiles[key] = features
+    return [feature for key in keys for feature in tiles[key]]
+
+def invalidate_locations(locations):
+    """Buang tile yang memuat salah satu (latitude, longitude) di semua zoom; dipanggil setelah commit"""
+    keys = set()
+    for latitude, longitude in locations:
+        if latitude is None or longitude is None:
+            continue
+        for zoom in range(MAX_ZOOM + 1):
+            keys.add((zoom, _tile_x(longitude, zoom), _tile_y(latitude, zoom)))
+    if keys:
+        tile_cache.invalidate(keys)
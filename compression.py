@@ -0,0 +1,57 @@
+import gzip
+from flask import request
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # brotli opsional, fallback ke gzip saja
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+    'text/plain'
+}
+
+def supported_encodings():
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+def negotiate_encoding():
+    """Pilih encoding terbaik dari header Accept-Encoding, atau None"""
+    return request.accept_encodings.best_match(supported_encodings())
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.GZIP_LEVEL, mtime=0)
+
+def apply_encoding(response, encoding, body):
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(body))
+    response.vary.add('Accept-Encoding')
+    return response
+
+def compress_response(response):
+    """after_request hook: kompres response JSON/teks yang cukup besar"""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if response.content_length is None or response.content_length < Config.COMPRESSION_MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    return apply_encoding(response, encoding, compress(response.get_data(), encoding))
+
+def init_compression(app):
+    app.after_request(compress_response)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,9 +8,13 @@ class Config:
     BASEDIR = os.path.abspath(os.path.dirname(__file__))
     
     # SQLite configuration
-    SQLITE_DB = os.path.join(BASEDIR, 'kawan_umkm.db')
+    SQLITE_DB = os.getenv('SQLITE_DB', os.path.join(BASEDIR, 'kawan_umkm.db'))
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{SQLITE_DB}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    # Engine read-only untuk request GET (lihat db_routing)
+    SQLALCHEMY_BINDS = {'readonly': f"sqlite:///file:{SQLITE_DB}?mode=ro&uri=true"}
+    DB_READ_ROUTING = os.getenv('DB_READ_ROUTING', '1') == '1'
     
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-super-secret-key-here-change-this-in-production')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key-here-change-this-in-production')
@@ -23,6 +28,77 @@ class Config:
     SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
     SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
 
+    # Response compression & caching
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+
+    # Metrics (/metrics, Prometheus text format)
+    METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'kawan_umkm_metrics'))
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', 20))
+
+    # Slow-query log (JSON lines + EXPLAIN QUERY PLAN)
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+    SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', os.path.join(BASEDIR, 'logs', 'slow_queries.log'))
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUPS = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 3))
+
+    # On-demand profiling (header X-Profile: 1, admin only)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '1') == '1'
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASEDIR, 'logs', 'profiles'))
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))
+
+    # Health / readiness probes
+    HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', 5))
+    HEALTH_MIN_FREE_MB = int(os.getenv('HEALTH_MIN_FREE_MB', 100))
+
+    # Idempotency-Key untuk POST /api/umkm dan POST /api/umkm/<id>/reviews
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 3600))
+    IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 30))
+    IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 120))
+
+    # Ranking top rated (rata-rata Bayesian, lihat rankings.py)
+    RANKING_PRIOR_WEIGHT = float(os.getenv('RANKING_PRIOR_WEIGHT', 5))
+    RANKING_PRIOR_MEAN = float(os.getenv('RANKING_PRIOR_MEAN', 3.5))
+    RANKING_MEAN_CACHE_TTL = float(os.getenv('RANKING_MEAN_CACHE_TTL', 300))
+
+    # Rekomendasi item-item (lihat recommendations.py)
+    RECOMMENDATION_TOP_K = int(os.getenv('RECOMMENDATION_TOP_K', 20))
+    RECOMMENDATION_CACHE_TTL = float(os.getenv('RECOMMENDATION_CACHE_TTL', 300))
+
+    # Zona waktu jam buka UMKM (WIB = UTC+7)
+    BUSINESS_UTC_OFFSET_HOURS = float(os.getenv('BUSINESS_UTC_OFFSET_HOURS', 7))
+
+    # Penghapusan: UMKM dengan review + favorite lebih dari ini dihapus di background (lihat deletion.py)
+    DELETE_INLINE_LIMIT = int(os.getenv('DELETE_INLINE_LIMIT', 1000))
+    DELETE_BATCH_SIZE = int(os.getenv('DELETE_BATCH_SIZE', 2000))
+
+    # Umur log perubahan katalog untuk /api/umkm/changes (lihat changes.py)
+    CHANGE_LOG_RETENTION_DAYS = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', 30))
+
+    # Server-Sent Events /api/stream (lihat events.py); tiap koneksi memakai satu thread gunicorn
+    SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', 0.5))
+    SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', 15))
+    SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))
+    SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', 2))
+    SSE_MAX_DURATION = float(os.getenv('SSE_MAX_DURATION', 300))
+    SSE_RETENTION = int(os.getenv('SSE_RETENTION', 3600))
+
+    # Cluster marker peta /api/umkm/clusters (lihat clusters.py)
+    CLUSTER_POINT_ZOOM = int(os.getenv('CLUSTER_POINT_ZOOM', 16))
+    CLUSTER_CACHE_TTL = float(os.getenv('CLUSTER_CACHE_TTL', 60))
+    CLUSTER_CACHE_MAX_TILES = int(os.getenv('CLUSTER_CACHE_MAX_TILES', 5000))
+
+    # View halaman detail dijumlahkan di memori lalu ditulis tiap interval (lihat owner_analytics.py)
+    ANALYTICS_VIEW_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_VIEW_FLUSH_INTERVAL', 10))
+
+    # Schema bootstrap saat create_app(); set 0 jika memakai `flask init-db` sebagai release step
+    DB_BOOTSTRAP_ON_START = os.getenv('DB_BOOTSTRAP_ON_START', '1') == '1'
+
     @staticmethod
     def init_app(app):
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
@@ -0,0 +1,40 @@
+"""Routing engine database: baca lewat engine read-only, tulis lewat engine utama.
+
+Request GET/HEAD ke blueprint di ``READ_BLUEPRINTS`` memakai bind
+``readonly`` (``mode=ro`` + ``PRAGMA query_only``) sehingga di mode WAL
+pembaca tidak berebut koneksi dan transaksi dengan penulis. Flush/commit
+dan request lain selalu memakai engine utama.
+"""
+import sqlite3
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from config import Config
+
+READ_ONLY_BIND = 'readonly'
+READ_METHODS = ('GET', 'HEAD')
+READ_BLUEPRINTS = ('umkm', 'user', 'admin')
+
+def is_read_request():
+    return (Config.DB_READ_ROUTING and has_request_context()
+            and request.method in READ_METHODS and request.blueprint in READ_BLUEPRINTS)
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and is_read_request():
+            engine = self._db.engines.get(READ_ONLY_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _set_query_only(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA query_only = 1')
+
+def init_db_routing(app):
+    from models import db
+
+    with app.app_context():
+        engine = db.engines.get(READ_ONLY_BIND)
+    if engine is not None:
+        event.listen(engine, 'connect', _set_query_only)
@@ -0,0 +1,204 @@
+"""Penghapusan user dan UMKM tanpa memuat data anak ke memori.
+
+Foreign key anak (reviews, favorites, skor, jam buka, ...) memakai
+``ON DELETE CASCADE`` dan relationship ORM ``passive_deletes=True``, jadi
+menghapus baris induk cukup satu ``DELETE``; database yang menghapus anaknya.
+
+UMKM dengan review + favorite sampai ``DELETE_INLINE_LIMIT`` tetap dihapus
+di dalam request, hanya file gambarnya yang dibersihkan di background.
+Penghapusan besar (UMKM populer, user beserta semua UMKM-nya) dicatat di
+tabel ``deletion_jobs`` lalu dikerjakan thread background per worker: baris
+anak dihapus per ``DELETE_BATCH_SIZE`` dalam transaksi pendek supaya write
+lain tidak tertahan lama, counter statistik admin dan skor ranking ikut
+dikoreksi per batch, baru kemudian baris induk dan file gambarnya.
+
+Selama job masih queued/running, ``DELETE`` ulang untuk target yang sama
+mengembalikan job yang ada (``active_job``) dan moderasi melewati UMKM-nya.
+
+Setiap langkah aman diulang; job yang tertinggal karena worker mati
+dilanjutkan dengan ``flask --app app run-deletions``.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+from sqlalchemy import and_, func, or_
+from cache import invalidate_umkm_cache
+from changes import record_conn, DELETE
+from events import publish_conn, umkm_channels
+from clusters import invalidate_locations
+from moderation import counts_as_pending
+from config import Config
+from models import db, get_db_connection, DeletionJob, Review, Favorite
+from rankings import remove_reviews
+from stats_rollup import bump_conn
+
+logger = logging.getLogger(__name__)
+
+_pending = queue.Queue()
+_worker_pid = None
+
+def _worker():
+    while True:
+        task, args = _pending.get()
+        try:
+            task(*args)
+        except Exception:
+            logger.exception("Background deletion task failed")
+
+def _submit(task, *args):
+    global _worker_pid
+    if _worker_pid != os.getpid():
+        _worker_pid = os.getpid()
+        threading.Thread(target=_worker, name='deletion', daemon=True).start()
+    _pending.put((task, args))
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+                logger.debug("Deleted image file: %s", path)
+        except OSError:
+            logger.exception("Failed to delete image file %s", path)
+
+def remove_files_later(paths):
+    """Hapus file gambar di background setelah baris database-nya di-commit"""
+    if paths:
+        _submit(remove_files, list(paths))
+
+def child_counts(umkm_id):
+    """(jumlah review, jumlah favorite) satu UMKM; dua COUNT lewat index umkm_id dalam satu query"""
+    return tuple(db.session.query(
+        db.session.query(func.count(Review.id)).filter(Review.umkm_id == umkm_id).scalar_subquery(),
+        db.session.query(func.count(Favorite.id)).filter(Favorite.umkm_id == umkm_id).scalar_subquery()
+    ).one())
+
+def active_job(umkm_id=None, owner_id=None):
+    """Id job queued/running untuk UMKM ``umkm_id`` atau user ``owner_id`` (beserta UMKM-nya), atau None"""
+    targets = []
+    if umkm_id is not None:
+        targets.append(and_(DeletionJob.kind == 'umkm', DeletionJob.target_id == umkm_id))
+    if owner_id is not None:
+        targets.append(and_(DeletionJob.kind == 'user', DeletionJob.target_id == owner_id))
+    return db.session.query(DeletionJob.id).filter(
+        or_(*targets), DeletionJob.status.in_(DeletionJob.ACTIVE_STATUSES)
+    ).order_by(DeletionJob.id).limit(1).scalar()
+
+def schedule(kind, target_id, files, requested_by):
+    """Commit session (beserta job baru) lalu kerjakan job di background; kembalikan id job"""
+    job = DeletionJob(kind=kind, target_id=target_id, files=json.dumps(files), requested_by=requested_by)
+    db.session.add(job)
+    db.session.commit()
+    _submit(run_job, job.id)
+    logger.info("Deletion scheduled", extra={'job_id': job.id, 'kind': kind, 'target_id': target_id})
+    return job.id
+
+def _delete_batches(conn, table, column, value, metric, before_delete=None):
+    """Hapus baris ``table`` milik ``column = value`` per batch, kurangi counter ``metric``"""
+    while True:
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            ids = [row[0] for row in conn.execute(f'SELECT id FROM {table} WHERE {column} = ? LIMIT ?',
+                                                  (value, Config.DELETE_BATCH_SIZE))]
+            if not ids:
+                return
+            placeholders = ', '.join('?' * len(ids))
+            if before_delete:
+                before_delete(conn, placeholders, ids)
+            deleted = conn.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids).rowcount
+            bump_conn(conn, totals={metric: -deleted})
+
+def _unscore_reviews(conn, placeholders, ids):
+    reviews = conn.execute(
+        f"""SELECT umkm_id, CAST(rating AS INTEGER),
+        CAST(strftime('%s', COALESCE(created_at, CURRENT_TIMESTAMP)) AS INTEGER)
+        FROM reviews WHERE id IN ({placeholders})""", ids
+    ).fetchall()
+    remove_reviews(conn, reviews)
+    # Rating di listing UMKM tersebut berubah
+    record_conn(conn, {review[0] for review in reviews})
+
+def delete_umkm(conn, umkm_id):
+    # Skor UMKM ini ikut terhapus (cascade), tidak perlu dikoreksi per review
+    _delete_batches(conn, 'reviews', 'umkm_id', umkm_id, 'reviews')
+    _delete_batches(conn, 'favorites', 'umkm_id', umkm_id, 'favorites')
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(
+            'SELECT owner_id, is_approved, latitude, longitude, moderation_status FROM umkm WHERE id = ?', (umkm_id,)
+        ).fetchone()
+        if row is None:
+            return
+        only_umkm = conn.execute('SELECT NOT EXISTS(SELECT 1 FROM umkm WHERE owner_id = ? AND id != ?)',
+                                 (row[0], umkm_id)).fetchone()[0]
+        bump_conn(conn, totals={'umkm': -1, 'umkm_pending': -1 if counts_as_pending(row[1], row[4]) else 0,
+                                'umkm_owners': -1 if only_umkm else 0})
+        record_conn(conn, [umkm_id], DELETE)
+        publish_conn(conn, 'umkm_deleted', [(umkm_channels(umkm_id, row[0]), {'umkm_id': umkm_id})])
+        conn.execute('DELETE FROM umkm WHERE id = ?', (umkm_id,))
+    invalidate_locations([(row[2], row[3])])
+
+def delete_user(conn, user_id):
+    for (umkm_id,) in conn.execute('SELECT id FROM umkm WHERE owner_id = ?', (user_id,)).fetchall():
+        delete_umkm(conn, umkm_id)
+    # Review user di UMKM lain: skor UMKM tersebut dikurangi di batch yang sama
+    _delete_batches(conn, 'reviews', 'user_id', user_id, 'reviews', before_delete=_unscore_reviews)
+    _delete_batches(conn, 'favorites', 'user_id', user_id, 'favorites')
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT role FROM users WHERE id = ?', (user_id,)).fetchone()
+        if row is None:
+            return
+        bump_conn(conn, totals={'users': 0 if row[0] == 'admin' else -1})
+        # Token reset password ikut terhapus, log moderasi user ini menjadi moderator_id NULL
+        conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+
+HANDLERS = {
+    'umkm': delete_umkm,
+    'user': delete_user,
+}
+
+def run_job(job_id, db_path=None):
+    """Kerjakan satu job penghapusan; kembalikan status akhirnya"""
+    conn = get_db_connection(db_path)
+    try:
+        job = conn.execute('SELECT kind, target_id, files FROM deletion_jobs WHERE id = ?', (job_id,)).fetchone()
+        if job is None:
+            return None
+        with conn:
+            conn.execute("UPDATE deletion_jobs SET status = 'running' WHERE id = ?", (job_id,))
+
+        try:
+            HANDLERS[job['kind']](conn, job['target_id'])
+        except Exception as e:
+            logger.exception("Deletion job %s failed", job_id)
+            with conn:
+                conn.execute("UPDATE deletion_jobs SET status = 'failed', error = ? WHERE id = ?", (str(e), job_id))
+            return 'failed'
+
+        remove_files(json.loads(job['files'] or '[]'))
+        with conn:
+            conn.execute("UPDATE deletion_jobs SET status = 'done', error = NULL, finished_at = ? WHERE id = ?",
+                         (datetime.utcnow().isoformat(' '), job_id))
+    finally:
+        conn.close()
+
+    # Cache listing di worker ini; worker lain mengikuti TTL cache
+    invalidate_umkm_cache()
+    logger.info("Deletion job finished", extra={'job_id': job_id, 'kind': job['kind'], 'target_id': job['target_id']})
+    return 'done'
+
+def run_pending(db_path=None):
+    """Kerjakan ulang job yang belum selesai (queued/running/failed); kembalikan jumlahnya"""
+    conn = get_db_connection(db_path)
+    try:
+        job_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM deletion_jobs WHERE status IN ('queued', 'running', 'failed') ORDER BY id")]
+    finally:
+        conn.close()
+    for job_id in job_ids:
+        run_job(job_id, db_path)
+    return len(job_ids)
@@ -173,11 +173,11 @@ def verify_password_reset_token(token):
         ).first()
         
         if not reset_token:
-            print(f"❌ Token not found or already used: {token}")
+            print("❌ Token not found or already used")
             return None
             
         if reset_token.expires_at < datetime.utcnow():
-            print(f"❌ Token expired: {token}")
+            print("❌ Token expired")
             return None
             
         print(f"✅ Token valid for user {reset_token.user_id}")
@@ -194,7 +194,7 @@ def mark_token_used(token):
         if reset_token:
             reset_token.used = True
             db.session.commit()
-            print(f"✅ Token marked as used: {token}")
+            print("✅ Token marked as used")
     except Exception as e:
         print(f"❌ Error marking token used: {e}")
         db.session.rollback()
@@ -1,3 +1,4 @@
+import logging
 import smtplib
 import os
 from email.mime.text import MIMEText
@@ -6,23 +7,22 @@ from datetime import datetime, timedelta
 import secrets
 from models import db, PasswordResetToken, User
 from config import Config
+from logging_config import mask_email
 import socket
 
+logger = logging.getLogger(__name__)
+
 class EmailService:
     def __init__(self):
         self.smtp_server = Config.SMTP_SERVER
         self.smtp_port = Config.SMTP_PORT
         self.sender_email = Config.EMAIL_USER
         self.sender_password = Config.EMAIL_PASSWORD
-        print(f"📧 EmailService initialized")
-        print(f"   SMTP: {self.smtp_server}:{self.smtp_port}")
-        print(f"   Email: {self.sender_email}")
-        print(f"   Password: {'✅ Set' if self.sender_password else '❌ Missing'}")
 
     def test_smtp_connection(self):
         """Test koneksi SMTP tanpa mengirim email"""
         try:
-            print(f"🧪 Testing SMTP connection to {self.smtp_server}:{self.smtp_port}")
+            logger.debug("Testing SMTP connection to %s:%s", self.smtp_server, self.smtp_port)
             
             # Test koneksi network dasar
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -31,14 +31,13 @@ class EmailService:
             sock.close()
             
             if result != 0:
-                print(f"❌ Cannot reach {self.smtp_server}:{self.smtp_port}")
+                logger.error("Cannot reach %s:%s", self.smtp_server, self.smtp_port)
                 return False
                 
-            print("✅ Network connection successful")
             return True
             
         except Exception as e:
-            print(f"❌ Network test failed: {e}")
+            logger.error("SMTP network test failed: %s", e)
             return False
 
     def send_password_reset_email(self, user_email, reset_link, user_name):
@@ -47,8 +46,6 @@ class EmailService:
             if not self.test_smtp_connection():
                 return False
 
-            print(f"📤 Preparing email to: {user_email}")
-
             # Email content yang sangat sederhana
             subject = "Reset Password - Kawan UMKM"
             
@@ -76,8 +73,6 @@ Tim Kawan UMKM
             
             msg.attach(MIMEText(text_content, 'plain'))
             
-            print(f"🔐 Connecting to SMTP...")
-            
             # Gunakan approach yang berbeda berdasarkan port
             if self.smtp_port == 465:
                 # SSL connection
@@ -87,39 +82,30 @@ Tim Kawan UMKM
                 server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=15)
                 server.starttls()
             
-            print("✅ SMTP connected")
-            
             # Login
-            print(f"🔑 Logging in...")
             server.login(self.sender_email, self.sender_password)
-            print("✅ Login successful")
             
             # Send email
             server.send_message(msg)
-            print("✅ Email sent")
             
             server.quit()
-            print("✅ Connection closed")
-            
-            print(f"🎉 Email successfully sent to {user_email}")
+            logger.info("Email sent to %s", mask_email(user_email))
             return True
             
         except smtplib.SMTPAuthenticationError as e:
-            print(f"❌ SMTP Authentication Failed")
-            print(f"   Error: {e}")
-            print("💡 Solution: Check App Password and 2FA settings")
+            logger.error("SMTP authentication failed (check App Password and 2FA settings): %s", e)
             return False
             
         except smtplib.SMTPException as e:
-            print(f"❌ SMTP Error: {e}")
+            logger.error("SMTP error: %s", e)
             return False
             
         except socket.timeout:
-            print(f"❌ Connection timeout to {self.smtp_server}:{self.smtp_port}")
+            logger.error("Connection timeout to %s:%s", self.smtp_server, self.smtp_port)
             return False
             
-        except Exception as e:
-            print(f"❌ Unexpected error: {e}")
+        except Exception:
+            logger.exception("Unexpected error sending email")
             return False
 
 def create_password_reset_token(user_id):
@@ -141,11 +127,11 @@ def create_password_reset_token(user_id):
         db.session.add(new_token)
         db.session.commit()
         
-        print(f"✅ Reset token created for user {user_id}")
+        logger.debug("Reset token created for user %s", user_id)
         return token
         
-    except Exception as e:
-        print(f"❌ Error creating reset token: {e}")
+    except Exception:
+        logger.exception("Error creating reset token")
         db.session.rollback()
         return None
 
@@ -165,8 +151,8 @@ def verify_password_reset_token(token):
             
         return reset_token.user_id
         
-    except Exception as e:
-        print(f"❌ Error verifying token: {e}")
+    except Exception:
+        logger.exception("Error verifying reset token")
         return None
 
 def mark_token_used(token):
@@ -176,6 +162,6 @@ def mark_token_used(token):
         if reset_token:
             reset_token.used = True
             db.session.commit()
-    except Exception as e:
-        print(f"❌ Error marking token used: {e}")
+    except Exception:
+        logger.exception("Error marking reset token used")
         db.session.rollback()
@@ -0,0 +1,232 @@
+"""Server-Sent Events untuk review baru, moderasi dan penghapusan UMKM.
+
+Publisher (review baru, moderasi, hapus UMKM) menulis event ke tabel
+``events`` di transaksi yang sama dengan write-nya. Tabel itu sekaligus jalur
+fan-out antar worker gunicorn: setiap worker yang punya subscriber menjalankan
+satu thread poller yang membaca event baru tiap ``SSE_POLL_INTERVAL`` detik
+lalu membagikannya ke queue subscriber di proses itu. Hanya ada satu query per
+worker per interval, berapa pun jumlah client.
+
+    GET /api/stream?umkm_id=1,2     event untuk halaman detail UMKM
+    GET /api/stream?owner=me        semua UMKM milik user (JWT lewat header
+                                    Authorization atau ?token=, karena
+                                    EventSource tidak bisa mengirim header)
+
+- Reconnect: ``id`` event adalah ``seq``; browser mengirim ``Last-Event-ID``
+  dan event yang terlewat diputar ulang dari tabel (disimpan ``SSE_RETENTION``
+  detik).
+- Heartbeat: komentar ``: ping`` tiap ``SSE_HEARTBEAT`` detik supaya proxy
+  tidak memutus koneksi idle.
+- Backpressure: queue per subscriber dibatasi ``SSE_QUEUE_SIZE``. Client yang
+  terlalu lambat diputus dengan event ``overflow`` dan menyambung ulang lewat
+  ``Last-Event-ID``, sehingga memori worker tidak ikut tumbuh.
+- Setiap koneksi memakai satu thread gunicorn (gthread), jadi jumlahnya per
+  worker dibatasi ``SSE_MAX_CLIENTS`` dan koneksi ditutup setelah
+  ``SSE_MAX_DURATION`` detik (browser otomatis reconnect).
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+import jwt
+from flask import Blueprint, Response, jsonify, request
+from sqlalchemy import insert
+from config import Config
+from models import db, get_db_connection, Event
+
+logger = logging.getLogger(__name__)
+
+events_bp = Blueprint('events', __name__)
+
+MAX_UMKM_PER_STREAM = 50
+FETCH_LIMIT = 1000
+PRUNE_INTERVAL = 60
+RECONNECT_MS = 3000
+
+def umkm_channels(umkm_id, owner_id):
+    return [f'umkm:{umkm_id}', f'owner:{owner_id}']
+
+def _rows(event, items):
+    now = datetime.utcnow()
+    return [{'channels': ' '.join(channels), 'event': event, 'data': json.dumps(data, default=str), 'created_at': now}
+            for channels, data in items]
+
+def publish(event, items):
+    """Tulis event di session aktif (terkirim setelah commit); ``items`` berisi (channels, data)"""
+    if items:
+        db.session.execute(insert(Event), _rows(event, items))
+
+def publish_conn(conn, event, items):
+    """Sama dengan ``publish`` lewat koneksi sqlite3 (transaksi milik pemanggil)"""
+    conn.executemany(
+        'INSERT INTO events (channels, event, data, created_at) VALUES (:channels, :event, :data, :created_at)',
+        [{**row, 'created_at': row['created_at'].isoformat(' ')} for row in _rows(event, items)]
+    )
+
+class Subscriber:
+    def __init__(self, channels, after):
+        self.channels = channels
+        # seq terakhir yang sudah dikirim (atau Last-Event-ID dari client)
+        self.after = after
+        self.queue = queue.Queue(maxsize=Config.SSE_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+class Broker:
+    """Pub/sub in-process; satu thread poller per worker membaca tabel events"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poller_pid = None
+        self._last_seq = None
+
+    def subscribe(self, channels, after):
+        with self._lock:
+            if self._poller_pid == os.getpid() and len(self._subscribers) >= Config.SSE_MAX_CLIENTS:
+                return None
+            if self._poller_pid != os.getpid():
+                # Proses baru (worker hasil fork): state milik master tidak berlaku
+                self._subscribers = set()
+                self._last_seq = None
+                self._poller_pid = os.getpid()
+                threading.Thread(target=self._poll, name='sse-poller', daemon=True).start()
+            subscriber = Subscriber(channels, after)
+            self._subscribers.add(subscriber)
+            # Mundurkan poller supaya event setelah ``after`` (replay) ikut terbaca
+            self._last_seq = after if self._last_seq is None else min(self._last_seq, after)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _fetch(self, conn, after):
+        return conn.execute('SELECT seq, channels, event, data FROM events WHERE seq > ? ORDER BY seq LIMIT ?',
+                            (after, FETCH_LIMIT)).fetchall()
+
+    def _dispatch(self, rows, subscribers):
+        for seq, channels, event, data in rows:
+            channels = set(channels.split())
+            for subscriber in subscribers:
+                if seq > subscriber.after and not channels.isdisjoint(subscriber.channels):
+                    subscriber.offer((seq, event, data))
+                    subscriber.after = seq
+
+    def _prune(self, conn):
+        cutoff = (datetime.utcnow() - timedelta(seconds=Config.SSE_RETENTION)).isoformat(' ')
+        with conn:
+            conn.execute('DELETE FROM events WHERE created_at < ?', (cutoff,))
+
+    def _poll(self):
+        conn = None
+        pruned_at = 0.0
+        while True:
+            time.sleep(Config.SSE_POLL_INTERVAL)
+            with self._lock:
+                subscribers = list(self._subscribers)
+                start = self._last_seq
+                if not subscribers:
+                    self._last_seq = None
+                    continue
+            try:
+                conn = conn or get_db_connection()
+                rows = self._fetch(conn, start)
+                with self._lock:
+                    self._dispatch(rows, subscribers)
+                    # Jika subscribe() memundurkan cursor selama fetch, baca ulang dari sana
+                    if rows and self._last_seq == start:
+                        self._last_seq = rows[-1][0]
+                if time.monotonic() - pruned_at > PRUNE_INTERVAL:
+                    self._prune(conn)
+                    pruned_at = time.monotonic()
+            except Exception:
+                logger.exception("SSE poller failed")
+                if conn is not None:
+                    conn.close()
+                conn = None
+
+broker = Broker()
+
+def current_seq():
+    conn = get_db_connection()
+    try:
+        return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM events').fetchone()[0]
+    finally:
+        conn.close()
+
+def _format(seq, event, data):
+    return f'id: {seq}\nevent: {event}\ndata: {data}\n\n'
+
+def _generate(subscriber):
+    started = time.monotonic()
+    try:
+        yield f'retry: {RECONNECT_MS}\n\n'
+        while time.monotonic() - started < Config.SSE_MAX_DURATION:
+            if subscriber.overflowed:
+                yield 'event: overflow\ndata: {}\n\n'
+                return
+            try:
+                seq, event, data = subscriber.queue.get(timeout=Config.SSE_HEARTBEAT)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            yield _format(seq, event, data)
+    finally:
+        broker.unsubscribe(subscriber)
+
+def _current_user_id():
+    token = request.args.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256']).get('user_id')
+    except jwt.InvalidTokenError:
+        return None
+
+@events_bp.route('/stream', methods=['GET'])
+def stream():
+    channels = set()
+    if request.args.get('umkm_id'):
+        try:
+            umkm_ids = [int(value) for value in request.args['umkm_id'].split(',') if value.strip()]
+        except ValueError:
+            return jsonify({'error': 'umkm_id must be a comma-separated list of integers'}), 400
+        if len(umkm_ids) > MAX_UMKM_PER_STREAM:
+            return jsonify({'error': f'At most {MAX_UMKM_PER_STREAM} umkm_id per stream'}), 400
+        channels.update(f'umkm:{umkm_id}' for umkm_id in umkm_ids)
+    if request.args.get('owner') == 'me':
+        user_id = _current_user_id()
+        if user_id is None:
+            return jsonify({'error': 'Valid token required for owner stream'}), 401
+        channels.add(f'owner:{user_id}')
+    if not channels:
+        return jsonify({'error': 'Provide umkm_id and/or owner=me'}), 400
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        after = int(last_event_id) if last_event_id else current_seq()
+    except ValueError:
+        after = current_seq()
+
+    subscriber = broker.subscribe(channels, after)
+    if subscriber is None:
+        response = jsonify({'error': 'Too many live streams on this worker, retry later'})
+        response.headers['Retry-After'] = str(RECONNECT_MS // 1000)
+        return response, 503
+
+    response = Response(_generate(subscriber), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    # Juga jika client putus sebelum generator sempat berjalan
+    response.call_on_close(lambda: broker.unsubscribe(subscriber))
+    return response
@@ -0,0 +1,96 @@
+"""Konfigurasi gunicorn (otomatis dibaca dari working directory).
+
+Aplikasi di-preload di master: import, pembuatan app dan bootstrap schema
+terjadi sekali, lalu worker di-fork dan berbagi memori hasil import. Hook
+``post_fork`` membuang connection pool warisan master; waktu boot setiap
+worker (fork sampai siap menerima request) dicatat di log.
+
+Worker ``gthread`` dengan beberapa thread: bcrypt, kirim email SMTP dan
+upload besar sebagian besar menunggu (I/O atau C tanpa GIL), jadi satu
+request lambat tidak lagi memblokir seluruh service. Jumlah worker dihitung
+dari core yang tersedia dan dibatasi memori (``WORKER_MEMORY_MB`` per
+worker); SQLite memakai WAL + busy timeout (lihat ``models``) sehingga aman
+dibaca banyak proses sekaligus sementara penulisan tetap berurutan.
+
+Environment:
+    PORT=5000               port yang di-bind
+    WEB_CONCURRENCY=        jumlah worker (default: dihitung otomatis)
+    GUNICORN_THREADS=4      thread per worker
+    WORKER_MEMORY_MB=150    perkiraan RSS per worker untuk batas memori
+    GUNICORN_TIMEOUT=120
+
+Load test (lihat ``bench/run_benchmark.py``):
+
+    python -m bench.generate_data --db /tmp/kawan_bench.db
+    SQLITE_DB=/tmp/kawan_bench.db WEB_CONCURRENCY=1 gunicorn app:app &
+    python -m bench.run_benchmark --db /tmp/kawan_bench.db --mode http \\
+        --url http://127.0.0.1:5000 --threads 16 --only umkm.list,umkm.detail
+
+Ulangi dengan ``WEB_CONCURRENCY`` = 1, 2, ... sampai jumlah core untuk melihat
+throughput naik seiring jumlah worker.
+"""
+import os
+import time
+
+_started = time.perf_counter()
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def available_memory_mb():
+    """Batas memori cgroup (container) jika ada, selain itu MemAvailable dari /proc"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 50:
+            return int(value) // (1024 * 1024)
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+def default_workers():
+    workers = available_cores() * 2 + 1
+    memory_mb = available_memory_mb()
+    if memory_mb:
+        workers = min(workers, max(1, memory_mb // int(os.getenv('WORKER_MEMORY_MB', 150))))
+    return workers
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY') or default_workers())
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle worker secara berkala (jitter supaya tidak restart bersamaan)
+max_requests = 1000
+max_requests_jitter = 100
+
+preload_app = True
+
+def when_ready(server):
+    server.log.info("Master ready in %.1f ms (app preloaded), %s workers x %s threads",
+                    (time.perf_counter() - _started) * 1000, server.cfg.workers, server.cfg.threads)
+
+def pre_fork(server, worker):
+    worker.fork_started = time.perf_counter()
+
+def post_fork(server, worker):
+    from bootstrap import after_fork
+    after_fork(server.app.wsgi())
+
+def post_worker_init(worker):
+    boot_ms = (time.perf_counter() - worker.fork_started) * 1000
+    worker.log.info("Worker %s booted in %.1f ms", worker.pid, boot_ms)
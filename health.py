@@ -0,0 +1,132 @@
+"""Liveness & readiness probes.
+
+``/health/live`` (dan ``/api/health``) tidak melakukan I/O sama sekali.
+``/health/ready`` (dan ``/health``) memeriksa database, WAL, connection pool,
+ruang disk upload dan backlog queue background. Hasil readiness di-cache
+selama ``HEALTH_CACHE_TTL`` detik sehingga probe yang sering dari platform
+tidak menambah beban database.
+"""
+import os
+import shutil
+import threading
+import time
+from flask import Blueprint, jsonify
+from sqlalchemy import text
+from config import Config
+from models import db
+import logging_config
+import slow_queries
+
+health_bp = Blueprint('health', __name__)
+
+SERVICE_NAME = 'Kawan UMKM API'
+
+_cache = {'expires_at': 0.0, 'result': None}
+_cache_lock = threading.Lock()
+
+def check_database():
+    started = time.perf_counter()
+    try:
+        journal_mode = db.session.execute(text('PRAGMA journal_mode')).scalar()
+        db.session.execute(text('SELECT 1'))
+        return {
+            'status': 'ok',
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'journal_mode': journal_mode,
+        }
+    except Exception as e:
+        db.session.rollback()
+        return {'status': 'error', 'error': str(e)}
+    finally:
+        db.session.remove()
+
+def check_wal():
+    wal_path = f'{Config.SQLITE_DB}-wal'
+    size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+    return {'status': 'ok', 'wal_bytes': size}
+
+def check_pool():
+    pools = {'status': 'ok'}
+    for bind_key, engine in db.engines.items():
+        pool = engine.pool
+        stats = {'class': type(pool).__name__}
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        pools[bind_key or 'primary'] = stats
+    return pools
+
+def check_disk():
+    try:
+        usage = shutil.disk_usage(Config.UPLOAD_FOLDER if os.path.exists(Config.UPLOAD_FOLDER) else Config.BASEDIR)
+    except OSError as e:
+        return {'status': 'error', 'error': str(e)}
+    free_mb = usage.free // (1024 * 1024)
+    return {
+        'status': 'ok' if free_mb >= Config.HEALTH_MIN_FREE_MB else 'degraded',
+        'free_mb': free_mb,
+        'total_mb': usage.total // (1024 * 1024),
+    }
+
+def check_queues():
+    return {
+        'status': 'ok',
+        'log_queue': logging_config.log_queue.qsize(),
+        'log_records_dropped': logging_config.NonBlockingQueueHandler.dropped,
+        'slow_query_queue': slow_queries.pending_count(),
+    }
+
+READINESS_CHECKS = {
+    'database': check_database,
+    'wal': check_wal,
+    'pool': check_pool,
+    'disk': check_disk,
+    'queues': check_queues,
+}
+
+def readiness():
+    """Jalankan semua check, atau kembalikan hasil cache jika masih dalam TTL"""
+    now = time.monotonic()
+    if _cache['result'] is not None and _cache['expires_at'] > now:
+        return _cache['result']
+
+    with _cache_lock:
+        # Request lain mungkin sudah mengisi cache selama menunggu lock
+        if _cache['result'] is not None and _cache['expires_at'] > time.monotonic():
+            return _cache['result']
+
+        checks = {}
+        for name, check in READINESS_CHECKS.items():
+            try:
+                checks[name] = check()
+            except Exception as e:
+                checks[name] = {'status': 'error', 'error': str(e)}
+
+        if checks['database']['status'] == 'error':
+            status = 'unavailable'
+        elif any(check['status'] != 'ok' for check in checks.values()):
+            status = 'degraded'
+        else:
+            status = 'ready'
+
+        result = {
+            'status': status,
+            'service': SERVICE_NAME,
+            'checked_at': time.time(),
+            'checks': checks,
+        }
+        _cache['result'] = result
+        _cache['expires_at'] = time.monotonic() + Config.HEALTH_CACHE_TTL
+        return result
+
+@health_bp.route('/health/live')
+@health_bp.route('/api/health')
+def live():
+    return jsonify({'status': 'healthy', 'service': SERVICE_NAME})
+
+@health_bp.route('/health/ready')
+@health_bp.route('/health')
+def ready():
+    result = readiness()
+    return jsonify(result), 503 if result['status'] == 'unavailable' else 200
@@ -0,0 +1,154 @@
+"""Header ``Idempotency-Key`` untuk endpoint POST yang sering di-retry client.
+
+Response pertama untuk sebuah key (per user dan per endpoint) disimpan di
+tabel ``idempotency_keys`` selama ``IDEMPOTENCY_TTL`` detik. Retry dengan key
+yang sama mendapat response tersebut apa adanya (header
+``Idempotent-Replayed: true``) tanpa menjalankan upload, insert maupun commit
+lagi. Request duplikat yang datang saat request pertama masih berjalan
+menunggu hasilnya, bukan ikut berjalan. Key yang dipakai ulang dengan isi
+request berbeda (hash body, lihat ``_fingerprint``) ditolak dengan 422.
+
+Penyimpanan memakai SQLite (koneksi sqlite3 terpisah dari session request)
+supaya berlaku lintas worker gunicorn. Response 5xx tidak disimpan sehingga
+retry berikutnya dijalankan ulang.
+"""
+import hashlib
+import logging
+import sqlite3
+import time
+from functools import wraps
+import jwt
+from flask import Response, jsonify, make_response, request
+from config import Config
+from models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+def _scope():
+    """Identitas pemilik key: user dari JWT (tanpa query database), atau anonim"""
+    token = request.headers.get('Authorization', '')
+    user_id = 'anon'
+    if token.startswith('Bearer '):
+        try:
+            user_id = jwt.decode(token[7:], Config.JWT_SECRET_KEY, algorithms=['HS256']).get('user_id', 'anon')
+        except jwt.InvalidTokenError:
+            pass
+    return f'{user_id}:{request.method}:{request.path}'
+
+def _store_key(idempotency_key):
+    return hashlib.sha256(f'{_scope()}:{idempotency_key}'.encode()).hexdigest()
+
+def _fingerprint():
+    """sha256 isi request; form multipart di-hash per field karena boundary-nya berubah tiap dibangun ulang"""
+    digest = hashlib.sha256(f'{request.mimetype}\0'.encode())
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f'{name}={value}\0'.encode())
+        for name, storage in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f'{name}:{storage.filename}\0'.encode())
+            for chunk in iter(lambda: storage.stream.read(65536), b''):
+                digest.update(chunk)
+            storage.stream.seek(0)
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+def _claim(conn, key, request_hash):
+    """True jika request ini pemilik key (baru, atau mengambil alih key yang ditinggal)"""
+    now = time.time()
+    with conn:
+        conn.execute('DELETE FROM idempotency_keys WHERE expires_at < ?', (now,))
+        try:
+            conn.execute(
+                """INSERT INTO idempotency_keys (key, request_hash, status, locked_at, expires_at)
+                VALUES (?, ?, 'pending', ?, ?)""",
+                (key, request_hash, now, now + Config.IDEMPOTENCY_TTL)
+            )
+            return True
+        except sqlite3.IntegrityError:
+            pass
+        # Worker yang memegang key mati di tengah request: ambil alih (hanya untuk isi request yang sama)
+        cursor = conn.execute(
+            """UPDATE idempotency_keys SET locked_at = ?, request_hash = ? WHERE key = ? AND status = 'pending'
+            AND locked_at < ? AND (request_hash IS NULL OR request_hash = ?)""",
+            (now, request_hash, key, now - Config.IDEMPOTENCY_LOCK_TIMEOUT, request_hash)
+        )
+        return cursor.rowcount == 1
+
+def _body_mismatch(conn, key, request_hash):
+    """True jika key sudah dipakai request dengan isi berbeda (baris lama tanpa hash dianggap cocok)"""
+    row = conn.execute('SELECT request_hash FROM idempotency_keys WHERE key = ?', (key,)).fetchone()
+    return row is not None and row['request_hash'] is not None and row['request_hash'] != request_hash
+
+def _wait_for_result(conn, key):
+    deadline = time.monotonic() + Config.IDEMPOTENCY_WAIT
+    while time.monotonic() < deadline:
+        row = conn.execute(
+            'SELECT status, response_status, response_body, content_type FROM idempotency_keys WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            # Request pertama gagal (5xx) dan melepas key
+            return None
+        if row['status'] == 'done':
+            return row
+        time.sleep(POLL_INTERVAL)
+    return False
+
+def _replay(row):
+    response = Response(row['response_body'], status=row['response_status'], content_type=row['content_type'])
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view):
+    """Decorator untuk handler POST; tanpa header Idempotency-Key handler berjalan seperti biasa"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        idempotency_key = request.headers.get(HEADER)
+        if not idempotency_key:
+            return view(*args, **kwargs)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        key = _store_key(idempotency_key)
+        conn = get_db_connection()
+        if conn is None:
+            return view(*args, **kwargs)
+
+        try:
+            request_hash = _fingerprint()
+            while not _claim(conn, key, request_hash):
+                if _body_mismatch(conn, key, request_hash):
+                    return jsonify({'error': f'{HEADER} was already used with a different request body'}), 422
+                row = _wait_for_result(conn, key)
+                if row is False:
+                    return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+                if row is not None:
+                    logger.info("Replaying idempotent response", extra={'path': request.path})
+                    return _replay(row)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                with conn:
+                    conn.execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+                raise
+
+            with conn:
+                if response.status_code >= 500 or response.is_streamed:
+                    conn.execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+                else:
+                    conn.execute(
+                        """UPDATE idempotency_keys SET status = 'done', response_status = ?,
+                        response_body = ?, content_type = ? WHERE key = ?""",
+                        (response.status_code, response.get_data(), response.content_type, key)
+                    )
+            return response
+        finally:
+            conn.close()
+
+    return wrapper
@@ -0,0 +1,151 @@
+"""Structured logging yang tidak memblokir thread request.
+
+Handler di root logger hanya memasukkan record ke queue (``QueueHandler``);
+penulisan JSON ke stdout dilakukan oleh thread ``QueueListener`` terpisah.
+
+Environment:
+    LOG_LEVEL=INFO                                  level default
+    LOG_LEVELS=umkm_routes=DEBUG,sqlalchemy=WARNING level per module
+    LOG_DEBUG_SAMPLE_RATE=0.1                       fraksi record DEBUG yang ditulis
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+# Atribut bawaan LogRecord; atribut lain dianggap field tambahan dari ``extra=``
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', 10000)))
+
+_listener = None
+_listener_pid = None
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            data['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+class RequestIdFilter(logging.Filter):
+    """Tambahkan request id ke record (dijalankan di thread request, sebelum masuk queue)"""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+class DebugSamplingFilter(logging.Filter):
+    """Hanya tulis sebagian record DEBUG supaya log volume tinggi tetap murah"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Jika queue penuh, record dibuang (dan dihitung) daripada memblokir request"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Format message & traceback di thread pemanggil, sisanya (JSON) di listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+def mask_email(address):
+    """Samarkan alamat email untuk log: ``r***@example.com``"""
+    local, _, domain = (address or '').partition('@')
+    return f'{local[:1]}***@{domain}' if domain else '***'
+
+def _parse_levels(value):
+    levels = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, level = item.partition('=')
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def start_listener():
+    """Start thread penulis log; aman dipanggil ulang (mis. setelah fork worker)"""
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+    if _listener_pid not in (None, os.getpid()):
+        # Proses hasil fork: lock dan isi queue warisan master tidak bisa dipakai lagi
+        log_queue.__init__(log_queue.maxsize)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+def stop_listener():
+    global _listener
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+    _listener = None
+
+def setup_logging():
+    root = logging.getLogger()
+    if any(isinstance(handler, NonBlockingQueueHandler) for handler in root.handlers):
+        start_listener()
+        return
+
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in _parse_levels(os.getenv('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(DebugSamplingFilter(float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))))
+    root.handlers = [handler]
+
+    start_listener()
+    atexit.register(stop_listener)
+
+def _assign_request_id():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+def _add_request_id_header(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+def init_request_logging(app):
+    setup_logging()
+    app.before_request(_assign_request_id)
+    app.after_request(_add_request_id_header)
@@ -0,0 +1,253 @@
+"""Metrics per request (latency, jumlah query, waktu DB) dalam format Prometheus.
+
+Setiap worker gunicorn menyimpan snapshot counter-nya ke ``METRICS_DIR``
+secara berkala; endpoint ``/metrics`` menggabungkan semua snapshot sehingga
+angka yang terlihat adalah total seluruh proses, bukan hanya worker yang
+kebetulan menjawab request.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+
+HISTOGRAM_BUCKETS = {
+    'http_request_duration_seconds': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'db_queries_per_request': (1, 2, 5, 10, 20, 50, 100, 250)
+}
+
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'Total HTTP requests'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency'),
+    'db_queries_per_request': ('histogram', 'SQL statements executed per request'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent executing SQL statements'),
+    'db_query_budget_exceeded_total': ('counter', 'Requests that exceeded the SQL query budget (possible N+1)')
+}
+
+ARCHIVE_FILE = '_archive.json'
+
+logger = logging.getLogger(__name__)
+
+class Registry:
+    """Counter dan histogram in-process, aman dipakai dari beberapa thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return json.dumps([name, sorted(labels.items())])
+
+    def inc(self, name, labels, value=1):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = self._key(name, labels)
+        buckets = HISTOGRAM_BUCKETS[name]
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(buckets), 'sum': 0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {k: {'buckets': list(v['buckets']), 'sum': v['sum'], 'count': v['count']}
+                               for k, v in self.histograms.items()}
+            }
+
+def merge_snapshots(snapshots):
+    merged = {'counters': {}, 'histograms': {}}
+    for snapshot in snapshots:
+        for key, value in snapshot.get('counters', {}).items():
+            merged['counters'][key] = merged['counters'].get(key, 0) + value
+        for key, value in snapshot.get('histograms', {}).items():
+            target = merged['histograms'].get(key)
+            if target is None:
+                merged['histograms'][key] = {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+                continue
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], value['buckets'])]
+            target['sum'] += value['sum']
+            target['count'] += value['count']
+    return merged
+
+registry = Registry()
+
+_worker_file = None
+_last_flush = 0.0
+
+def _snapshot_path():
+    global _worker_file
+    if _worker_file is None or not _worker_file.startswith(f'{os.getpid()}-'):
+        # pid + waktu start supaya worker baru dengan pid yang sama tidak menimpa file lama
+        _worker_file = f'{os.getpid()}-{int(time.time() * 1000)}.json'
+    return os.path.join(Config.METRICS_DIR, _worker_file)
+
+def _write_json(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def flush(force=False):
+    """Tulis snapshot worker ini ke METRICS_DIR (paling sering sekali per interval)"""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < Config.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    try:
+        os.makedirs(Config.METRICS_DIR, exist_ok=True)
+        _write_json(_snapshot_path(), registry.snapshot())
+    except OSError as e:
+        logger.warning("Failed to write metrics snapshot: %s", e)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def collect():
+    """Gabungkan snapshot semua worker; snapshot worker yang sudah mati dipindah ke archive"""
+    flush(force=True)
+    own_path = _snapshot_path()
+    try:
+        names = os.listdir(Config.METRICS_DIR)
+    except OSError:
+        return registry.snapshot()
+
+    lock_path = os.path.join(Config.METRICS_DIR, '.lock')
+    with open(lock_path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(Config.METRICS_DIR, ARCHIVE_FILE)
+        archive = _read_json(archive_path)
+        live = []
+        dead = []
+        for name in names:
+            if not name.endswith('.json') or name == ARCHIVE_FILE:
+                continue
+            path = os.path.join(Config.METRICS_DIR, name)
+            pid = name.split('-', 1)[0]
+            if path == own_path or (pid.isdigit() and _pid_alive(int(pid))):
+                live.append(_read_json(path))
+            else:
+                dead.append(path)
+
+        if dead:
+            archive = merge_snapshots([archive] + [_read_json(path) for path in dead])
+            _write_json(archive_path, archive)
+            for path in dead:
+                os.remove(path)
+
+    return merge_snapshots([archive] + live)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+def render_prometheus(snapshot):
+    lines = []
+    series = {}
+    for key, value in snapshot['counters'].items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append((labels, value))
+    for key, value in snapshot['histograms'].items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append((labels, value))
+
+    for name in sorted(series):
+        kind, help_text = METRIC_HELP.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(series[name], key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            for bound, count in zip(HISTOGRAM_BUCKETS[name], value['buckets']):
+                lines.append(f'{name}_bucket{_format_labels(labels + [["le", str(bound)]])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels + [["le", "+Inf"]])} {value["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value["sum"]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+# SQLAlchemy hooks: dipasang di class Engine sehingga semua engine ikut terhitung
+# Waktu mulai disimpan di execution context per statement (bukan stack di conn.info), sehingga
+# statement yang gagal tidak meninggalkan sisa di koneksi pool
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._metrics_started
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_time += duration
+
+def _before_request():
+    g.request_start = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_time = 0.0
+
+def _after_request(response):
+    if 'request_start' not in g:
+        return response
+
+    duration = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = {'method': request.method, 'route': route}
+
+    registry.inc('http_requests_total', dict(labels, status=str(response.status_code)))
+    registry.observe('http_request_duration_seconds', labels, duration)
+    registry.observe('db_queries_per_request', labels, g.sql_queries)
+    registry.inc('db_query_duration_seconds_total', labels, g.sql_time)
+
+    if g.sql_queries > Config.QUERY_BUDGET:
+        registry.inc('db_query_budget_exceeded_total', labels)
+        logger.warning("Possible N+1: %s %s ran %d queries (budget %d)",
+                       request.method, route, g.sql_queries, Config.QUERY_BUDGET)
+
+    # Untuk response streaming query baru berjalan setelah header dikirim
+    if not response.is_streamed:
+        response.headers['X-Query-Count'] = str(g.sql_queries)
+        response.headers['Server-Timing'] = f'db;dur={g.sql_time * 1000:.1f}, app;dur={duration * 1000:.1f}'
+
+    flush()
+    return response
+
+def metrics_endpoint():
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {Config.METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def init_metrics(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
@@ -1,10 +1,34 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from datetime import datetime
 import bcrypt
+import logging
+import sqlite3
 import jwt
 from config import Config
+from db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+logger = logging.getLogger(__name__)
+
+def configure_sqlite_connection(conn):
+    """WAL + busy timeout supaya beberapa worker/thread bisa membaca saat ada yang menulis, plus foreign key"""
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+    except sqlite3.OperationalError:
+        # Koneksi read-only tidak bisa mengubah journal mode (sudah diset oleh engine utama)
+        pass
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}')
+    # ON DELETE CASCADE pada foreign key hanya berjalan jika ini aktif (per koneksi)
+    conn.execute('PRAGMA foreign_keys=ON')
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        configure_sqlite_connection(dbapi_connection)
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -18,16 +42,18 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    umkms = db.relationship('UMKM', backref='owner', lazy=True, cascade='all, delete-orphan')
-    reviews = db.relationship('Review', backref='user', lazy=True, cascade='all, delete-orphan')
-    favorites = db.relationship('Favorite', backref='user', lazy=True, cascade='all, delete-orphan')
-    reset_tokens = db.relationship('PasswordResetToken', backref='user', lazy=True, cascade='all, delete-orphan')
+    umkms = db.relationship('UMKM', backref='owner', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    reviews = db.relationship('Review', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    favorites = db.relationship('Favorite', backref='user', lazy=True, cascade='all, delete-orphan',
+                                passive_deletes=True)
+    reset_tokens = db.relationship('PasswordResetToken', backref='user', lazy=True, cascade='all, delete-orphan',
+                                   passive_deletes=True)
 
 class UMKM(db.Model):
     __tablename__ = 'umkm'
     
     id = db.Column(db.Integer, primary_key=True)
-    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     description = db.Column(db.Text)
@@ -38,29 +64,47 @@ class UMKM(db.Model):
     phone = db.Column(db.String(20))
     hours = db.Column(db.String(50), default='09:00-17:00')
     is_approved = db.Column(db.Boolean, default=True)
+    # Hasil moderasi terakhir selain approve ('rejected' / 'unpublished') beserta alasannya (lihat moderation.py)
+    moderation_status = db.Column(db.String(20))
+    moderation_reason = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    reviews = db.relationship('Review', backref='umkm', lazy=True, cascade='all, delete-orphan')
-    favorites = db.relationship('Favorite', backref='umkm', lazy=True, cascade='all, delete-orphan')
+    reviews = db.relationship('Review', backref='umkm', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    favorites = db.relationship('Favorite', backref='umkm', lazy=True, cascade='all, delete-orphan',
+                                passive_deletes=True)
+    score = db.relationship('UmkmScore', uselist=False, lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    opening_hours = db.relationship('UmkmHours', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    moderation_log = db.relationship('UmkmModeration', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+
+    # Range koordinat per tile untuk cluster peta (lihat clusters.py)
+    __table_args__ = (
+        db.Index('ix_umkm_location', 'latitude', 'longitude'),
+    )
 
 class Review(db.Model):
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
-    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     rating = db.Column(db.Integer, nullable=False)
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Keyset pagination feed review (terbaru / rating) dan histogram per UMKM
+    __table_args__ = (
+        db.Index('ix_reviews_umkm_created', 'umkm_id', 'created_at', 'id'),
+        db.Index('ix_reviews_umkm_rating', 'umkm_id', 'rating', 'id'),
+    )
 
 class Favorite(db.Model):
     __tablename__ = 'favorites'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Unique constraint untuk mencegah duplikasi favorite
@@ -70,18 +114,170 @@ class PasswordResetToken(db.Model):
     __tablename__ = 'password_reset_tokens'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     token = db.Column(db.String(255), unique=True, nullable=False)
     expires_at = db.Column(db.DateTime, nullable=False)
     used = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class UmkmScore(db.Model):
+    """Skor ranking per UMKM, diperbarui inkremental saat review masuk (lihat rankings.py)"""
+    __tablename__ = 'umkm_scores'
+    
+    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), primary_key=True)
+    category = db.Column(db.String(50), nullable=False)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    bayes_score = db.Column(db.Float, nullable=False, default=0)
+    trending_7d = db.Column(db.Float, nullable=False, default=0)
+    trending_30d = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_umkm_scores_bayes', 'bayes_score'),
+        db.Index('ix_umkm_scores_trending_7d', 'trending_7d'),
+        db.Index('ix_umkm_scores_trending_30d', 'trending_30d'),
+        db.Index('ix_umkm_scores_category_bayes', 'category', 'bayes_score'),
+        db.Index('ix_umkm_scores_category_trending_7d', 'category', 'trending_7d'),
+        db.Index('ix_umkm_scores_category_trending_30d', 'category', 'trending_30d'),
+    )
+
+class UmkmHours(db.Model):
+    """Interval jam buka dalam menit sejak Senin 00:00 waktu lokal (lihat opening_hours.py)"""
+    __tablename__ = 'umkm_hours'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), nullable=False, index=True)
+    start_minute = db.Column(db.Integer, nullable=False)
+    end_minute = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_umkm_hours_window', 'start_minute', 'end_minute'),
+    )
+
+class UmkmModeration(db.Model):
+    """Log moderasi admin (approve/reject/unpublish) beserta alasannya (lihat moderation.py)"""
+    __tablename__ = 'umkm_moderation'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), nullable=False, index=True)
+    action = db.Column(db.String(20), nullable=False)
+    reason = db.Column(db.Text)
+    moderator_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UmkmSimilarity(db.Model):
+    """Top-k tetangga item-item per UMKM hasil job rekomendasi (lihat recommendations.py)"""
+    __tablename__ = 'umkm_similarities'
+    
+    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), primary_key=True)
+    similar_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+class JobState(db.Model):
+    """Watermark / status terakhir job batch (mis. rekomendasi inkremental)"""
+    __tablename__ = 'job_state'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DailyStat(db.Model):
+    """Counter harian statistik admin per hari lokal (lihat stats_rollup.py)"""
+    __tablename__ = 'daily_stats'
+    
+    day = db.Column(db.String(10), primary_key=True)
+    metric = db.Column(db.String(30), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class StatTotal(db.Model):
+    """Total berjalan statistik admin (lihat stats_rollup.py)"""
+    __tablename__ = 'stats_totals'
+    
+    metric = db.Column(db.String(30), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class UmkmDailyStat(db.Model):
+    """Counter harian per UMKM untuk dashboard pemilik (lihat owner_analytics.py)"""
+    __tablename__ = 'umkm_daily_stats'
+    
+    umkm_id = db.Column(db.Integer, db.ForeignKey('umkm.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.String(10), primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    reviews = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    favorites = db.Column(db.Integer, nullable=False, default=0)
+
+class DeletionJob(db.Model):
+    """Penghapusan user/UMKM besar yang dikerjakan di background (lihat deletion.py)"""
+    __tablename__ = 'deletion_jobs'
+    
+    # Job yang belum selesai; target-nya sedang dihapus
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    target_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='queued', index=True)
+    # JSON list path file gambar yang dihapus setelah baris database hilang
+    files = db.Column(db.Text)
+    requested_by = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_deletion_jobs_target', 'kind', 'target_id', 'status'),
+    )
+
+class UmkmChange(db.Model):
+    """Log perubahan katalog UMKM untuk /api/umkm/changes (lihat changes.py)"""
+    __tablename__ = 'umkm_changes'
+    
+    # AUTOINCREMENT: seq tidak boleh dipakai ulang setelah log dipangkas, karena seq adalah cursor client
+    seq = db.Column(db.Integer, primary_key=True)
+    # Tanpa foreign key: tombstone harus tetap ada setelah UMKM-nya dihapus
+    umkm_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class Event(db.Model):
+    """Event SSE (review, moderasi, hapus) untuk fan-out antar worker (lihat events.py)"""
+    __tablename__ = 'events'
+    
+    # AUTOINCREMENT: seq dipakai sebagai Last-Event-ID, tidak boleh dipakai ulang setelah dipangkas
+    seq = db.Column(db.Integer, primary_key=True)
+    # Nama channel dipisah spasi, mis. "umkm:12 owner:3"
+    channels = db.Column(db.String(255), nullable=False)
+    event = db.Column(db.String(30), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class IdempotencyKey(db.Model):
+    """Response tersimpan untuk header Idempotency-Key (lihat idempotency.py)"""
+    __tablename__ = 'idempotency_keys'
+    
+    key = db.Column(db.String(64), primary_key=True)
+    # sha256 isi request pertama; key yang dipakai ulang dengan isi lain ditolak
+    request_hash = db.Column(db.String(64))
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.LargeBinary)
+    content_type = db.Column(db.String(100))
+    # Epoch seconds (ditulis lewat sqlite3 langsung, lintas worker)
+    locked_at = db.Column(db.Float, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
 def hash_password(password):
     """Hash password menggunakan bcrypt"""
     try:
         return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     except Exception as e:
-        print(f"❌ Error hashing password: {e}")
+        logger.error("Error hashing password: %s", e)
         raise e
 
 def check_password(password, hashed):
@@ -89,39 +285,38 @@ def check_password(password, hashed):
     try:
         return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
     except Exception as e:
-        print(f"❌ Error checking password: {e}")
+        logger.error("Error checking password: %s", e)
         return False
 
 def create_tables():
     """Create database tables dengan error handling"""
     try:
-        print("🔧 Creating database tables...")
+        logger.info("Creating database tables")
         db.create_all()
-        print("✅ Database tables created successfully!")
         
         # Check if tables exist
-        tables = ['users', 'umkm', 'reviews', 'favorites', 'password_reset_tokens']
+        tables = ['users', 'umkm', 'reviews', 'favorites', 'password_reset_tokens', 'idempotency_keys', 'umkm_scores',
+                  'umkm_similarities', 'job_state', 'umkm_hours', 'daily_stats', 'stats_totals',
+                  'umkm_moderation', 'deletion_jobs', 'umkm_changes', 'events', 'umkm_daily_stats']
         inspector = db.inspect(db.engine)
         existing_tables = inspector.get_table_names()
         
-        for table in tables:
-            if table in existing_tables:
-                print(f"✅ Table {table} exists")
-            else:
-                print(f"❌ Table {table} missing")
+        missing = [table for table in tables if table not in existing_tables]
+        if missing:
+            logger.error("Tables missing after create_all: %s", ', '.join(missing))
                 
     except Exception as e:
-        print(f"❌ Error creating database tables: {e}")
+        logger.error("Error creating database tables: %s", e)
         raise e
 
 # Fungsi kompatibilitas untuk kode yang sudah ada
-def get_db_connection():
+def get_db_connection(path=None):
     """Helper function for compatibility with existing code"""
     try:
-        import sqlite3
-        conn = sqlite3.connect(Config.SQLITE_DB)
+        conn = sqlite3.connect(path or Config.SQLITE_DB, timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000)
+        configure_sqlite_connection(conn)
         conn.row_factory = sqlite3.Row
         return conn
     except Exception as e:
-        print(f"❌ Error in get_db_connection: {e}")
+        logger.error("Error in get_db_connection: %s", e)
         return None
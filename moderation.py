@@ -0,0 +1,156 @@
+"""Moderasi UMKM secara batch (approve / reject / unpublish).
+
+Satu batch dijalankan sebagai satu ``UPDATE ... WHERE id IN (...)`` dengan
+syarat status awal di klausa WHERE, sehingga id yang benar-benar berubah
+didapat dari ``RETURNING`` walaupun ada admin lain yang memoderasi bersamaan.
+Log moderasi (termasuk alasan reject/unpublish), counter statistik admin, change
+feed katalog, event SSE dan invalidasi cache dilakukan sekali per batch.
+
+Status dan alasan terakhir disimpan di ``UMKM.moderation_status`` /
+``moderation_reason`` sehingga terlihat di daftar admin dan ``/api/my-umkm``:
+
+- ``approve``: UMKM yang belum approve (termasuk yang pernah ditolak) menjadi
+  tampil; status dan alasan dikosongkan.
+- ``reject``: UMKM yang menunggu approve ditandai ``rejected`` dan keluar dari
+  antrean pending (``pendingUMKM``); reject ulang tidak mengubah apa pun.
+- ``unpublish``: UMKM yang sudah tampil disembunyikan lagi (``unpublished``)
+  dan kembali ke antrean pending.
+
+UMKM yang sedang dihapus di background (job ``deletion_jobs`` queued/running
+untuk UMKM itu atau pemiliknya) dilewati dengan status ``deleting``, supaya
+approve tidak menampilkan lagi UMKM yang sudah disembunyikan untuk dihapus.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import and_, exists, insert, or_, update
+from models import db, UMKM, UmkmModeration, DeletionJob
+from cache import invalidate_umkm_cache
+from stats_rollup import bump
+from changes import record as record_change
+from events import publish, umkm_channels
+from clusters import invalidate_locations
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 500
+MAX_REASON_LENGTH = 500
+
+REJECTED = 'rejected'
+UNPUBLISHED = 'unpublished'
+
+# action -> (is_approved yang disyaratkan, is_approved baru, moderation_status baru, status hasil per id)
+ACTIONS = {
+    'approve': (False, True, None, 'approved'),
+    'reject': (False, False, REJECTED, 'rejected'),
+    'unpublish': (True, False, UNPUBLISHED, 'unpublished'),
+}
+
+def status_of(umkm):
+    """Status moderasi untuk ditampilkan: approved / pending / rejected / unpublished"""
+    if umkm.is_approved:
+        return 'approved'
+    return umkm.moderation_status or 'pending'
+
+def counts_as_pending(is_approved, moderation_status):
+    """Apakah UMKM dihitung di counter ``umkm_pending`` (UMKM yang ditolak tidak)"""
+    return not is_approved and moderation_status != REJECTED
+
+def _being_deleted():
+    """Kondisi: UMKM (atau pemiliknya) punya job penghapusan yang belum selesai"""
+    return exists().where(
+        DeletionJob.status.in_(DeletionJob.ACTIVE_STATUSES),
+        or_(and_(DeletionJob.kind == 'umkm', DeletionJob.target_id == UMKM.id),
+            and_(DeletionJob.kind == 'user', DeletionJob.target_id == UMKM.owner_id))
+    )
+
+def validate_request(data):
+    """Kembalikan (ids, action, reason, pesan error atau None)"""
+    action = data.get('action')
+    if action not in ACTIONS:
+        return None, None, None, f"action must be one of: {', '.join(ACTIONS)}"
+
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, None, None, 'ids must be a non-empty list'
+    if len(ids) > MAX_BATCH:
+        return None, None, None, f'At most {MAX_BATCH} ids per request'
+    if not all(isinstance(umkm_id, int) and not isinstance(umkm_id, bool) for umkm_id in ids):
+        return None, None, None, 'ids must be integers'
+
+    reason = (data.get('reason') or '').strip() or None
+    if action != 'approve' and not reason:
+        return None, None, None, f'reason is required to {action}'
+    if reason and len(reason) > MAX_REASON_LENGTH:
+        return None, None, None, f'reason must be at most {MAX_REASON_LENGTH} characters'
+
+    return list(dict.fromkeys(ids)), action, reason, None
+
+def moderate(ids, action, reason, moderator_id):
+    """Jalankan satu batch moderasi; kembalikan list {'id', 'status'} sesuai urutan ``ids``"""
+    required, approved, moderation_status, status = ACTIONS[action]
+    now = datetime.utcnow()
+
+    try:
+        existing, deleting = {}, set()
+        for umkm_id, current_status, being_deleted in db.session.execute(
+                db.select(UMKM.id, UMKM.moderation_status, _being_deleted()).where(UMKM.id.in_(ids))):
+            existing[umkm_id] = current_status
+            if being_deleted:
+                deleting.add(umkm_id)
+        conditions = [UMKM.id.in_(ids), UMKM.is_approved == required, ~_being_deleted()]
+        if action == 'reject':
+            # UMKM yang sudah ditolak tidak ditolak ulang
+            conditions.append(UMKM.moderation_status.is_distinct_from(REJECTED))
+        changed = set(db.session.scalars(
+            update(UMKM).where(*conditions)
+            .values(is_approved=approved, moderation_status=moderation_status, moderation_reason=reason,
+                    updated_at=now)
+            .returning(UMKM.id),
+            execution_options={'synchronize_session': False}
+        ))
+
+        rows = []
+        if changed:
+            db.session.execute(insert(UmkmModeration), [
+                {'umkm_id': umkm_id, 'action': action, 'reason': reason,
+                 'moderator_id': moderator_id, 'created_at': now}
+                for umkm_id in changed
+            ])
+            rows = db.session.execute(db.select(UMKM.id, UMKM.owner_id, UMKM.latitude, UMKM.longitude)
+                                      .where(UMKM.id.in_(changed))).all()
+            publish('moderation', [(umkm_channels(umkm_id, owner_id),
+                                    {'umkm_id': umkm_id, 'action': action, 'reason': reason})
+                                   for umkm_id, owner_id, _, _ in rows])
+        if action != 'reject':
+            # Approve/unpublish mengubah isi katalog publik
+            record_change(changed)
+        if action == 'approve':
+            # UMKM yang sebelumnya ditolak tidak ada di counter pending
+            was_pending = sum(1 for umkm_id in changed if existing.get(umkm_id) != REJECTED)
+            bump(daily={'umkm_approved': len(changed)}, totals={'umkm_pending': -was_pending})
+        elif action == 'reject':
+            bump(totals={'umkm_pending': -len(changed)})
+        elif action == 'unpublish':
+            bump(totals={'umkm_pending': len(changed)})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if changed and action != 'reject':
+        invalidate_umkm_cache()
+        invalidate_locations([(latitude, longitude) for _, _, latitude, longitude in rows])
+    logger.info("UMKM moderated", extra={'action': action, 'requested': len(ids), 'changed': len(changed),
+                                         'moderator_id': moderator_id})
+
+    results = []
+    for umkm_id in ids:
+        if umkm_id in changed:
+            results.append({'id': umkm_id, 'status': status})
+        elif umkm_id in deleting:
+            results.append({'id': umkm_id, 'status': 'deleting'})
+        elif umkm_id in existing:
+            results.append({'id': umkm_id, 'status': 'unchanged'})
+        else:
+            results.append({'id': umkm_id, 'status': 'not_found'})
+    return results
@@ -0,0 +1,229 @@
+"""Parsing jam buka UMKM ke interval menit mingguan + filter "buka sekarang".
+
+Teks bebas di ``UMKM.hours`` diparse saat ditulis menjadi interval
+``[start_minute, end_minute)`` dalam menit sejak Senin 00:00 waktu lokal
+(``BUSINESS_UTC_OFFSET_HOURS``, default WIB) dan disimpan di tabel
+``umkm_hours``. Filter ``open_now`` / ``open_at`` cukup mencari interval
+yang memuat satu menit tertentu lewat index ``(start_minute, end_minute)``.
+
+Format yang dikenali (dipisah koma/titik koma untuk beberapa segmen)::
+
+    09:00-17:00            setiap hari
+    09.00 - 21.00 WIB      titik sebagai pemisah jam juga boleh
+    17:00-02:00            lewat tengah malam
+    24 Jam                 buka terus
+    Senin-Jumat 08:00-17:00, Sabtu 09:00-13:00, Minggu tutup
+
+Teks yang tidak bisa diparse tidak punya interval (tidak pernah muncul di
+filter "buka") dan ditandai untuk pemiliknya lewat ``hours_error``.
+
+    flask --app app backfill-hours   # isi ulang dari data yang sudah ada
+"""
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+from config import Config
+from models import db, get_db_connection, UMKM, UmkmHours
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAYS = {
+    'senin': 0, 'sen': 0, 'monday': 0, 'mon': 0,
+    'selasa': 1, 'sel': 1, 'tuesday': 1, 'tue': 1,
+    'rabu': 2, 'rab': 2, 'wednesday': 2, 'wed': 2,
+    'kamis': 3, 'kam': 3, 'thursday': 3, 'thu': 3,
+    'jumat': 4, "jum'at": 4, 'jum': 4, 'friday': 4, 'fri': 4,
+    'sabtu': 5, 'sab': 5, 'saturday': 5, 'sat': 5,
+    'minggu': 6, 'min': 6, 'ahad': 6, 'sunday': 6, 'sun': 6,
+}
+EVERY_DAY_WORDS = ('setiap hari', 'tiap hari', 'daily', 'every day')
+CLOSED_WORDS = ('tutup', 'libur', 'closed')
+ALWAYS_OPEN = re.compile(r'^(buka\s+)?(24\s*(jam|hours?|h)|24/7|nonstop)$')
+TIME_RANGE = re.compile(r'^(\d{1,2})(?:[:.](\d{2}))?\s*(?:-|–|s/?d|sampai|to)\s*(\d{1,2})(?:[:.](\d{2}))?$')
+DAY_SPEC = re.compile(r"^([a-z']+)(?:\s*(?:-|–|s/?d|sampai)\s*([a-z']+))?\s*:?\s+(.*)$")
+
+class HoursParseError(ValueError):
+    pass
+
+def _minutes(hour, minute):
+    hour, minute = int(hour), int(minute or 0)
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        raise HoursParseError(f'jam tidak valid: {hour:02d}:{minute:02d}')
+    return hour * 60 + minute
+
+def _days(first, last):
+    if first not in DAYS or (last and last not in DAYS):
+        raise HoursParseError(f"hari tidak dikenal: {last if first in DAYS else first}")
+    start, end = DAYS[first], DAYS[last or first]
+    return [(start + offset) % 7 for offset in range((end - start) % 7 + 1)]
+
+def _daily_intervals(spec):
+    """Interval (menit dalam hari, boleh > 1440 untuk lewat tengah malam); [] = tutup"""
+    if ALWAYS_OPEN.match(spec):
+        return [(0, MINUTES_PER_DAY)]
+    if spec in CLOSED_WORDS:
+        return []
+    match = TIME_RANGE.match(spec)
+    if not match:
+        raise HoursParseError(f"format jam tidak dikenali: '{spec}'")
+    start = _minutes(match.group(1), match.group(2))
+    end = _minutes(match.group(3), match.group(4))
+    if start == end:
+        raise HoursParseError(f"jam buka dan tutup sama: '{spec}'")
+    if end < start:
+        end += MINUTES_PER_DAY
+    return [(start, end)]
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def parse_hours(text):
+    """Teks jam buka -> list interval menit mingguan; HoursParseError jika tidak bisa diparse"""
+    if not text or not text.strip():
+        raise HoursParseError('jam buka kosong')
+
+    per_day = {day: [] for day in range(7)}
+    explicit = set()
+    for segment in re.split(r'[,;\n]+', text.lower()):
+        segment = re.sub(r'\b(wib|wita|wit)\b', '', segment).strip()
+        if not segment:
+            continue
+        if segment.startswith('buka '):
+            segment = segment[5:].strip()
+
+        days = None
+        for word in EVERY_DAY_WORDS:
+            if segment.startswith(word):
+                segment = segment[len(word):].strip()
+                break
+        else:
+            match = DAY_SPEC.match(segment)
+            if match and match.group(1) in DAYS:
+                days = _days(match.group(1), match.group(2))
+                segment = match.group(3).strip()
+
+        intervals = _daily_intervals(segment)
+        for day in days if days is not None else range(7):
+            if days is not None and day not in explicit:
+                # Hari yang disebut eksplisit menggantikan jadwal umum sebelumnya
+                per_day[day] = []
+                explicit.add(day)
+            elif days is None and day in explicit:
+                continue
+            per_day[day].extend(intervals)
+
+    weekly = []
+    for day, intervals in per_day.items():
+        for start, end in intervals:
+            start, end = day * MINUTES_PER_DAY + start, day * MINUTES_PER_DAY + end
+            if end > MINUTES_PER_WEEK:
+                # Minggu malam lewat tengah malam -> lanjut Senin pagi
+                weekly.append((0, end - MINUTES_PER_WEEK))
+                end = MINUTES_PER_WEEK
+            weekly.append((start, end))
+    if not weekly and not any(word in text.lower() for word in CLOSED_WORDS):
+        raise HoursParseError('tidak ada jam buka yang dikenali')
+    return _merge(weekly)
+
+def hours_error(text):
+    """Pesan untuk pemilik UMKM jika jam buka tidak bisa diparse, None jika valid"""
+    try:
+        parse_hours(text)
+        return None
+    except HoursParseError as e:
+        return str(e)
+
+def local_now():
+    return datetime.now(timezone(timedelta(hours=Config.BUSINESS_UTC_OFFSET_HOURS)))
+
+def minute_of_week(moment):
+    """Menit sejak Senin 00:00 waktu lokal; datetime tanpa timezone dianggap waktu lokal"""
+    local_tz = timezone(timedelta(hours=Config.BUSINESS_UTC_OFFSET_HOURS))
+    moment = moment.astimezone(local_tz) if moment.tzinfo else moment
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+def open_at_clause(moment):
+    """Kondisi SQLAlchemy: UMKM yang buka pada ``moment``"""
+    minute = minute_of_week(moment)
+    open_ids = db.session.query(UmkmHours.umkm_id) \
+        .filter(UmkmHours.start_minute <= minute, UmkmHours.end_minute > minute)
+    return UMKM.id.in_(open_ids)
+
+def open_filter_from_args(args):
+    """Baca ``open_now=true`` / ``open_at=<ISO datetime>`` dari query string.
+
+    Kembalikan (datetime atau None, pesan error atau None).
+    """
+    if args.get('open_at'):
+        try:
+            return datetime.fromisoformat(args['open_at']), None
+        except ValueError:
+            return None, 'open_at must be an ISO 8601 datetime'
+    if args.get('open_now', '').lower() in ('1', 'true', 'yes'):
+        return local_now(), None
+    return None, None
+
+def set_opening_hours(umkm):
+    """Simpan interval jam buka UMKM baru yang sudah di-flush (satu INSERT di session aktif).
+
+    Kembalikan pesan error parsing atau None.
+    """
+    try:
+        intervals = parse_hours(umkm.hours)
+        error = None
+    except HoursParseError as e:
+        intervals, error = [], str(e)
+    if intervals:
+        # Core insert: satu executemany, bukan INSERT ... RETURNING per interval lewat relationship
+        db.session.execute(insert(UmkmHours), [{'umkm_id': umkm.id, 'start_minute': start, 'end_minute': end}
+                                               for start, end in intervals])
+    return error
+
+def write_hours(conn, rows):
+    """Sama dengan ``sync_hours`` di transaksi yang sedang berjalan milik pemanggil"""
+    failed = []
+    intervals = []
+    for umkm_id, text in rows:
+        try:
+            intervals.extend((umkm_id, start, end) for start, end in parse_hours(text))
+        except HoursParseError as e:
+            failed.append((umkm_id, text, str(e)))
+    conn.executemany('DELETE FROM umkm_hours WHERE umkm_id = ?', [(umkm_id,) for umkm_id, _ in rows])
+    conn.executemany('INSERT INTO umkm_hours (umkm_id, start_minute, end_minute) VALUES (?, ?, ?)', intervals)
+    return failed
+
+def sync_hours(conn, rows):
+    """Tulis ulang interval untuk ``rows`` (id, hours) lewat koneksi sqlite3; kembalikan yang gagal diparse"""
+    with conn:
+        return write_hours(conn, rows)
+
+def backfill(db_path=None, batch_size=1000):
+    """Parse ulang jam buka semua UMKM; kembalikan (jumlah UMKM, daftar yang gagal diparse)"""
+    conn = get_db_connection(db_path)
+    total, failed = 0, []
+    try:
+        last_id = 0
+        while True:
+            rows = conn.execute('SELECT id, hours FROM umkm WHERE id > ? ORDER BY id LIMIT ?',
+                                (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            rows = [(row[0], row[1]) for row in rows]
+            failed.extend(sync_hours(conn, rows))
+            total += len(rows)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+
+    logger.info("Backfilled opening hours for %d UMKM (%d unparseable)", total, len(failed))
+    return total, failed
@@ -0,0 +1,187 @@
+"""Analitik dashboard pemilik UMKM dari rollup harian per UMKM.
+
+Tabel ``umkm_daily_stats`` (umkm_id, day) menyimpan jumlah view halaman
+detail, review, total bintang dan favorite per UMKM per hari lokal
+(``BUSINESS_UTC_OFFSET_HOURS``). Dashboard pemilik dengan banyak outlet cukup
+membaca range ``day`` lewat primary key untuk UMKM miliknya, tanpa menyentuh
+tabel reviews/favorites.
+
+- Review dicatat lewat ``bump`` di transaksi yang sama dengan insert-nya.
+- View datang dari GET (engine read-only), jadi dijumlahkan dulu di memori
+  worker lalu ditulis per ``ANALYTICS_VIEW_FLUSH_INTERVAL`` detik oleh thread
+  background. View yang belum di-flush hilang jika worker mati mendadak.
+
+Data di luar aplikasi (seed, favorite dari script) diisi ulang dengan:
+
+    flask --app app rebuild-owner-analytics
+
+View tidak bisa direkonstruksi dan dibiarkan apa adanya saat rebuild. Seperti
+counter harian admin, riwayat tidak dikurangi saat review dihapus.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date
+from sqlalchemy import bindparam, text
+from config import Config
+from models import db, get_db_connection
+from stats_rollup import local_day, buckets
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('views', 'reviews', 'rating_sum', 'favorites')
+
+BUMP_SQL = """INSERT INTO umkm_daily_stats (umkm_id, day, views, reviews, rating_sum, favorites)
+    VALUES (:umkm_id, :day, :views, :reviews, :rating_sum, :favorites)
+    ON CONFLICT(umkm_id, day) DO UPDATE SET views = views + excluded.views, reviews = reviews + excluded.reviews,
+    rating_sum = rating_sum + excluded.rating_sum, favorites = favorites + excluded.favorites"""
+# UMKM yang terhapus sebelum view di-flush dilewati (foreign key)
+FLUSH_VIEWS_SQL = """INSERT INTO umkm_daily_stats (umkm_id, day, views, reviews, rating_sum, favorites)
+    SELECT :umkm_id, :day, :views, 0, 0, 0 WHERE EXISTS (SELECT 1 FROM umkm WHERE id = :umkm_id)
+    ON CONFLICT(umkm_id, day) DO UPDATE SET views = views + excluded.views"""
+
+def _row(umkm_id, day, counts):
+    return {'umkm_id': umkm_id, 'day': day, **{metric: counts.get(metric, 0) for metric in METRICS}}
+
+def bump(umkm_id, moment=None, **counts):
+    """Tambah counter harian satu UMKM di session aktif; dipanggil sebelum commit write-nya"""
+    db.session.execute(text(BUMP_SQL), _row(umkm_id, local_day(moment), counts))
+
+_views = Counter()
+_views_lock = threading.Lock()
+_flusher_pid = None
+
+def flush_views(db_path=None):
+    """Tulis view yang terkumpul di worker ini; kembalikan jumlah baris (umkm, hari)"""
+    with _views_lock:
+        pending = dict(_views)
+        _views.clear()
+    if not pending:
+        return 0
+    conn = get_db_connection(db_path)
+    try:
+        with conn:
+            conn.executemany(FLUSH_VIEWS_SQL, [{'umkm_id': umkm_id, 'day': day, 'views': count}
+                                               for (umkm_id, day), count in pending.items()])
+    except Exception:
+        logger.exception("Failed to flush %d UMKM view counters", len(pending))
+        with _views_lock:
+            _views.update(pending)
+        return 0
+    finally:
+        conn.close()
+    return len(pending)
+
+def _flush_loop():
+    while True:
+        time.sleep(Config.ANALYTICS_VIEW_FLUSH_INTERVAL)
+        flush_views()
+
+def record_view(umkm_id):
+    """Hitung satu view halaman detail (tanpa query)"""
+    global _flusher_pid
+    with _views_lock:
+        _views[(umkm_id, local_day())] += 1
+        if _flusher_pid != os.getpid():
+            _flusher_pid = os.getpid()
+            threading.Thread(target=_flush_loop, name='view-flush', daemon=True).start()
+            atexit.register(flush_views)
+
+def owner_analytics(umkm_names, start, end, bucket='day'):
+    """Ringkasan dan deret waktu untuk UMKM ``umkm_names`` ({id: nama}) antara ``start`` dan ``end``"""
+    bucket_expr, starts = buckets(start, end, bucket)
+    # Bucket mingguan dimulai hari Senin, bisa sebelum ``start``
+    first = date.fromisoformat(starts[0])
+    params = {'ids': list(umkm_names), 'start': starts[0], 'end': end.isoformat()}
+    rows = db.session.execute(text(
+        f"""SELECT umkm_id, {bucket_expr} AS bucket, SUM(views), SUM(reviews), SUM(rating_sum), SUM(favorites)
+        FROM umkm_daily_stats WHERE umkm_id IN :ids AND day BETWEEN :start AND :end
+        GROUP BY umkm_id, bucket"""
+    ).bindparams(bindparam('ids', expanding=True)), params).all()
+    # Review sebelum range untuk rating kumulatif
+    baseline = {umkm_id: (count, rating_sum) for umkm_id, count, rating_sum in db.session.execute(text(
+        """SELECT umkm_id, SUM(reviews), SUM(rating_sum) FROM umkm_daily_stats
+        WHERE umkm_id IN :ids AND day < :start GROUP BY umkm_id"""
+    ).bindparams(bindparam('ids', expanding=True)), params)}
+
+    per_umkm = {umkm_id: {bucket_start: dict.fromkeys(METRICS, 0) for bucket_start in starts}
+                for umkm_id in umkm_names}
+    for umkm_id, bucket_start, *values in rows:
+        if bucket_start in per_umkm[umkm_id]:
+            per_umkm[umkm_id][bucket_start] = dict(zip(METRICS, values))
+
+    combined = {bucket_start: dict.fromkeys(METRICS, 0) for bucket_start in starts}
+    combined_baseline = [0, 0]
+    outlets = []
+    for umkm_id, name in umkm_names.items():
+        series = per_umkm[umkm_id]
+        before = baseline.get(umkm_id, (0, 0))
+        combined_baseline[0] += before[0]
+        combined_baseline[1] += before[1]
+        for bucket_start, values in series.items():
+            for metric in METRICS:
+                combined[bucket_start][metric] += values[metric]
+        outlets.append({'id': umkm_id, 'name': name, **_summary(series, before, first, end)})
+
+    return {'bucket': bucket, 'from': start.isoformat(), 'to': end.isoformat(),
+            **_summary(combined, combined_baseline, first, end), 'umkm': outlets}
+
+def _average(rating_sum, count):
+    return round(rating_sum / count, 2) if count else None
+
+def _summary(series, before, start, end):
+    """Total range dan deret per bucket; ``before`` = (review, bintang) sebelum range"""
+    reviews, rating_sum = before
+    points = []
+    for bucket_start, values in series.items():
+        reviews += values['reviews']
+        rating_sum += values['rating_sum']
+        points.append({
+            'date': bucket_start,
+            'views': values['views'],
+            'reviews': values['reviews'],
+            'favorites': values['favorites'],
+            'avg_rating': _average(values['rating_sum'], values['reviews']),
+            # Rata-rata semua review sampai akhir bucket (tren rating)
+            'cumulative_rating': _average(rating_sum, reviews),
+        })
+    total = {metric: sum(values[metric] for values in series.values()) for metric in METRICS}
+    days = (end - start).days + 1
+    return {
+        'totals': {
+            'views': total['views'],
+            'reviews': total['reviews'],
+            'favorites': total['favorites'],
+            'avg_rating': _average(total['rating_sum'], total['reviews']),
+            'reviews_per_day': round(total['reviews'] / days, 2),
+        },
+        'series': points,
+    }
+
+def rebuild(db_path=None):
+    """Hitung ulang review dan favorite harian dari tabel sumber (view dipertahankan)"""
+    started = time.perf_counter()
+    offset = f'+{Config.BUSINESS_UTC_OFFSET_HOURS} hours'
+    conn = get_db_connection(db_path)
+    try:
+        counts = {}
+        for umkm_id, day, count, rating_sum in conn.execute(
+                """SELECT umkm_id, date(COALESCE(created_at, CURRENT_TIMESTAMP), ?) AS day, COUNT(*),
+                SUM(CAST(rating AS INTEGER)) FROM reviews GROUP BY umkm_id, day""", (offset,)):
+            counts[(umkm_id, day)] = {'reviews': count, 'rating_sum': rating_sum}
+        for umkm_id, day, count in conn.execute(
+                """SELECT umkm_id, date(COALESCE(created_at, CURRENT_TIMESTAMP), ?) AS day, COUNT(*)
+                FROM favorites GROUP BY umkm_id, day""", (offset,)):
+            counts.setdefault((umkm_id, day), {})['favorites'] = count
+        with conn:
+            conn.execute('DELETE FROM umkm_daily_stats WHERE views = 0')
+            conn.execute('UPDATE umkm_daily_stats SET reviews = 0, rating_sum = 0, favorites = 0')
+            conn.executemany(BUMP_SQL, [_row(umkm_id, day, values) for (umkm_id, day), values in counts.items()])
+    finally:
+        conn.close()
+
+    logger.info("Rebuilt owner analytics (%d rows) in %.1f ms", len(counts), (time.perf_counter() - started) * 1000)
+    return len(counts)
@@ -0,0 +1,115 @@
+"""Profiling on-demand per request untuk admin.
+
+Request dengan header ``X-Profile: 1`` dan token admin dijalankan di bawah
+cProfile (termasuk pembuatan body response). Hasilnya disimpan di
+``PROFILE_DIR`` (maksimal ``PROFILE_MAX_FILES`` file) dan bisa diunduh lewat
+``/api/admin/profiles``. Request tanpa header hanya membayar satu lookup dict.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import jwt
+from config import Config
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+def _is_admin(environ):
+    token = environ.get('HTTP_AUTHORIZATION', '')
+    if not token.startswith('Bearer '):
+        return False
+    try:
+        data = jwt.decode(token[7:], Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return False
+    return data.get('role') == 'admin'
+
+def _profile_name(environ, duration):
+    path = re.sub(r'[^A-Za-z0-9]+', '-', environ.get('PATH_INFO', '')).strip('-') or 'root'
+    return f"{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}_{environ.get('REQUEST_METHOD', 'GET')}_{path[:60]}_{int(duration * 1000)}ms"
+
+def _prune():
+    files = sorted(list_profiles(), key=lambda profile: profile['created'])
+    for profile in files[:max(0, len(files) - Config.PROFILE_MAX_FILES)]:
+        try:
+            os.remove(profile_path(profile['id']))
+        except OSError:
+            pass
+
+def list_profiles():
+    try:
+        names = os.listdir(Config.PROFILE_DIR)
+    except OSError:
+        return []
+    profiles = []
+    for name in names:
+        if not name.endswith('.prof'):
+            continue
+        path = os.path.join(Config.PROFILE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        profiles.append({'id': name[:-5], 'size': stat.st_size, 'created': stat.st_mtime})
+    return sorted(profiles, key=lambda profile: profile['created'], reverse=True)
+
+def profile_path(profile_id):
+    """Path file profile; None jika id tidak valid atau file tidak ada"""
+    if not re.fullmatch(r'[A-Za-z0-9_\-]+', profile_id or ''):
+        return None
+    path = os.path.join(Config.PROFILE_DIR, f'{profile_id}.prof')
+    return path if os.path.exists(path) else None
+
+def render_stats(profile_id, sort='cumulative', limit=50):
+    output = io.StringIO()
+    stats = pstats.Stats(profile_path(profile_id), stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+class ProfilerMiddleware:
+    """WSGI middleware; dipasang di ``app.wsgi_app`` sehingga seluruh request ikut terukur"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if environ.get(PROFILE_HEADER) != '1' or not Config.PROFILING_ENABLED or not _is_admin(environ):
+            return self.wsgi_app(environ, start_response)
+
+        profiler = cProfile.Profile()
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return lambda data: None
+
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            app_iter = self.wsgi_app(environ, capture_start_response)
+            try:
+                body = b''.join(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+
+        name = _profile_name(environ, duration)
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(Config.PROFILE_DIR, f'{name}.prof'))
+        _prune()
+
+        headers = [(key, value) for key, value in captured['headers'] if key.lower() != 'content-length']
+        headers.append(('Content-Length', str(len(body))))
+        headers.append(('X-Profile-Id', name))
+        start_response(captured['status'], headers, captured['exc_info'])
+        return [body]
+
+def init_profiling(app):
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app)
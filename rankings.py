@@ -0,0 +1,200 @@
+"""Ranking UMKM: top rated (rata-rata Bayesian) dan trending (skor yang meluruh).
+
+Skor disimpan per UMKM di tabel ``umkm_scores`` dan diperbarui inkremental
+di transaksi yang sama saat review masuk, sehingga ``GET /api/umkm/top`` cukup
+membaca index ``(category, skor)`` tanpa menyentuh tabel reviews.
+
+Top rated memakai ``(C * m + jumlah rating) / (C + jumlah review)`` dengan
+``m`` rata-rata global dan ``C = RANKING_PRIOR_WEIGHT``, sehingga satu review
+bintang 5 tidak mengalahkan ratusan review bagus.
+
+Trending menjumlahkan ``rating / 5 * 2 ** ((t - epoch) / half_life)``.
+Peluruhan berlaku sama untuk semua UMKM, jadi skor "relatif terhadap epoch"
+bisa dibandingkan langsung tanpa pernah di-decay ulang; nilai saat ini
+didapat dengan mengalikan ``2 ** (-(now - epoch) / half_life)``. Bobotnya
+tumbuh dua kali lipat tiap half-life dan melewati batas float sekitar
+1000 half-life setelah epoch (~19 tahun untuk window 7 hari), jadi epoch
+disimpan di ``job_state`` dan digeser ke hari ini setiap ``rebuild()``.
+
+Rata-rata global bergeser pelan seiring review baru, jadi di jalur tulis nilainya
+di-cache per worker selama ``RANKING_MEAN_CACHE_TTL`` detik (bukan ``SUM`` ke
+seluruh ``umkm_scores`` setiap review). Jalankan ``rebuild()``
+(``flask --app app rebuild-rankings``) secara berkala untuk menghitung ulang
+semua skor.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from config import Config
+from models import db, get_db_connection, UmkmScore
+
+logger = logging.getLogger(__name__)
+
+# Key job_state untuk epoch skor trending saat ini (detik UTC)
+EPOCH_KEY = 'ranking_epoch'
+# 2025-01-01 UTC; epoch skor yang ditulis sebelum epoch disimpan di job_state
+TRENDING_EPOCH = 1735689600
+
+# window -> (kolom skor, half-life dalam hari; None = tanpa peluruhan)
+WINDOWS = {
+    'all': ('bayes_score', None),
+    '30d': ('trending_30d', 30),
+    '7d': ('trending_7d', 7),
+}
+
+def _epoch_seconds(moment):
+    if moment is None:
+        return time.time()
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+def trending_epoch(conn=None):
+    """Epoch skor trending yang tersimpan; lewat koneksi sqlite3 ``conn`` atau ``db.session``"""
+    if conn is None:
+        value = db.session.execute(text('SELECT value FROM job_state WHERE name = :name'),
+                                   {'name': EPOCH_KEY}).scalar()
+    else:
+        row = conn.execute('SELECT value FROM job_state WHERE name = ?', (EPOCH_KEY,)).fetchone()
+        value = row[0] if row else None
+    return int(value) if value else TRENDING_EPOCH
+
+def trending_weight(rating, timestamp, half_life_days, epoch):
+    return rating / 5 * 2 ** ((timestamp - epoch) / (half_life_days * 86400))
+
+def current_trending(score, half_life_days, epoch, now=None):
+    """Skor trending tersimpan -> nilai yang sudah meluruh sampai sekarang"""
+    now = time.time() if now is None else now
+    return score * 2 ** (-(now - epoch) / (half_life_days * 86400))
+
+def bayesian_score(rating_sum, review_count, prior_mean):
+    weight = Config.RANKING_PRIOR_WEIGHT
+    return (weight * prior_mean + rating_sum) / (weight + review_count)
+
+def global_mean():
+    rating_sum, review_count = db.session.query(
+        func.sum(UmkmScore.rating_sum), func.sum(UmkmScore.review_count)
+    ).one()
+    return rating_sum / review_count if review_count else Config.RANKING_PRIOR_MEAN
+
+_mean_lock = threading.Lock()
+_mean_cache = None  # (nilai, expires_at monotonic)
+
+def cached_global_mean():
+    """``global_mean()`` yang dihitung ulang paling sering tiap ``RANKING_MEAN_CACHE_TTL`` detik"""
+    global _mean_cache
+    with _mean_lock:
+        if _mean_cache is not None and _mean_cache[1] > time.monotonic():
+            return _mean_cache[0]
+    value = global_mean()
+    with _mean_lock:
+        _mean_cache = (value, time.monotonic() + Config.RANKING_MEAN_CACHE_TTL)
+    return value
+
+def record_review(umkm, review):
+    """Tambahkan satu review ke skor UMKM; dipanggil setelah review di-flush, sebelum commit.
+
+    Flush sudah memegang lock tulis, jadi epoch yang dibaca di sini tidak bisa
+    digeser ``rebuild()`` sebelum transaksi ini selesai.
+    """
+    timestamp = _epoch_seconds(review.created_at)
+    epoch = trending_epoch()
+    increments = {
+        'trending_7d': trending_weight(review.rating, timestamp, 7, epoch),
+        'trending_30d': trending_weight(review.rating, timestamp, 30, epoch),
+    }
+    weight = Config.RANKING_PRIOR_WEIGHT
+    prior = weight * cached_global_mean()
+    stmt = sqlite_insert(UmkmScore).values(
+        umkm_id=umkm.id, category=umkm.category, review_count=1, rating_sum=review.rating,
+        bayes_score=(prior + review.rating) / (weight + 1), updated_at=datetime.utcnow(), **increments
+    )
+    # Increment di SQL supaya write bersamaan dari worker lain tidak saling menimpa;
+    # di SET, kolom merujuk nilai lama sehingga skor Bayesian ikut dihitung di statement yang sama
+    stmt = stmt.on_conflict_do_update(index_elements=[UmkmScore.umkm_id], set_={
+        'review_count': UmkmScore.review_count + 1,
+        'rating_sum': UmkmScore.rating_sum + review.rating,
+        'bayes_score': (prior + UmkmScore.rating_sum + review.rating) / (weight + UmkmScore.review_count + 1),
+        'trending_7d': UmkmScore.trending_7d + increments['trending_7d'],
+        'trending_30d': UmkmScore.trending_30d + increments['trending_30d'],
+        'updated_at': datetime.utcnow(),
+    })
+    db.session.execute(stmt)
+
+def remove_reviews(conn, reviews):
+    """Kurangi skor untuk review yang dihapus lewat koneksi sqlite3 (transaksi milik pemanggil).
+
+    ``reviews`` berisi (umkm_id, rating, epoch created_at).
+    """
+    epoch = trending_epoch(conn)
+    conn.executemany(
+        """UPDATE umkm_scores SET review_count = review_count - 1, rating_sum = rating_sum - ?,
+        trending_7d = trending_7d - ?, trending_30d = trending_30d - ? WHERE umkm_id = ?""",
+        [(rating, trending_weight(rating, timestamp, 7, epoch), trending_weight(rating, timestamp, 30, epoch),
+          umkm_id)
+         for umkm_id, rating, timestamp in reviews]
+    )
+    touched = {review[0] for review in reviews}
+    # UMKM tanpa review tersisa tidak punya skor (sama seperti sebelum review pertama)
+    conn.executemany('DELETE FROM umkm_scores WHERE umkm_id = ? AND review_count <= 0',
+                     [(umkm_id,) for umkm_id in touched])
+    rating_sum, review_count = conn.execute('SELECT SUM(rating_sum), SUM(review_count) FROM umkm_scores').fetchone()
+    prior_mean = rating_sum / review_count if review_count else Config.RANKING_PRIOR_MEAN
+    weight = Config.RANKING_PRIOR_WEIGHT
+    conn.executemany(
+        'UPDATE umkm_scores SET bayes_score = (? * ? + rating_sum) * 1.0 / (? + review_count) WHERE umkm_id = ?',
+        [(weight, prior_mean, weight, umkm_id) for umkm_id in touched]
+    )
+
+def rebuild(db_path=None):
+    """Hitung ulang semua skor dari tabel reviews dengan epoch baru (hari ini, UTC).
+
+    Baca, hitung dan tulis berjalan dalam satu transaksi ``BEGIN IMMEDIATE``
+    supaya review yang masuk di tengah tidak tercatat dengan epoch lama.
+    """
+    started = time.perf_counter()
+    epoch = int(time.time()) // 86400 * 86400
+    conn = get_db_connection(db_path)
+    try:
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            scores = {}
+            rows = conn.execute(
+                """SELECT r.umkm_id, u.category, CAST(r.rating AS INTEGER),
+                CAST(strftime('%s', COALESCE(r.created_at, CURRENT_TIMESTAMP)) AS INTEGER)
+                FROM reviews r JOIN umkm u ON u.id = r.umkm_id
+                WHERE CAST(r.rating AS INTEGER) BETWEEN 1 AND 5"""
+            )
+            for umkm_id, category, rating, timestamp in rows:
+                entry = scores.get(umkm_id)
+                if entry is None:
+                    entry = scores[umkm_id] = [category, 0, 0, 0.0, 0.0]
+                entry[1] += 1
+                entry[2] += rating
+                entry[3] += trending_weight(rating, timestamp, 7, epoch)
+                entry[4] += trending_weight(rating, timestamp, 30, epoch)
+
+            total_count = sum(entry[1] for entry in scores.values())
+            prior_mean = (sum(entry[2] for entry in scores.values()) / total_count
+                          if total_count else Config.RANKING_PRIOR_MEAN)
+            now = datetime.utcnow().isoformat(' ')
+            conn.execute('DELETE FROM umkm_scores')
+            conn.executemany(
+                """INSERT INTO umkm_scores (umkm_id, category, review_count, rating_sum, bayes_score,
+                trending_7d, trending_30d, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(umkm_id, category, count, rating_sum, bayesian_score(rating_sum, count, prior_mean),
+                  trending_7d, trending_30d, now)
+                 for umkm_id, (category, count, rating_sum, trending_7d, trending_30d) in scores.items()]
+            )
+            conn.execute(
+                """INSERT INTO job_state (name, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at""",
+                (EPOCH_KEY, str(epoch), now)
+            )
+    finally:
+        conn.close()
+
+    logger.info("Rebuilt rankings for %d UMKM in %.1f ms", len(scores), (time.perf_counter() - started) * 1000,
+                extra={'prior_mean': round(prior_mean, 3), 'epoch': epoch})
+    return len(scores)
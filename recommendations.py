@@ -0,0 +1,224 @@
+"""Rekomendasi item-item dari co-occurrence favorite dan review.
+
+Job batch membangun matriks interaksi user x UMKM yang sparse (favorite = 1.0,
+review bintang 4-5 = 1.0, bintang 3 = 0.5, di bawahnya diabaikan) lalu
+menghitung cosine similarity antar UMKM lewat perkalian ``A^T A`` yang hanya
+menyentuh pasangan yang benar-benar muncul bersama. Top-k tetangga per UMKM
+disimpan di tabel ``umkm_similarities``.
+
+Mode inkremental (default) hanya menghitung ulang UMKM yang disentuh user
+dengan interaksi baru sejak watermark terakhir (id favorite/review di
+``job_state``); ``--full`` menghitung semuanya (jalankan berkala untuk
+menangkap favorite yang dihapus).
+
+    python -m recommendations [--full]
+    flask --app app rebuild-recommendations [--full]
+
+Di sisi API tetangga dimuat ke cache in-process dan dimuat ulang jika job
+sudah berjalan lagi (dicek paling sering tiap ``RECOMMENDATION_CACHE_TTL``).
+"""
+import heapq
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from config import Config
+from models import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = 'recommendations'
+
+# User dengan interaksi sangat banyak (bot, admin penguji) hanya dihitung item terbarunya
+MAX_ITEMS_PER_USER = 200
+
+def review_weight(rating):
+    if rating >= 4:
+        return 1.0
+    if rating == 3:
+        return 0.5
+    return 0.0
+
+def load_interactions(conn):
+    """Kembalikan (user -> {umkm: bobot}, watermark id terakhir favorite & review)"""
+    # Watermark diambil dulu supaya baris yang masuk selama job berjalan ikut run berikutnya
+    watermark = {
+        'favorite_id': conn.execute('SELECT COALESCE(MAX(id), 0) FROM favorites').fetchone()[0],
+        'review_id': conn.execute('SELECT COALESCE(MAX(id), 0) FROM reviews').fetchone()[0],
+    }
+    user_items = defaultdict(dict)
+    for user_id, umkm_id in conn.execute('SELECT user_id, umkm_id FROM favorites WHERE id <= ? ORDER BY id',
+                                         (watermark['favorite_id'],)):
+        user_items[user_id][umkm_id] = 1.0
+    for user_id, umkm_id, rating in conn.execute(
+            'SELECT user_id, umkm_id, CAST(rating AS INTEGER) FROM reviews WHERE id <= ? ORDER BY id',
+            (watermark['review_id'],)):
+        weight = review_weight(rating)
+        if weight > user_items[user_id].get(umkm_id, 0.0):
+            user_items[user_id][umkm_id] = weight
+
+    for user_id, items in user_items.items():
+        if len(items) > MAX_ITEMS_PER_USER:
+            # dict mempertahankan urutan insert (id naik), ambil yang terbaru
+            user_items[user_id] = dict(list(items.items())[-MAX_ITEMS_PER_USER:])
+
+    return user_items, watermark
+
+def has_new_interactions(conn, watermark):
+    return conn.execute(
+        'SELECT EXISTS(SELECT 1 FROM favorites WHERE id > ?) OR EXISTS(SELECT 1 FROM reviews WHERE id > ?)',
+        (watermark['favorite_id'], watermark['review_id'])
+    ).fetchone()[0] == 1
+
+def dirty_items(conn, watermark, current, user_items):
+    """UMKM yang tetangganya bisa berubah sejak watermark"""
+    users = {row[0] for row in conn.execute('SELECT user_id FROM favorites WHERE id > ? AND id <= ?',
+                                            (watermark['favorite_id'], current['favorite_id']))}
+    users |= {row[0] for row in conn.execute('SELECT user_id FROM reviews WHERE id > ? AND id <= ?',
+                                             (watermark['review_id'], current['review_id']))}
+    items = set()
+    for user_id in users:
+        items.update(user_items.get(user_id, ()))
+    return items
+
+def compute_neighbours(user_items, items, k):
+    """Cosine similarity top-k untuk ``items`` dari matriks interaksi sparse"""
+    item_users = defaultdict(list)
+    norms = defaultdict(float)
+    for user_id, weights in user_items.items():
+        for umkm_id, weight in weights.items():
+            if weight:
+                item_users[umkm_id].append((user_id, weight))
+                norms[umkm_id] += weight * weight
+
+    neighbours = {}
+    for umkm_id in items:
+        dots = defaultdict(float)
+        for user_id, weight in item_users.get(umkm_id, ()):
+            for other_id, other_weight in user_items[user_id].items():
+                if other_id != umkm_id and other_weight:
+                    dots[other_id] += weight * other_weight
+        norm = math.sqrt(norms[umkm_id]) if norms[umkm_id] else 0.0
+        if not norm:
+            neighbours[umkm_id] = []
+            continue
+        top = heapq.nlargest(k, dots.items(), key=lambda item: item[1] / math.sqrt(norms[item[0]]))
+        neighbours[umkm_id] = [(other_id, dot / (norm * math.sqrt(norms[other_id]))) for other_id, dot in top]
+    return neighbours
+
+def _read_state(conn):
+    row = conn.execute('SELECT value FROM job_state WHERE name = ?', (JOB_NAME,)).fetchone()
+    return json.loads(row[0]) if row and row[0] else None
+
+def run(full=False, k=None, db_path=None):
+    """Jalankan job; kembalikan ringkasan (jumlah UMKM dihitung, durasi)"""
+    k = k or Config.RECOMMENDATION_TOP_K
+    started = time.perf_counter()
+    conn = get_db_connection(db_path)
+    try:
+        state = None if full else _read_state(conn)
+        if state is not None and not has_new_interactions(conn, state['watermark']):
+            return {'mode': 'noop', 'umkm_computed': 0, 'seconds': round(time.perf_counter() - started, 2)}
+
+        user_items, watermark = load_interactions(conn)
+        if state is None:
+            items = {umkm_id for weights in user_items.values() for umkm_id in weights}
+            mode = 'full'
+        else:
+            items = dirty_items(conn, state['watermark'], watermark, user_items)
+            mode = 'incremental'
+
+        neighbours = compute_neighbours(user_items, items, k)
+
+        with conn:
+            if mode == 'full':
+                conn.execute('DELETE FROM umkm_similarities')
+            else:
+                conn.executemany('DELETE FROM umkm_similarities WHERE umkm_id = ?', [(umkm_id,) for umkm_id in items])
+            conn.executemany(
+                'INSERT INTO umkm_similarities (umkm_id, similar_id, score) VALUES (?, ?, ?)',
+                [(umkm_id, other_id, score) for umkm_id, rows in neighbours.items() for other_id, score in rows]
+            )
+            conn.execute(
+                """INSERT INTO job_state (name, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at""",
+                (JOB_NAME, json.dumps({'watermark': watermark, 'mode': mode}), datetime.utcnow().isoformat(' '))
+            )
+    finally:
+        conn.close()
+
+    summary = {
+        'mode': mode,
+        'users': len(user_items),
+        'umkm_computed': len(items),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    logger.info("Recommendation job finished", extra=summary)
+    return summary
+
+class NeighbourCache:
+    """Tabel umkm_similarities di memori; dimuat ulang setelah job berjalan lagi"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._neighbours = {}
+        self._version = None
+        # None: belum pernah dimuat (monotonic() bisa kecil setelah boot, jadi 0.0 tidak aman)
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _fresh(self, now):
+        return self._checked_at is not None and now - self._checked_at < self.ttl
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._fresh(now):
+            return
+        with self._lock:
+            if self._fresh(now):
+                return
+            conn = get_db_connection()
+            try:
+                row = conn.execute('SELECT updated_at FROM job_state WHERE name = ?', (JOB_NAME,)).fetchone()
+                version = row[0] if row else None
+                if self._checked_at is None or version != self._version:
+                    neighbours = defaultdict(list)
+                    for umkm_id, similar_id, score in conn.execute(
+                            'SELECT umkm_id, similar_id, score FROM umkm_similarities'):
+                        neighbours[umkm_id].append((similar_id, score))
+                    for rows in neighbours.values():
+                        rows.sort(key=lambda row: row[1], reverse=True)
+                    self._neighbours = dict(neighbours)
+                    self._version = version
+            finally:
+                conn.close()
+            self._checked_at = now
+
+    def similar(self, umkm_id):
+        self._refresh()
+        return self._neighbours.get(umkm_id, [])
+
+    def for_user(self, interactions, limit):
+        """Skor UMKM untuk user: jumlah bobot interaksi x similarity tetangga"""
+        self._refresh()
+        scores = defaultdict(float)
+        for umkm_id, weight in interactions.items():
+            for similar_id, score in self._neighbours.get(umkm_id, ()):
+                if similar_id not in interactions:
+                    scores[similar_id] += weight * score
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+neighbour_cache = NeighbourCache(Config.RECOMMENDATION_CACHE_TTL)
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Build item-item UMKM recommendations')
+    parser.add_argument('--full', action='store_true', help='Recompute every UMKM instead of only changed ones')
+    args = parser.parse_args()
+    print(json.dumps(run(full=args.full)))
+
+if __name__ == '__main__':
+    main()
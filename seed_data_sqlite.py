@@ -9,17 +9,18 @@ def seed_data():
         cursor.execute('DELETE FROM reviews')
         cursor.execute('DELETE FROM umkm')
         cursor.execute('DELETE FROM users')
+        # Semua demo user memakai password yang sama, cukup hash sekali
+        demo_password = hash_password('password')
         demo_users = [
-            ('User Demo', 'user@demo.com', hash_password('password'), 'user'),
-            ('UMKM Owner', 'umkm@demo.com', hash_password('password'), 'umkm'),
-            ('Admin User', 'admin@demo.com', hash_password('password'), 'admin')
+            ('User Demo', 'user@demo.com', demo_password, 'user'),
+            ('UMKM Owner', 'umkm@demo.com', demo_password, 'umkm'),
+            ('Admin User', 'admin@demo.com', demo_password, 'admin')
         ]
         
-        for user in demo_users:
-            cursor.execute(
-                'INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)',
-                user
-            )
+        cursor.executemany(
+            'INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)',
+            demo_users
+        )
         
         conn.commit()
         print("✅ Demo users seeded successfully! (No UMKM data)")
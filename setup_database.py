@@ -19,17 +19,18 @@ def seed_initial_data():
     cursor = conn.cursor()
     
     try:
+        # Semua demo user memakai password yang sama, cukup hash sekali
+        demo_password = hash_password('password')
         demo_users = [
-            ('User Demo', 'user@demo.com', hash_password('password'), 'user'),
-            ('UMKM Owner', 'umkm@demo.com', hash_password('password'), 'umkm'),
-            ('Admin User', 'admin@demo.com', hash_password('password'), 'admin')
+            ('User Demo', 'user@demo.com', demo_password, 'user'),
+            ('UMKM Owner', 'umkm@demo.com', demo_password, 'umkm'),
+            ('Admin User', 'admin@demo.com', demo_password, 'admin')
         ]
         
-        for user in demo_users:
-            cursor.execute(
-                'INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)',
-                user
-            )
+        cursor.executemany(
+            'INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)',
+            demo_users
+        )
         cursor.execute('SELECT id FROM users WHERE email = ?', ('umkm@demo.com',))
         umkm_owner_id = cursor.fetchone()[0]
         
@@ -53,13 +54,12 @@ def seed_initial_data():
              None, -6.2620, 106.7800, 'Jl. Veteran No. 45', '08123456782', '24 Jam', 1)
         ]
         
-        for umkm in demo_umkm:
-            cursor.execute(
-                '''INSERT INTO umkm (owner_id, name, category, description, image_path, 
-                latitude, longitude, address, phone, hours, is_approved) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                umkm
-            )
+        cursor.executemany(
+            '''INSERT INTO umkm (owner_id, name, category, description, image_path, 
+            latitude, longitude, address, phone, hours, is_approved) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            demo_umkm
+        )
         cursor.execute('SELECT id FROM umkm WHERE name = ?', ('Geprek Mbak Rara',))
         umkm_id = cursor.fetchone()[0]
         
@@ -68,11 +68,10 @@ def seed_initial_data():
             (umkm_id, user_id, 4, 'Harganya terjangkau, rasanya juga enak. Recommended!')
         ]
         
-        for review in demo_reviews:
-            cursor.execute(
-                'INSERT INTO reviews (umkm_id, user_id, rating, comment) VALUES (?, ?, ?, ?)',
-                review
-            )
+        cursor.executemany(
+            'INSERT INTO reviews (umkm_id, user_id, rating, comment) VALUES (?, ?, ?, ?)',
+            demo_reviews
+        )
         
         conn.commit()
         print("✅ Demo data seeded successfully!")
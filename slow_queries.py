@@ -0,0 +1,181 @@
+"""Slow-query log dengan EXPLAIN QUERY PLAN otomatis.
+
+Statement yang lebih lama dari ``SLOW_QUERY_MS`` dicatat (teks SQL, tipe
+parameter, durasi, route asal dan query plan SQLite) ke file log JSON yang
+dirotasi. EXPLAIN dan penulisan file dijalankan di thread background supaya
+request yang sudah lambat tidak bertambah lambat.
+"""
+import fcntl
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_pending = queue.Queue(maxsize=1000)
+_worker_pid = None
+_plans = {}
+
+class LockedRotatingFile:
+    """File log yang dirotasi berdasarkan ukuran, aman ditulis dari beberapa proses"""
+
+    def __init__(self, path, max_bytes, backup_count):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def paths(self):
+        return [self.path] + [f'{self.path}.{i}' for i in range(1, self.backup_count + 1)]
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+    def write(self, line):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+log_file = LockedRotatingFile(Config.SLOW_QUERY_LOG, Config.SLOW_QUERY_LOG_MAX_BYTES, Config.SLOW_QUERY_LOG_BACKUPS)
+
+def normalize_statement(statement):
+    return re.sub(r'\s+', ' ', statement).strip()
+
+def _param_shape(parameters):
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        # executemany: bentuk dari baris pertama + jumlah baris
+        return {'rows': len(parameters), 'row': _param_shape(parameters[0])}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+def explain(statement, parameters):
+    """Jalankan EXPLAIN QUERY PLAN lewat koneksi read-only terpisah (hasil di-cache per statement)"""
+    if statement in _plans:
+        return _plans[statement]
+
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        parameters = parameters[0]
+    try:
+        conn = sqlite3.connect(f'file:{Config.SQLITE_DB}?mode=ro', uri=True, timeout=1)
+        try:
+            rows = conn.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+        finally:
+            conn.close()
+        plan = [row[-1] for row in rows]
+    except sqlite3.Error as e:
+        plan = [f'EXPLAIN failed: {e}']
+
+    if len(_plans) < 1000:
+        _plans[statement] = plan
+    return plan
+
+def _process(item):
+    statement, parameters, duration, route, timestamp = item
+    record = {
+        'ts': timestamp,
+        'duration_ms': round(duration * 1000, 2),
+        'route': route,
+        'statement': normalize_statement(statement),
+        'param_shape': _param_shape(parameters),
+        'plan': explain(statement, parameters),
+    }
+    log_file.write(json.dumps(record, default=str))
+    logger.warning("Slow query (%.1f ms) on %s", record['duration_ms'], route)
+
+def _worker():
+    while True:
+        item = _pending.get()
+        try:
+            _process(item)
+        except Exception:
+            logger.exception("Failed to record slow query")
+
+def _ensure_worker():
+    global _worker_pid
+    if _worker_pid != os.getpid():
+        _worker_pid = os.getpid()
+        threading.Thread(target=_worker, name='slow-query-log', daemon=True).start()
+
+# Per execution context, bukan stack di conn.info: statement yang gagal tidak menyisakan apa pun
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._slow_query_started
+    if duration * 1000 < Config.SLOW_QUERY_MS:
+        return
+
+    route = None
+    if has_request_context():
+        route = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+    _ensure_worker()
+    try:
+        _pending.put_nowait((statement, parameters, duration, route,
+                             datetime.now(timezone.utc).isoformat(timespec='milliseconds')))
+    except queue.Full:
+        pass
+
+def pending_count():
+    """Jumlah slow query yang belum selesai diproses thread background"""
+    return _pending.qsize()
+
+def top_offenders(limit=20):
+    """Agregasi log (termasuk file backup) per statement, diurutkan berdasarkan total waktu"""
+    stats = {}
+    for path in log_file.paths():
+        try:
+            with open(path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            entry = stats.get(record['statement'])
+            if entry is None:
+                entry = stats[record['statement']] = {
+                    'statement': record['statement'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'routes': set(),
+                    'param_shape': record.get('param_shape'),
+                    'plan': record.get('plan'),
+                    'last_seen': record['ts'],
+                }
+            entry['count'] += 1
+            entry['total_ms'] += record['duration_ms']
+            entry['max_ms'] = max(entry['max_ms'], record['duration_ms'])
+            if record.get('route'):
+                entry['routes'].add(record['route'])
+            if record['ts'] > entry['last_seen']:
+                entry['last_seen'] = record['ts']
+                entry['plan'] = record.get('plan')
+
+    result = sorted(stats.values(), key=lambda entry: entry['total_ms'], reverse=True)[:limit]
+    for entry in result:
+        entry['total_ms'] = round(entry['total_ms'], 2)
+        entry['avg_ms'] = round(entry['total_ms'] / entry['count'], 2)
+        entry['routes'] = sorted(entry['routes'])
+    return result
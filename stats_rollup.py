@@ -0,0 +1,146 @@
+"""Counter statistik admin yang diperbarui inkremental di jalur tulis.
+
+Dua tabel kecil menggantikan ``COUNT`` ke tabel besar setiap kali dashboard
+admin dibuka:
+
+- ``daily_stats`` (day, metric, count): jumlah kejadian per hari lokal
+  (``BUSINESS_UTC_OFFSET_HOURS``) untuk ``DAILY_METRICS``.
+- ``stats_totals`` (metric, value): total berjalan untuk ``TOTAL_METRICS``.
+
+Counter ditambah lewat upsert ``value = value + n`` di transaksi yang sama
+dengan write-nya (``bump`` untuk session SQLAlchemy, ``bump_conn`` untuk
+koneksi sqlite3 bulk import), sehingga write bersamaan dari worker lain tidak
+saling menimpa dan biaya dashboard tetap sama berapa pun panjang riwayatnya.
+
+Data yang ditulis di luar aplikasi (seed, script setup) tidak tercatat;
+``rebuild()`` menghitung ulang semuanya dari tabel sumber:
+
+    flask --app app rebuild-stats
+
+Waktu approve tidak disimpan di tabel umkm, jadi riwayat ``umkm_approved``
+tidak bisa direkonstruksi dan dibiarkan apa adanya saat rebuild.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from config import Config
+from models import db, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+DAILY_METRICS = ('signups', 'umkm_created', 'umkm_approved', 'reviews', 'favorites')
+TOTAL_METRICS = ('users', 'umkm', 'umkm_pending', 'umkm_owners', 'reviews', 'favorites')
+
+BUMP_DAILY_SQL = """INSERT INTO daily_stats (day, metric, count) VALUES (:day, :metric, :count)
+    ON CONFLICT(day, metric) DO UPDATE SET count = count + excluded.count"""
+BUMP_TOTAL_SQL = """INSERT INTO stats_totals (metric, value) VALUES (:metric, :value)
+    ON CONFLICT(metric) DO UPDATE SET value = value + excluded.value"""
+
+def local_day(moment=None):
+    """Tanggal lokal (YYYY-MM-DD) dari datetime UTC naive; default sekarang"""
+    moment = moment or datetime.utcnow()
+    return (moment + timedelta(hours=Config.BUSINESS_UTC_OFFSET_HOURS)).date().isoformat()
+
+def _params(daily, totals, moment):
+    day = local_day(moment)
+    daily_rows = [{'day': day, 'metric': metric, 'count': count} for metric, count in (daily or {}).items() if count]
+    total_rows = [{'metric': metric, 'value': value} for metric, value in (totals or {}).items() if value]
+    return daily_rows, total_rows
+
+def bump(daily=None, totals=None, moment=None):
+    """Tambah counter di session aktif; dipanggil sebelum commit write-nya"""
+    daily_rows, total_rows = _params(daily, totals, moment)
+    if daily_rows:
+        db.session.execute(text(BUMP_DAILY_SQL), daily_rows)
+    if total_rows:
+        db.session.execute(text(BUMP_TOTAL_SQL), total_rows)
+
+def bump_conn(conn, daily=None, totals=None, moment=None):
+    """Sama dengan ``bump`` lewat koneksi sqlite3 (transaksi milik pemanggil)"""
+    daily_rows, total_rows = _params(daily, totals, moment)
+    conn.executemany(BUMP_DAILY_SQL, daily_rows)
+    conn.executemany(BUMP_TOTAL_SQL, total_rows)
+
+def is_only_umkm(owner_id, umkm_id):
+    """True jika owner tidak punya UMKM lain selain ``umkm_id`` (untuk counter umkm_owners)"""
+    return db.session.execute(
+        text('SELECT NOT EXISTS(SELECT 1 FROM umkm WHERE owner_id = :owner_id AND id != :umkm_id)'),
+        {'owner_id': owner_id, 'umkm_id': umkm_id}
+    ).scalar() == 1
+
+def totals():
+    """Semua total berjalan dalam satu query"""
+    values = dict.fromkeys(TOTAL_METRICS, 0)
+    values.update(db.session.execute(text('SELECT metric, value FROM stats_totals')).all())
+    return values
+
+def buckets(start, end, bucket='day'):
+    """(ekspresi SQL bucket untuk kolom ``day``, tanggal awal tiap bucket antara ``start`` dan ``end``)"""
+    if bucket == 'week':
+        # Mundur ke Senin: 'weekday 0' maju ke Minggu berikutnya (atau hari itu), lalu -6 hari
+        bucket_expr = "date(day, 'weekday 0', '-6 days')"
+        start -= timedelta(days=start.weekday())
+        step = timedelta(days=7)
+    else:
+        bucket_expr = 'day'
+        step = timedelta(days=1)
+
+    starts = []
+    moment = start
+    while moment <= end:
+        starts.append(moment.isoformat())
+        moment += step
+    return bucket_expr, starts
+
+def timeseries(start, end, bucket='day'):
+    """Counter harian antara ``start`` dan ``end`` (date, inklusif), per hari atau per minggu (Senin)"""
+    bucket_expr, starts = buckets(start, end, bucket)
+    rows = db.session.execute(
+        text(f"""SELECT {bucket_expr} AS bucket, metric, SUM(count) FROM daily_stats
+        WHERE day BETWEEN :start AND :end GROUP BY bucket, metric"""),
+        {'start': starts[0], 'end': end.isoformat()}
+    ).all()
+
+    series = {bucket_start: dict.fromkeys(DAILY_METRICS, 0) for bucket_start in starts}
+    for bucket_start, metric, count in rows:
+        if bucket_start in series and metric in DAILY_METRICS:
+            series[bucket_start][metric] = count
+    return [{'date': bucket_start, **counts} for bucket_start, counts in series.items()]
+
+def rebuild(db_path=None):
+    """Hitung ulang counter dari tabel sumber (satu transaksi tulis)"""
+    started = time.perf_counter()
+    offset = f'+{Config.BUSINESS_UTC_OFFSET_HOURS} hours'
+    conn = get_db_connection(db_path)
+    try:
+        daily = []
+        for metric, table, condition in (
+                ('signups', 'users', "role != 'admin'"),
+                ('umkm_created', 'umkm', '1'),
+                ('reviews', 'reviews', '1'),
+                ('favorites', 'favorites', '1')):
+            daily.extend(
+                (day, metric, count) for day, count in conn.execute(
+                    f"""SELECT date(COALESCE(created_at, CURRENT_TIMESTAMP), ?) AS day, COUNT(*)
+                    FROM {table} WHERE {condition} GROUP BY day""", (offset,))
+            )
+
+        row = conn.execute(
+            """SELECT (SELECT COUNT(*) FROM users WHERE role != 'admin'),
+            (SELECT COUNT(*) FROM umkm),
+            (SELECT COUNT(*) FROM umkm WHERE NOT is_approved AND COALESCE(moderation_status, '') != 'rejected'),
+            (SELECT COUNT(DISTINCT owner_id) FROM umkm),
+            (SELECT COUNT(*) FROM reviews),
+            (SELECT COUNT(*) FROM favorites)"""
+        ).fetchone()
+        with conn:
+            conn.execute("DELETE FROM daily_stats WHERE metric != 'umkm_approved'")
+            conn.executemany('INSERT INTO daily_stats (day, metric, count) VALUES (?, ?, ?)', daily)
+            conn.execute('DELETE FROM stats_totals')
+            conn.executemany('INSERT INTO stats_totals (metric, value) VALUES (?, ?)', zip(TOTAL_METRICS, row))
+    finally:
+        conn.close()
+
+    logger.info("Rebuilt admin stats (%d daily rows) in %.1f ms", len(daily), (time.perf_counter() - started) * 1000)
+    return len(daily)
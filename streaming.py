@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from flask import Response, request, stream_with_context
+
+# Jumlah baris yang diambil dari cursor per batch saat streaming
+YIELD_PER = 500
+
+# Kirim chunk ke client setiap kali buffer mencapai ukuran ini
+CHUNK_SIZE = 16 * 1024
+
+STREAM_MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def get_stream_format():
+    """Return 'json' / 'ndjson' jika client meminta streaming, selain itu None"""
+    stream = request.args.get('stream', '').strip().lower()
+    if stream in ('1', 'true', 'json'):
+        return 'json'
+    if stream == 'ndjson':
+        return 'ndjson'
+    return None
+
+def _generate(rows, serialize, fmt):
+    separator = '\n' if fmt == 'ndjson' else ','
+
+    # Kirim byte pertama sebelum query dieksekusi supaya time-to-first-byte konstan
+    if fmt == 'json':
+        yield '['
+
+    buffer = []
+    size = 0
+    first = True
+    for row in rows:
+        item = json.dumps(serialize(row))
+        if fmt == 'json' and not first:
+            item = separator + item
+        elif fmt == 'ndjson':
+            item = item + separator
+        first = False
+
+        buffer.append(item)
+        size += len(item)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+
+    if fmt == 'json':
+        buffer.append(']')
+    if buffer:
+        yield ''.join(buffer)
+
+def _generate_csv(rows, serialize, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        data = serialize(row)
+        writer.writerow([data.get(column) for column in columns])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def stream_response(rows, serialize, fmt, columns=None, headers=None):
+    """Stream hasil query sebagai JSON array, NDJSON atau CSV tanpa memuat semua baris ke memori.
+
+    ``rows`` sebaiknya berupa query dengan ``yield_per`` sehingga baris diambil
+    dari cursor secara bertahap, dan ``serialize`` mengubah satu baris menjadi dict.
+    Untuk CSV, ``columns`` menentukan header dan urutan kolom.
+    """
+    if fmt == 'csv':
+        generator = _generate_csv(rows, serialize, columns)
+    else:
+        generator = _generate(rows, serialize, fmt)
+
+    return Response(
+        stream_with_context(generator),
+        mimetype=STREAM_MIMETYPES[fmt],
+        headers=headers
+    )
@@ -0,0 +1,5 @@
+"""Semua test memakai satu database sementara; ``SQLITE_DB`` harus diset sebelum ``app`` diimpor."""
+import os
+import tempfile
+
+os.environ['SQLITE_DB'] = os.path.join(tempfile.mkdtemp(prefix='kawan_test_'), 'test.db')
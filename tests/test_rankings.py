@@ -0,0 +1,67 @@
+"""Skor trending tetap berhingga karena ``rebuild()`` menggeser epoch ke hari ini.
+
+Tanpa pergeseran, bobot ``2 ** ((t - epoch) / half_life)`` untuk window 7 hari
+melewati batas float sekitar 2044 dan setiap POST review menjadi 500.
+"""
+import math
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from app import app
+from config import Config
+import rankings
+
+# 2050-06-01 UTC, jauh setelah bobot relatif ke epoch 2025 meluap
+FUTURE = 2537654400
+
+@pytest.fixture(scope='module')
+def umkm_id():
+    conn = sqlite3.connect(Config.SQLITE_DB)
+    with conn:
+        user_id = conn.execute(
+            "INSERT INTO users (name, email, password, role) VALUES ('Ranker', 'ranker@example.com', 'x', 'user')"
+        ).lastrowid
+        umkm_id = conn.execute(
+            """INSERT INTO umkm (owner_id, name, category, address, is_approved)
+            VALUES (?, 'Warung Ranking', 'Kuliner', 'Jl. Ranking', 1)""", (user_id,)
+        ).lastrowid
+        for days_ago, rating in [(0, 5), (3, 4), (10, 2)]:
+            created_at = datetime.utcfromtimestamp(FUTURE - days_ago * 86400).isoformat(' ')
+            conn.execute(
+                'INSERT INTO reviews (umkm_id, user_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)',
+                (umkm_id, user_id, rating, 'ok', created_at)
+            )
+    conn.close()
+    return umkm_id
+
+def test_rebuild_moves_epoch_and_keeps_scores_finite(umkm_id, monkeypatch):
+    with pytest.raises(OverflowError):
+        rankings.trending_weight(5, FUTURE, 7, rankings.TRENDING_EPOCH)
+
+    monkeypatch.setattr(rankings.time, 'time', lambda: FUTURE + 3600)
+    rankings.rebuild(Config.SQLITE_DB)
+
+    conn = sqlite3.connect(Config.SQLITE_DB)
+    try:
+        epoch = rankings.trending_epoch(conn)
+        trending_7d, trending_30d = conn.execute(
+            'SELECT trending_7d, trending_30d FROM umkm_scores WHERE umkm_id = ?', (umkm_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    assert epoch == FUTURE
+    assert math.isfinite(trending_7d) and math.isfinite(trending_30d)
+
+    # Nilai yang sudah meluruh tidak bergantung pada epoch yang dipakai
+    expected = sum(rating / 5 * 2 ** (-(3600 + days_ago * 86400) / (7 * 86400))
+                   for days_ago, rating in [(0, 5), (3, 4), (10, 2)])
+    assert rankings.current_trending(trending_7d, 7, epoch, now=FUTURE + 3600) == pytest.approx(expected)
+
+def test_top_reads_scores_with_stored_epoch(umkm_id, monkeypatch):
+    monkeypatch.setattr(rankings.time, 'time', lambda: FUTURE + 3600)
+    response = app.test_client().get('/api/umkm/top?window=7d')
+    assert response.status_code == 200
+    scores = {item['id']: item['score'] for item in response.get_json()['results']}
+    assert math.isfinite(scores[umkm_id])
@@ -0,0 +1,67 @@
+"""Paginasi review (keyset cursor) harus berhenti dan tidak mengulang review.
+
+Review ditulis lewat SQL mentah seperti data lama di kawan_umkm.db: created_at
+tanpa mikrodetik, timestamp kembar dan NULL.
+"""
+import sqlite3
+
+import pytest
+
+from app import app
+from config import Config
+
+DB_PATH = Config.SQLITE_DB
+
+CREATED_AT = [
+    '2025-01-01 10:00:00',
+    '2025-01-01 10:00:00',
+    '2025-01-01 10:00:00.500000',
+    '2025-01-02 08:30:00',
+    '2025-01-02 08:30:00',
+    None,
+    '2024-12-31 23:59:59',
+]
+
+@pytest.fixture(scope='module')
+def umkm_id():
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        user_id = conn.execute(
+            "INSERT INTO users (name, email, password, role) VALUES ('Tester', 'tester@example.com', 'x', 'user')"
+        ).lastrowid
+        umkm_id = conn.execute(
+            """INSERT INTO umkm (owner_id, name, category, address, is_approved)
+            VALUES (?, 'Warung Uji', 'Kuliner', 'Jl. Uji', 1)""", (user_id,)
+        ).lastrowid
+        for index, created_at in enumerate(CREATED_AT):
+            conn.execute(
+                'INSERT INTO reviews (umkm_id, user_id, rating, comment, created_at) VALUES (?, ?, ?, ?, ?)',
+                (umkm_id, user_id, index % 3 + 1, f'review {index}', created_at)
+            )
+    conn.close()
+    return umkm_id
+
+def follow(client, umkm_id, sort, limit):
+    seen = []
+    cursor = None
+    for _ in range(len(CREATED_AT) + 2):
+        url = f'/api/umkm/{umkm_id}/reviews?sort={sort}&limit={limit}'
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        data = response.get_json()
+        seen.extend(review['id'] for review in data['reviews'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            return seen
+    pytest.fail(f'pagination for sort={sort} did not terminate: {seen}')
+
+@pytest.mark.parametrize('sort', ['newest', 'rating'])
+@pytest.mark.parametrize('limit', [1, 2, 3])
+def test_cursor_reaches_end_without_repeats(umkm_id, sort, limit):
+    seen = follow(app.test_client(), umkm_id, sort, limit)
+    assert len(seen) == len(CREATED_AT)
+    assert len(set(seen)) == len(seen)
+
+def test_newest_is_descending_by_id(umkm_id):
+    seen = follow(app.test_client(), umkm_id, 'newest', 2)
+    assert seen == sorted(seen, reverse=True)
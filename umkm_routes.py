@@ -1,16 +1,61 @@
+import base64
+import json
+import logging
 import os
 import uuid
+from datetime import date, timedelta
 from flask import Blueprint, request, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
-from models import db, UMKM, User, Review
+from sqlalchemy import func, tuple_
+from models import db, UMKM, User, Review, UmkmScore
 import jwt
 from config import Config
+from streaming import get_stream_format, stream_response, YIELD_PER
+from cache import cached_response, invalidate_umkm_cache
+from idempotency import idempotent
+from rankings import WINDOWS as RANKING_WINDOWS, record_review, current_trending, trending_epoch
+from recommendations import neighbour_cache
+from opening_hours import open_filter_from_args, open_at_clause, minute_of_week, set_opening_hours, hours_error
+from stats_rollup import bump, is_only_umkm, local_day
+from deletion import active_job, child_counts, schedule, remove_files_later
+from changes import record as record_change, current_cursor, pruned_through, changes_since, \
+    UPSERT as CHANGE_UPSERT, DELETE as CHANGE_DELETE
+from events import publish, umkm_channels
+from owner_analytics import bump as bump_umkm_stats, record_view, owner_analytics
+from moderation import status_of, counts_as_pending
+from clusters import parse_request as parse_cluster_request, get_features as cluster_features, invalidate_locations
 
 umkm_bp = Blueprint('umkm', __name__)
 
-# Create uploads directory
+logger = logging.getLogger(__name__)
+
+# Folder upload dibuat oleh create_app(), bukan saat import
 UPLOAD_FOLDER = 'uploads/images'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+REVIEW_PAGE_SIZE = 20
+REVIEW_PAGE_MAX = 100
+
+TOP_DEFAULT_LIMIT = 20
+TOP_MAX_LIMIT = 100
+
+SIMILAR_DEFAULT_LIMIT = 10
+
+# Cursor change feed yang cocok dengan isi daftar /api/umkm (lihat changes.py)
+CHANGES_CURSOR_HEADER = 'X-Changes-Cursor'
+
+CHANGES_DEFAULT_LIMIT = 500
+CHANGES_MAX_LIMIT = 2000
+
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_MAX_DAYS = 366
+
+# Kolom keyset per mode sort (semua diurutkan menurun, id sebagai tie-breaker).
+# 'newest' memakai id (autoincrement) saja: created_at tersimpan sebagai teks dengan/atau tanpa
+# mikrodetik dan bisa NULL, sehingga cursor berbasis created_at bisa mengulang halaman yang sama.
+REVIEW_SORTS = {
+    'newest': (Review.id,),
+    'rating': (Review.rating, Review.id),
+}
 
 def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
@@ -18,7 +63,8 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # Fungsi untuk verifikasi token
-def get_current_user():
+def get_current_user_id():
+    """user_id dari token (tanpa query database), atau None"""
     token = request.headers.get('Authorization')
     if not token or not token.startswith('Bearer '):
         return None
@@ -26,10 +72,14 @@ def get_current_user():
     try:
         token = token[7:]
         data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
-        return User.query.get(data['user_id'])
+        return data['user_id']
     except:
         return None
 
+def get_current_user():
+    user_id = get_current_user_id()
+    return User.query.get(user_id) if user_id is not None else None
+
 # Routes
 @umkm_bp.route('/umkm', methods=['GET', 'POST', 'OPTIONS'])
 def handle_umkm():
@@ -40,62 +90,104 @@ def handle_umkm():
     elif request.method == 'OPTIONS':
         return '', 200
 
+def review_stats_subquery():
+    """Subquery rata-rata rating dan jumlah review per UMKM (satu GROUP BY)"""
+    return db.session.query(
+        Review.umkm_id.label('umkm_id'),
+        func.avg(Review.rating).label('avg_rating'),
+        func.count(Review.id).label('review_count')
+    ).group_by(Review.umkm_id).subquery()
+
+def serialize_umkm_listing(row, base_url):
+    umkm, avg_rating, review_count = row
+    image_url = f"{base_url}api/uploads/images/{umkm.image_path}" if umkm.image_path else None
+
+    return {
+        'id': umkm.id,
+        'name': umkm.name,
+        'description': umkm.description,
+        'category': umkm.category,
+        'address': umkm.address,
+        'contact': umkm.phone,
+        'image_url': image_url,
+        'image_path': umkm.image_path,
+        'latitude': umkm.latitude,
+        'longitude': umkm.longitude,
+        'hours': umkm.hours,
+        'avg_rating': round(avg_rating or 0, 1),
+        'review_count': review_count or 0,
+        'owner_id': umkm.owner_id,
+        'created_at': umkm.created_at.isoformat() if umkm.created_at else None
+    }
+
+def listings_by_id(ids, base_url):
+    """Listing UMKM approved untuk ``ids`` (urutan mengikuti ``ids``), rating dari umkm_scores"""
+    if not ids:
+        return []
+    rows = db.session.query(UMKM, UmkmScore) \
+        .outerjoin(UmkmScore, UmkmScore.umkm_id == UMKM.id) \
+        .filter(UMKM.id.in_(ids), UMKM.is_approved == True) \
+        .all()
+    by_id = {}
+    for umkm, score in rows:
+        avg_rating = score.rating_sum / score.review_count if score and score.review_count else None
+        by_id[umkm.id] = serialize_umkm_listing((umkm, avg_rating, score.review_count if score else 0), base_url)
+    return [by_id[umkm_id] for umkm_id in ids if umkm_id in by_id]
+
 def get_all_umkm():
+    open_at, error = open_filter_from_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    
     try:
-        print("📥 Fetching all UMKM...")
-        umkms = UMKM.query.filter_by(is_approved=True).all()
-        result = []
-        
-        for umkm in umkms:
-            reviews = Review.query.filter_by(umkm_id=umkm.id).all()
-            avg_rating = 0
-            if reviews:
-                avg_rating = sum(review.rating for review in reviews) / len(reviews)
-            
-            base_url = request.host_url.rstrip('/')
-            image_url = f"{base_url}api/uploads/images/{umkm.image_path}" if umkm.image_path else None
-            
-            result.append({
-                'id': umkm.id,
-                'name': umkm.name,
-                'description': umkm.description,
-                'category': umkm.category,
-                'address': umkm.address,
-                'contact': umkm.phone,
-                'image_url': image_url,
-                'image_path': umkm.image_path,
-                'latitude': umkm.latitude,
-                'longitude': umkm.longitude,
-                'hours': umkm.hours,
-                'avg_rating': round(avg_rating, 1),
-                'review_count': len(reviews),
-                'owner_id': umkm.owner_id,
-                'created_at': umkm.created_at.isoformat() if umkm.created_at else None
-            })
-        
-        print(f"✅ Found {len(result)} UMKM")
-        return jsonify(result)
+        logger.debug("Fetching all UMKM")
+        stats = review_stats_subquery()
+        query = db.session.query(UMKM, stats.c.avg_rating, stats.c.review_count) \
+            .outerjoin(stats, stats.c.umkm_id == UMKM.id) \
+            .filter(UMKM.is_approved == True)
+        if open_at:
+            query = query.filter(open_at_clause(open_at))
+        query = query.order_by(UMKM.id)
+
+        base_url = request.host_url.rstrip('/')
+        serialize = lambda row: serialize_umkm_listing(row, base_url)
+
+        stream_format = get_stream_format()
+        if stream_format:
+            return stream_response(query.yield_per(YIELD_PER), serialize, stream_format,
+                                   headers={CHANGES_CURSOR_HEADER: str(current_cursor())})
+
+        def build():
+            # Cursor dibaca sebelum daftar: perubahan sesudahnya diulang lewat ?since=, tidak ada yang terlewat
+            cursor = current_cursor()
+            result = [serialize(row) for row in query.all()]
+            logger.debug("Found %d UMKM", len(result))
+            response = jsonify(result)
+            response.headers[CHANGES_CURSOR_HEADER] = str(cursor)
+            return response
+
+        # Key dari filter yang benar-benar dipakai query (open_now/open_at per menit), bukan query string mentah
+        open_minute = minute_of_week(open_at) if open_at else None
+        return cached_response(('umkm_list', request.host_url, open_minute), build,
+                               keep_headers=(CHANGES_CURSOR_HEADER,))
     
-    except Exception as e:
-        print(f"❌ Error fetching UMKM: {str(e)}")
+    except Exception:
+        logger.exception("Error fetching UMKM")
         return jsonify({'error': 'Internal server error'}), 500
 
+@idempotent
 def create_umkm():
     try:
-        print("📥 Received UMKM creation request")
-        
         current_user = get_current_user()
         if not current_user:
             return jsonify({'error': 'Unauthorized'}), 401
         
         if 'image' not in request.files:
-            print("❌ No image file in request")
             return jsonify({'error': 'No image file provided'}), 400
         
         file = request.files['image']
         
         if file.filename == '':
-            print("❌ Empty filename")
             return jsonify({'error': 'No selected file'}), 400
         
         if not allowed_file(file.filename):
@@ -106,7 +198,7 @@ def create_umkm():
         file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
         file.save(file_path)
         
-        print(f"✅ Image saved: {unique_filename}")
+        logger.debug("Image saved: %s", unique_filename)
         
         umkm_data = {
             'owner_id': current_user.id,
@@ -129,10 +221,16 @@ def create_umkm():
         
         new_umkm = UMKM(**umkm_data)
         db.session.add(new_umkm)
-        db.session.commit()
-        
-        print(f"✅ UMKM created successfully: {new_umkm.id}")
-        
+        db.session.flush()
+        hours_warning = set_opening_hours(new_umkm)
+        record_change([new_umkm.id])
+        bump(daily={'umkm_created': 1}, totals={
+            'umkm': 1,
+            'umkm_pending': 0 if new_umkm.is_approved else 1,
+            'umkm_owners': 1 if is_only_umkm(new_umkm.owner_id, new_umkm.id) else 0,
+        })
+        
+        # Response disusun sebelum commit: setelah commit atribut expired dan dibaca ulang dari database
         base_url = request.host_url.rstrip('/')
         image_url = f"{base_url}api/uploads/images/{new_umkm.image_path}"
         
@@ -148,22 +246,149 @@ def create_umkm():
             'latitude': new_umkm.latitude,
             'longitude': new_umkm.longitude,
             'hours': new_umkm.hours,
+            'hours_error': hours_warning,
             'owner_id': new_umkm.owner_id,
             'avg_rating': 0,
             'review_count': 0,
             'created_at': new_umkm.created_at.isoformat() if new_umkm.created_at else None
         }
         
+        db.session.commit()
+        invalidate_umkm_cache()
+        invalidate_locations([(umkm_response['latitude'], umkm_response['longitude'])])
+        
+        logger.info("UMKM created", extra={'umkm_id': umkm_response['id'], 'user_id': umkm_response['owner_id']})
+        
         return jsonify({
             'message': 'UMKM created successfully',
             'umkm': umkm_response
         }), 201
         
     except Exception as e:
-        print(f"❌ Error creating UMKM: {str(e)}")
+        logger.exception("Error creating UMKM")
         db.session.rollback()
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@umkm_bp.route('/umkm/top', methods=['GET', 'OPTIONS'])
+def get_top_umkm():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    window = request.args.get('window', 'all')
+    if window not in RANKING_WINDOWS:
+        return jsonify({'error': f"window must be one of: {', '.join(RANKING_WINDOWS)}"}), 400
+    limit = min(max(request.args.get('limit', TOP_DEFAULT_LIMIT, type=int), 1), TOP_MAX_LIMIT)
+    category = request.args.get('category')
+    open_at, error = open_filter_from_args(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    column_name, half_life = RANKING_WINDOWS[window]
+    column = getattr(UmkmScore, column_name)
+    
+    try:
+        # Dibaca langsung dari index (category, skor); tidak bergantung pada jumlah review
+        query = db.session.query(UMKM, UmkmScore) \
+            .join(UmkmScore, UmkmScore.umkm_id == UMKM.id) \
+            .filter(UMKM.is_approved == True, UmkmScore.review_count > 0)
+        if category:
+            query = query.filter(UmkmScore.category == category)
+        if open_at:
+            query = query.filter(open_at_clause(open_at))
+        query = query.order_by(column.desc(), UmkmScore.umkm_id.desc()).limit(limit)
+        
+        base_url = request.host_url.rstrip('/')
+        
+        def build():
+            result = []
+            epoch = trending_epoch() if half_life else None
+            for rank, (umkm, score) in enumerate(query.all(), start=1):
+                avg_rating = score.rating_sum / score.review_count if score.review_count else None
+                item = serialize_umkm_listing((umkm, avg_rating, score.review_count), base_url)
+                value = getattr(score, column_name)
+                item['rank'] = rank
+                item['score'] = round(current_trending(value, half_life, epoch) if half_life else value, 4)
+                result.append(item)
+            return jsonify({'window': window, 'category': category, 'results': result})
+        
+        open_minute = minute_of_week(open_at) if open_at else None
+        return cached_response(('umkm_top', request.host_url, window, limit, category, open_minute), build)
+    
+    except Exception:
+        logger.exception("Error fetching top UMKM")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@umkm_bp.route('/umkm/<int:id>/similar', methods=['GET', 'OPTIONS'])
+def get_similar_umkm(id):
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    limit = min(max(request.args.get('limit', SIMILAR_DEFAULT_LIMIT, type=int), 1), Config.RECOMMENDATION_TOP_K)
+    
+    try:
+        # Ambil lebih banyak dari limit karena sebagian tetangga mungkin belum/tidak di-approve
+        neighbours = neighbour_cache.similar(id)[:limit * 2]
+        scores = dict(neighbours)
+        results = listings_by_id([umkm_id for umkm_id, _ in neighbours], request.host_url.rstrip('/'))[:limit]
+        for item in results:
+            item['similarity'] = round(scores[item['id']], 4)
+        return jsonify({'umkm_id': id, 'results': results})
+    
+    except Exception:
+        logger.exception("Error fetching similar UMKM for %s", id)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@umkm_bp.route('/umkm/changes', methods=['GET', 'OPTIONS'])
+def get_umkm_changes():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    since = request.args.get('since')
+    if since is not None and not since.isdigit():
+        return jsonify({'error': 'since must be a cursor returned by this endpoint'}), 400
+    limit = min(max(request.args.get('limit', CHANGES_DEFAULT_LIMIT, type=int), 1), CHANGES_MAX_LIMIT)
+    
+    try:
+        if since is None:
+            # Hanya untuk client lama: cursor untuk sync awal harus diambil dari header
+            # X-Changes-Cursor /api/umkm, karena daftar itu bisa berasal dari cache worker lain
+            return jsonify({'cursor': current_cursor()})
+        since = int(since)
+        if since < pruned_through():
+            return jsonify({'error': 'Cursor expired, fetch the full catalog again', 'cursor': current_cursor()}), 410
+        
+        entries, cursor, has_more = changes_since(since, limit)
+        rows = listings_by_id([umkm_id for umkm_id, op in entries if op == CHANGE_UPSERT],
+                              request.host_url.rstrip('/'))
+        visible = {row['id'] for row in rows}
+        return jsonify({
+            'changes': rows,
+            # Dihapus, atau tidak lagi tampil di katalog (unpublish / menunggu approve)
+            'deleted': [umkm_id for umkm_id, _ in entries if umkm_id not in visible],
+            'cursor': cursor,
+            'has_more': has_more
+        })
+    
+    except Exception:
+        logger.exception("Error fetching UMKM changes")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@umkm_bp.route('/umkm/clusters', methods=['GET', 'OPTIONS'])
+def get_umkm_clusters():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    bbox, zoom, error = parse_cluster_request(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        # Fitur dikirim per tile utuh, bisa sedikit melewati bbox di tepinya
+        return jsonify({'zoom': zoom, 'features': cluster_features(bbox, zoom)})
+    
+    except Exception:
+        logger.exception("Error fetching UMKM clusters")
+        return jsonify({'error': 'Internal server error'}), 500
+
 # ENDPOINT DELETE UMKM - TAMBAHAN BARU
 @umkm_bp.route('/umkm/<int:id>', methods=['DELETE', 'OPTIONS'])
 def delete_umkm(id):
@@ -183,22 +408,48 @@ def delete_umkm(id):
         if umkm.owner_id != current_user.id and current_user.role != 'admin':
             return jsonify({'error': 'You can only delete your own UMKM'}), 403
         
-        # Hapus file gambar jika ada
-        if umkm.image_path:
-            image_path = os.path.join(UPLOAD_FOLDER, umkm.image_path)
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                print(f"✅ Deleted image file: {umkm.image_path}")
-        
-        # Hapus UMKM dari database
+        # Penghapusan sudah berjalan (UMKM ini atau pemiliknya): kembalikan job yang ada
+        job_id = active_job(umkm.id, umkm.owner_id)
+        if job_id:
+            return jsonify({'message': 'UMKM deletion scheduled', 'job_id': job_id}), 202
+        
+        files = [os.path.join(UPLOAD_FOLDER, umkm.image_path)] if umkm.image_path else []
+        reviews, favorites = child_counts(umkm.id)
+        if reviews + favorites > Config.DELETE_INLINE_LIMIT:
+            # UMKM besar: sembunyikan sekarang, hapus per batch di background
+            if umkm.is_approved:
+                bump(totals={'umkm_pending': 1})
+                umkm.is_approved = False
+            record_change([umkm.id], CHANGE_DELETE)
+            location = (umkm.latitude, umkm.longitude)
+            job_id = schedule('umkm', umkm.id, files, current_user.id)
+            invalidate_umkm_cache()
+            invalidate_locations([location])
+            return jsonify({'message': 'UMKM deletion scheduled', 'job_id': job_id}), 202
+        
+        # Review, favorite, skor, dll. dihapus database lewat ON DELETE CASCADE
+        bump(totals={
+            'umkm': -1,
+            'umkm_pending': -1 if counts_as_pending(umkm.is_approved, umkm.moderation_status) else 0,
+            'umkm_owners': -1 if is_only_umkm(umkm.owner_id, umkm.id) else 0,
+            'reviews': -reviews,
+            'favorites': -favorites,
+        })
+        record_change([umkm.id], CHANGE_DELETE)
+        publish('umkm_deleted', [(umkm_channels(umkm.id, umkm.owner_id), {'umkm_id': umkm.id})])
+        location = (umkm.latitude, umkm.longitude)
+        user_id = current_user.id
         db.session.delete(umkm)
         db.session.commit()
+        invalidate_umkm_cache()
+        invalidate_locations([location])
+        remove_files_later(files)
         
-        print(f"✅ UMKM deleted successfully: {id}")
+        logger.info("UMKM deleted", extra={'umkm_id': id, 'user_id': user_id})
         return jsonify({'message': 'UMKM deleted successfully'}), 200
         
-    except Exception as e:
-        print(f"❌ Error deleting UMKM {id}: {str(e)}")
+    except Exception:
+        logger.exception("Error deleting UMKM %s", id)
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -211,11 +462,11 @@ def get_umkm_by_id(id):
         umkm = UMKM.query.get(id)
         if not umkm:
             return jsonify({'error': 'UMKM not found'}), 404
+        record_view(umkm.id)
         
-        reviews = Review.query.filter_by(umkm_id=id).all()
-        avg_rating = 0
-        if reviews:
-            avg_rating = sum(review.rating for review in reviews) / len(reviews)
+        avg_rating, review_count = db.session.query(
+            func.avg(Review.rating), func.count(Review.id)
+        ).filter(Review.umkm_id == id).one()
         
         base_url = request.host_url.rstrip('/')
         image_url = f"{base_url}api/uploads/images/{umkm.image_path}" if umkm.image_path else None
@@ -235,15 +486,15 @@ def get_umkm_by_id(id):
             'hours': umkm.hours,
             'owner_id': umkm.owner_id,
             'owner_name': umkm.owner.name if umkm.owner else 'Tidak diketahui',
-            'avg_rating': round(avg_rating, 1),
-            'review_count': len(reviews),
+            'avg_rating': round(avg_rating or 0, 1),
+            'review_count': review_count,
             'created_at': umkm.created_at.isoformat() if umkm.created_at else None
         }
         
         return jsonify(umkm_response)
         
-    except Exception as e:
-        print(f"❌ Error fetching UMKM {id}: {str(e)}")
+    except Exception:
+        logger.exception("Error fetching UMKM %s", id)
         return jsonify({'error': 'Internal server error'}), 500
 
 @umkm_bp.route('/uploads/images/<filename>', methods=['GET', 'OPTIONS'])
@@ -254,7 +505,7 @@ def serve_image(filename):
     try:
         return send_from_directory(UPLOAD_FOLDER, filename)
     except Exception as e:
-        print(f"❌ Error serving image {filename}: {str(e)}")
+        logger.debug("Error serving image %s: %s", filename, e)
         return jsonify({'error': 'Image not found'}), 404
 
 # Endpoint untuk mendapatkan UMKM milik user
@@ -268,14 +519,16 @@ def get_my_umkm():
         if not current_user:
             return jsonify({'error': 'Unauthorized'}), 401
         
-        umkms = UMKM.query.filter_by(owner_id=current_user.id).all()
+        # Rating dari umkm_scores (satu join), bukan query reviews per UMKM
+        rows = db.session.query(UMKM, UmkmScore) \
+            .outerjoin(UmkmScore, UmkmScore.umkm_id == UMKM.id) \
+            .filter(UMKM.owner_id == current_user.id) \
+            .all()
         result = []
         
-        for umkm in umkms:
-            reviews = Review.query.filter_by(umkm_id=umkm.id).all()
-            avg_rating = 0
-            if reviews:
-                avg_rating = sum(review.rating for review in reviews) / len(reviews)
+        for umkm, score in rows:
+            review_count = score.review_count if score else 0
+            avg_rating = score.rating_sum / review_count if review_count else 0
             
             base_url = request.host_url.rstrip('/')
             image_url = f"{base_url}api/uploads/images/{umkm.image_path}" if umkm.image_path else None
@@ -290,14 +543,57 @@ def get_my_umkm():
                 'image_url': image_url,
                 'image_path': umkm.image_path,
                 'avg_rating': round(avg_rating, 1),
-                'review_count': len(reviews),
+                'review_count': review_count,
+                'hours': umkm.hours,
+                # Jam buka yang tidak bisa diparse tidak ikut filter "buka sekarang"
+                'hours_error': hours_error(umkm.hours),
+                # Hasil moderasi supaya pemilik tahu kenapa UMKM-nya tidak tampil
+                'status': status_of(umkm),
+                'moderation_reason': umkm.moderation_reason,
                 'created_at': umkm.created_at.isoformat() if umkm.created_at else None
             })
         
         return jsonify(result)
         
-    except Exception as e:
-        print(f"❌ Error fetching user UMKM: {str(e)}")
+    except Exception:
+        logger.exception("Error fetching user UMKM")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@umkm_bp.route('/my-umkm/analytics', methods=['GET', 'OPTIONS'])
+def get_my_umkm_analytics():
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in ('day', 'week'):
+        return jsonify({'error': 'bucket must be day or week'}), 400
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.fromisoformat(local_day())
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') \
+            else end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates (YYYY-MM-DD)'}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+    if (end - start).days >= ANALYTICS_MAX_DAYS:
+        return jsonify({'error': f'Range must be at most {ANALYTICS_MAX_DAYS} days'}), 400
+    
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'Unauthorized'}), 401
+        
+        query = db.session.query(UMKM.id, UMKM.name).filter(UMKM.owner_id == current_user.id)
+        if request.args.get('umkm_id'):
+            query = query.filter(UMKM.id == request.args.get('umkm_id', type=int))
+        umkm_names = dict(query.order_by(UMKM.id).all())
+        if request.args.get('umkm_id') and not umkm_names:
+            return jsonify({'error': 'UMKM not found'}), 404
+        
+        return jsonify(owner_analytics(umkm_names, start, end, bucket))
+    
+    except Exception:
+        logger.exception("Error fetching owner analytics")
         return jsonify({'error': 'Internal server error'}), 500
 
 # Endpoint untuk reviews (tetap sama)
@@ -310,31 +606,96 @@ def handle_reviews(id):
     elif request.method == 'POST':
         return add_umkm_review(id)
 
+def encode_review_cursor(sort, review):
+    key = [review.id] if sort == 'newest' else [review.rating, review.id]
+    return base64.urlsafe_b64encode(json.dumps({'sort': sort, 'key': key}).encode()).decode().rstrip('=')
+
+def decode_review_cursor(cursor, sort):
+    """Kembalikan nilai keyset dari cursor; ValueError jika cursor rusak atau beda mode sort"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        key = data['key']
+        if data['sort'] != sort:
+            raise ValueError('cursor belongs to another sort order')
+        if sort == 'newest':
+            # Cursor lama berisi [created_at, id]; id selalu elemen terakhir
+            return (int(key[-1]),)
+        rating, review_id = key
+        return int(rating), int(review_id)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise ValueError(str(e))
+
+def serialize_review(review, user_name):
+    return {
+        'id': review.id,
+        'user_id': review.user_id,
+        'user_name': user_name,
+        'rating': review.rating,
+        'comment': review.comment,
+        'created_at': review.created_at.isoformat() if review.created_at else None
+    }
+
+def review_histogram(umkm_id):
+    """Jumlah review per bintang (1-5), total dan rata-rata dalam satu GROUP BY"""
+    counts = dict(db.session.query(Review.rating, func.count(Review.id))
+                  .filter(Review.umkm_id == umkm_id).group_by(Review.rating).all())
+    total = sum(counts.values())
+    return {
+        'counts': {str(star): counts.get(star, 0) for star in range(1, 6)},
+        'total': total,
+        'avg_rating': round(sum(rating * count for rating, count in counts.items()) / total, 1) if total else 0
+    }
+
 def get_umkm_reviews(id):
+    # Tanpa parameter paginasi: format lama (list semua review, terbaru dulu)
+    paginated = any(key in request.args for key in ('limit', 'cursor', 'sort'))
+    
     try:
-        reviews = Review.query.filter_by(umkm_id=id).join(User).all()
-        
-        reviews_data = []
-        for review in reviews:
-            reviews_data.append({
-                'id': review.id,
-                'user_id': review.user_id,
-                'user_name': review.user.name,
-                'rating': review.rating,
-                'comment': review.comment,
-                'created_at': review.created_at.isoformat() if review.created_at else None
-            })
+        # Nama penulis ikut di query yang sama (tanpa lazy load per review)
+        query = db.session.query(Review, User.name) \
+            .join(User, Review.user_id == User.id) \
+            .filter(Review.umkm_id == id)
+        
+        if not paginated:
+            rows = query.order_by(Review.created_at.desc(), Review.id.desc()).all()
+            return jsonify([serialize_review(review, user_name) for review, user_name in rows])
+        
+        sort = request.args.get('sort', 'newest')
+        if sort not in REVIEW_SORTS:
+            return jsonify({'error': f"sort must be one of: {', '.join(REVIEW_SORTS)}"}), 400
+        limit = min(max(request.args.get('limit', REVIEW_PAGE_SIZE, type=int), 1), REVIEW_PAGE_MAX)
+        columns = REVIEW_SORTS[sort]
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                query = query.filter(tuple_(*columns) < decode_review_cursor(cursor, sort))
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+        
+        rows = query.order_by(*(column.desc() for column in columns)).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        result = {
+            'reviews': [serialize_review(review, user_name) for review, user_name in rows],
+            'sort': sort,
+            'next_cursor': encode_review_cursor(sort, rows[-1][0]) if has_more else None
+        }
+        if not cursor:
+            result['histogram'] = review_histogram(id)
         
-        return jsonify(reviews_data)
+        return jsonify(result)
         
-    except Exception as e:
-        print(f"❌ Error fetching reviews for UMKM {id}: {str(e)}")
+    except Exception:
+        logger.exception("Error fetching reviews for UMKM %s", id)
         return jsonify({'error': 'Internal server error'}), 500
 
+@idempotent
 def add_umkm_review(id):
     try:
-        current_user = get_current_user()
-        if not current_user:
+        user_id = get_current_user_id()
+        if user_id is None:
             return jsonify({'error': 'Unauthorized'}), 401
             
         data = request.get_json()
@@ -342,19 +703,44 @@ def add_umkm_review(id):
         if not data.get('rating') or not data.get('comment'):
             return jsonify({'error': 'Rating and comment are required'}), 400
         
+        try:
+            rating = int(data['rating'])
+        except (TypeError, ValueError):
+            rating = 0
+        if not 1 <= rating <= 5:
+            return jsonify({'error': 'Rating must be an integer between 1 and 5'}), 400
+        
+        # User dan UMKM dalam satu query (keduanya lookup primary key)
+        row = db.session.query(User, UMKM).outerjoin(UMKM, UMKM.id == id).filter(User.id == user_id).first()
+        if not row:
+            return jsonify({'error': 'Unauthorized'}), 401
+        current_user, umkm = row
+        if not umkm:
+            return jsonify({'error': 'UMKM not found'}), 404
+        
         new_review = Review(
             umkm_id=id,
             user_id=current_user.id,
-            rating=data['rating'],
+            rating=rating,
             comment=data['comment']
         )
         
         db.session.add(new_review)
+        db.session.flush()
+        record_review(umkm, new_review)
+        bump(daily={'reviews': 1}, totals={'reviews': 1})
+        bump_umkm_stats(umkm.id, reviews=1, rating_sum=rating)
+        record_change([umkm.id])
+        publish('review', [(umkm_channels(umkm.id, umkm.owner_id), {
+            'umkm_id': umkm.id,
+            'review': serialize_review(new_review, current_user.name)
+        })])
         db.session.commit()
+        invalidate_umkm_cache()
         
         return jsonify({'message': 'Review added successfully'}), 201
         
-    except Exception as e:
-        print(f"❌ Error adding review for UMKM {id}: {str(e)}")
+    except Exception:
+        logger.exception("Error adding review for UMKM %s", id)
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
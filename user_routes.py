@@ -1,12 +1,15 @@
 from flask import Blueprint, request, jsonify
 from auth import token_required
-from models import db, User, Favorite, Review, hash_password, check_password
+from models import db, User, Favorite, Review, UmkmScore, hash_password, check_password
+from recommendations import neighbour_cache, review_weight
+from umkm_routes import listings_by_id
 from datetime import datetime
-import os
-import traceback
+import logging
 
 user_bp = Blueprint('user', __name__)
 
+logger = logging.getLogger(__name__)
+
 def format_join_date(created_at):
     """Format created_at to Indonesian date format"""
     try:
@@ -27,31 +30,30 @@ def format_join_date(created_at):
         else:
             return "Tidak diketahui"
     except Exception as e:
-        print(f"❌ Error formatting date: {e}")
+        logger.warning("Error formatting date: %s", e)
         return "Tidak diketahui"
 
 @user_bp.route('/user/profile', methods=['GET'])
 @token_required
 def get_user_profile(current_user):
     try:
-        print(f"🔍 Fetching profile for user ID: {current_user['id']}")
+        logger.debug("Fetching profile for user %s", current_user['id'])
         
         user = User.query.get(current_user['id'])
         if not user:
-            print(f"❌ User not found for ID: {current_user['id']}")
             return jsonify({'error': 'User not found'}), 404
 
         # Get stats menggunakan try-except untuk setiap query
         try:
             favorite_count = Favorite.query.filter_by(user_id=current_user['id']).count()
         except Exception as e:
-            print(f"❌ Error counting favorites: {e}")
+            logger.warning("Error counting favorites: %s", e)
             favorite_count = 0
 
         try:
             review_count = Review.query.filter_by(user_id=current_user['id']).count()
         except Exception as e:
-            print(f"❌ Error counting reviews: {e}")
+            logger.warning("Error counting reviews: %s", e)
             review_count = 0
 
         user_data = {
@@ -66,12 +68,47 @@ def get_user_profile(current_user):
             'created_at': user.created_at.isoformat() if user.created_at else None
         }
 
-        print(f"✅ Profile data retrieved for: {user.email}")
         return jsonify(user_data), 200
 
-    except Exception as e:
-        print(f"❌ Error getting profile: {e}")
-        print(f"🔍 Stack trace: {traceback.format_exc()}")
+    except Exception:
+        logger.exception("Error getting profile")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@user_bp.route('/user/for-you', methods=['GET'])
+@token_required
+def get_for_you(current_user):
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    
+    try:
+        # Interaksi user ini dengan bobot yang sama seperti job rekomendasi
+        interactions = {umkm_id: 1.0 for (umkm_id,) in
+                        db.session.query(Favorite.umkm_id).filter(Favorite.user_id == current_user['id'])}
+        for umkm_id, rating in db.session.query(Review.umkm_id, Review.rating).filter(Review.user_id == current_user['id']):
+            try:
+                weight = review_weight(int(rating))
+            except (TypeError, ValueError):
+                continue
+            interactions[umkm_id] = max(interactions.get(umkm_id, 0.0), weight)
+        
+        scored = neighbour_cache.for_user(interactions, limit * 2)
+        source = 'personalized'
+        if not scored:
+            # User baru / belum ada interaksi: pakai top rated
+            source = 'top_rated'
+            scored = db.session.query(UmkmScore.umkm_id, UmkmScore.bayes_score) \
+                .filter(UmkmScore.umkm_id.notin_(list(interactions))) \
+                .order_by(UmkmScore.bayes_score.desc()) \
+                .limit(limit * 2).all()
+        
+        scores = dict(scored)
+        results = listings_by_id([umkm_id for umkm_id, _ in scored], request.host_url.rstrip('/'))[:limit]
+        for item in results:
+            item['score'] = round(scores[item['id']], 4)
+        
+        return jsonify({'source': source, 'results': results}), 200
+    
+    except Exception:
+        logger.exception("Error building recommendations")
         return jsonify({'error': 'Internal server error'}), 500
 
 @user_bp.route('/profile', methods=['PUT'])
@@ -139,8 +176,7 @@ def update_user_profile(current_user):
         }), 200
         
     except Exception as e:
-        print(f"❌ Error updating profile: {e}")
-        print(f"🔍 Stack trace: {traceback.format_exc()}")
+        logger.exception("Error updating profile")
         db.session.rollback()
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
@@ -173,8 +209,7 @@ def change_user_password(current_user):
 
         return jsonify({'message': 'Password berhasil diubah'}), 200
         
-    except Exception as e:
-        print(f"❌ Error changing password: {e}")
-        print(f"🔍 Stack trace: {traceback.format_exc()}")
+    except Exception:
+        logger.exception("Error changing password")
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500